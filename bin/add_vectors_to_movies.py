@@ -9,6 +9,7 @@ from dotenv import load_dotenv
 from astrapy import DataAPIClient
 from openai import OpenAI
 from tqdm import tqdm
+from embeddings import BatchEmbedder, collection_name_for
 
 load_dotenv()
 
@@ -25,8 +26,6 @@ astra_client = DataAPIClient(ASTRA_DB_APPLICATION_TOKEN)
 database = astra_client.get_database(ASTRA_DB_API_ENDPOINT)
 openai_client = OpenAI(api_key=OPENAI_API_KEY)
 
-EMBEDDING_MODEL = "text-embedding-3-small"
-
 
 def create_embedding_text(movie_doc):
     """Create a text representation for embedding."""
@@ -59,17 +58,8 @@ def create_embedding_text(movie_doc):
     return " | ".join(parts)
 
 
-def generate_embedding(text):
-    """Generate embedding using OpenAI."""
-    response = openai_client.embeddings.create(
-        model=EMBEDDING_MODEL,
-        input=text
-    )
-    return response.data[0].embedding
-
-
 def main():
-    collection = database.get_collection("movies2026")
+    collection = database.get_collection(collection_name_for("movies2026"))
     
     # Find all movies - include $vector in projection to check if it exists
     print("Counting movies...")
@@ -90,24 +80,32 @@ def main():
     success = 0
     errors = 0
     
+    # One embeddings request per batch; vectors are mapped back to their documents
+    embedder = BatchEmbedder(openai_client)
+
+    def save(finished):
+        nonlocal success, errors
+        for movie, embedding, error in finished:
+            try:
+                if error:
+                    raise error
+                # Update the document with $vector field
+                collection.update_one(
+                    {"_id": movie["_id"]},
+                    {"$set": {"$vector": embedding}}
+                )
+                success += 1
+            except Exception as e:
+                errors += 1
+                print(f"\n⚠️  Error processing {movie.get('title', movie['_id'])}: {e}")
+
     for movie in tqdm(movies_without_vectors, desc="Adding embeddings"):
         try:
-            # Create embedding text
-            embedding_text = create_embedding_text(movie)
-            
-            # Generate embedding
-            embedding = generate_embedding(embedding_text)
-            
-            # Update the document with $vector field
-            collection.update_one(
-                {"_id": movie["_id"]},
-                {"$set": {"$vector": embedding}}
-            )
-            
-            success += 1
+            save(embedder.add(movie, create_embedding_text(movie)))
         except Exception as e:
             errors += 1
             print(f"\n⚠️  Error processing {movie.get('title', movie['_id'])}: {e}")
+    save(embedder.flush())
     
     print(f"\n✅ Successfully added embeddings to {success} movies")
     if errors > 0:
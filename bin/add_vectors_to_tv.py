@@ -9,6 +9,7 @@ from dotenv import load_dotenv
 from astrapy import DataAPIClient
 from openai import OpenAI
 from tqdm import tqdm
+from embeddings import BatchEmbedder, collection_name_for
 
 load_dotenv()
 
@@ -25,8 +26,6 @@ astra_client = DataAPIClient(ASTRA_DB_APPLICATION_TOKEN)
 database = astra_client.get_database(ASTRA_DB_API_ENDPOINT)
 openai_client = OpenAI(api_key=OPENAI_API_KEY)
 
-EMBEDDING_MODEL = "text-embedding-3-small"
-
 
 def create_embedding_text(tv_doc):
     """Create a text representation for embedding."""
@@ -59,17 +58,8 @@ def create_embedding_text(tv_doc):
     return " | ".join(parts)
 
 
-def generate_embedding(text):
-    """Generate embedding using OpenAI."""
-    response = openai_client.embeddings.create(
-        model=EMBEDDING_MODEL,
-        input=text
-    )
-    return response.data[0].embedding
-
-
 def main():
-    collection = database.get_collection("tvshows2026")
+    collection = database.get_collection(collection_name_for("tvshows2026"))
     
     # Find all TV shows - include $vector in projection to check if it exists
     print("Counting TV shows...")
@@ -90,24 +80,32 @@ def main():
     success = 0
     errors = 0
     
+    # One embeddings request per batch; vectors are mapped back to their documents
+    embedder = BatchEmbedder(openai_client)
+
+    def save(finished):
+        nonlocal success, errors
+        for show, embedding, error in finished:
+            try:
+                if error:
+                    raise error
+                # Update the document with $vector field
+                collection.update_one(
+                    {"_id": show["_id"]},
+                    {"$set": {"$vector": embedding}}
+                )
+                success += 1
+            except Exception as e:
+                errors += 1
+                print(f"\n⚠️  Error processing {show.get('name', show['_id'])}: {e}")
+
     for show in tqdm(shows_without_vectors, desc="Adding embeddings"):
         try:
-            # Create embedding text
-            embedding_text = create_embedding_text(show)
-            
-            # Generate embedding
-            embedding = generate_embedding(embedding_text)
-            
-            # Update the document with $vector field
-            collection.update_one(
-                {"_id": show["_id"]},
-                {"$set": {"$vector": embedding}}
-            )
-            
-            success += 1
+            save(embedder.add(show, create_embedding_text(show)))
         except Exception as e:
             errors += 1
             print(f"\n⚠️  Error processing {show.get('name', show['_id'])}: {e}")
+    save(embedder.flush())
     
     print(f"\n✅ Successfully added embeddings to {success} TV shows")
     if errors > 0:
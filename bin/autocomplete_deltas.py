@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Incremental autocomplete updates: record, publish and compact deltas.
+
+update_astra_movies.py records add/remove operations for the autocomplete
+entries (title, top cast, genres) of every document it rewrites, then
+publishes them as one versioned delta file under public/autocomplete/deltas/.
+Clients keep the base autocomplete data cached and download only the delta
+files newer than the base (its shard manifest records the last delta folded
+in) that they have not already stored (public/autocomplete-deltas.js).
+
+Compaction folds the published deltas into public/autocomplete.json,
+regenerates the derived files (trigram, binary, shards) and starts a new base:
+
+    python bin/autocomplete_deltas.py publish
+    python bin/autocomplete_deltas.py compact
+
+People and genres are only ever added: one title dropping an actor says
+nothing about their other credits, so stale people are left for a full export.
+"""
+
+import os
+import json
+import argparse
+from merge_autocomplete import (
+    FILE_OUTPUT, PUBLIC_DIR, bucket_sort_key, dedupe_key, load_data,
+    merge_duplicate, to_entry, write_outputs,
+)
+
+DELTA_DIR = os.path.join(PUBLIC_DIR, 'autocomplete', 'deltas')
+INDEX_PATH = os.path.join(DELTA_DIR, 'index.json')
+# Recorded but unpublished operations; kept out of public/
+PENDING_PATH = os.path.join(os.path.dirname(PUBLIC_DIR), 'cache', 'autocomplete-deltas.pending.jsonl')
+
+# Matches create_autocomplete_documents in the crawlers
+CAST_LIMIT = 5
+TITLE_LABELS = {"Movie", "TV Show"}
+# Fold deltas into a new base once this many are published
+DEFAULT_COMPACT_AFTER = 30
+
+
+def autocomplete_entries(media_type, doc):
+    """Autocomplete entries for one title document (TMDB details or a stored document)."""
+    if not doc:
+        return []
+    context = "movie" if media_type == "movie" else "tv"
+    entries = []
+    title = doc.get('title') or doc.get('name')
+    title_id = doc.get('_id') or doc.get('id')
+    if title:
+        entries.append(to_entry({"name": title, "id": str(title_id) if title_id is not None else None}, context))
+    for person in (doc.get('cast') or [])[:CAST_LIMIT]:
+        # cast is a list of names or of {name, ...} dicts depending on the writer
+        entries.append(to_entry([1, person.get('name') if isinstance(person, dict) else person], context))
+    for genre in doc.get('genres') or []:
+        entries.append(to_entry([2, genre.get('name') if isinstance(genre, dict) else genre], context))
+    return [e for e in entries if e]
+
+
+def diff_entries(old_entries, new_entries):
+    """Operations turning `old_entries` into `new_entries` for one title."""
+    old = {dedupe_key(e): e for e in old_entries}
+    new = {dedupe_key(e): e for e in new_entries}
+    ops = [dict(e, op="add") for key, e in new.items() if key not in old]
+    ops += [dict(e, op="remove") for key, e in old.items() if key not in new and e["type"] in TITLE_LABELS]
+    return ops
+
+
+def record_changes(media_type, old_doc, new_doc):
+    """Append the autocomplete operations for one rewritten document; returns how many."""
+    ops = diff_entries(autocomplete_entries(media_type, old_doc), autocomplete_entries(media_type, new_doc))
+    if ops:
+        os.makedirs(os.path.dirname(PENDING_PATH), exist_ok=True)
+        with open(PENDING_PATH, 'a', encoding='utf-8') as f:
+            for op in ops:
+                f.write(json.dumps(op, ensure_ascii=False) + "\n")
+    return len(ops)
+
+
+def _write_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, separators=(',', ':'), ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def load_index():
+    if os.path.exists(INDEX_PATH):
+        with open(INDEX_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {"version": 1, "base_version": 0, "latest": 0, "deltas": []}
+
+
+def _collapse(ops):
+    """Last operation per entry wins, so an add followed by a remove cancels out."""
+    collapsed = {}
+    for op in ops:
+        key = dedupe_key(op)
+        collapsed.pop(key, None)
+        collapsed[key] = op
+    return list(collapsed.values())
+
+
+def publish(compact_after=DEFAULT_COMPACT_AFTER):
+    """Publish pending operations as the next delta version; returns that version or None."""
+    if not os.path.exists(PENDING_PATH):
+        print("No autocomplete changes to publish.")
+        return None
+    with open(PENDING_PATH, 'r', encoding='utf-8') as f:
+        ops = _collapse(json.loads(line) for line in f if line.strip())
+    if not ops:
+        os.remove(PENDING_PATH)
+        print("No autocomplete changes to publish.")
+        return None
+
+    index = load_index()
+    version = index["latest"] + 1
+    filename = f"delta-{version}.json"
+    _write_json(os.path.join(DELTA_DIR, filename), {"version": version, "base_version": index["base_version"], "ops": ops})
+    index["latest"] = version
+    index["deltas"].append({
+        "version": version,
+        "file": f"deltas/{filename}",
+        "adds": sum(1 for op in ops if op["op"] == "add"),
+        "removes": sum(1 for op in ops if op["op"] == "remove"),
+    })
+    _write_json(INDEX_PATH, index)
+    os.remove(PENDING_PATH)
+    print(f"✅ Published autocomplete delta {version} ({len(ops)} operations)")
+
+    if compact_after and len(index["deltas"]) >= compact_after:
+        compact()
+    return version
+
+
+def compact():
+    """Fold every published delta into the base file and start a new base version."""
+    index = load_index()
+    if not index["deltas"]:
+        print("No autocomplete deltas to compact.")
+        return
+
+    unique = {}
+    for item in load_data(FILE_OUTPUT):
+        if isinstance(item, dict) and item.get('name'):
+            unique[dedupe_key(item)] = item
+    for delta in index["deltas"]:
+        with open(os.path.join(os.path.dirname(DELTA_DIR), delta["file"]), 'r', encoding='utf-8') as f:
+            ops = json.load(f)["ops"]
+        for op in ops:
+            entry = {k: v for k, v in op.items() if k != "op"}
+            key = dedupe_key(entry)
+            if op["op"] == "remove":
+                unique.pop(key, None)
+            else:
+                unique[key] = merge_duplicate(unique[key], entry) if key in unique else entry
+
+    combined = sorted(unique.values(), key=bucket_sort_key)
+    print(f"Compacting {len(index['deltas'])} deltas into {len(combined)} entries...")
+    write_outputs(combined, base_version=index["latest"])
+
+    for delta in index["deltas"]:
+        path = os.path.join(os.path.dirname(DELTA_DIR), delta["file"])
+        if os.path.exists(path):
+            os.remove(path)
+    index["base_version"] = index["latest"]
+    index["deltas"] = []
+    _write_json(INDEX_PATH, index)
+    print(f"✅ New autocomplete base version {index['base_version']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish or compact autocomplete deltas")
+    parser.add_argument("command", choices=["publish", "compact"])
+    parser.add_argument("--compact-after", type=int, default=DEFAULT_COMPACT_AFTER,
+                        help=f"Compact once this many deltas are published (default: {DEFAULT_COMPACT_AFTER}, 0 to disable)")
+    args = parser.parse_args()
+    if args.command == "publish":
+        publish(args.compact_after)
+    else:
+        compact()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Append-only journal for the crawlers' autocomplete checkpoints.
+
+The by-date crawlers used to rewrite the whole autocomplete JSON every 100
+new entries, which made write volume quadratic over a crawl. Entries are now
+appended to a JSONL journal next to the output file (autocomplete-fresh.json
+-> autocomplete-fresh.jsonl) and fsynced periodically, so a checkpoint costs
+only the new entries. compact() writes the final sorted JSON once, at the end
+of a crawl or on demand:
+
+    python bin/autocomplete_journal.py public/autocomplete-fresh.json
+
+A restarted crawl replays the journal to rebuild its seen keys, so entries
+from earlier runs are kept instead of being overwritten. Crawler processes
+on one machine can share a journal: every entry is appended with a single
+line-buffered write, and compact() deduplicates across them.
+"""
+
+import os
+import json
+import argparse
+
+# Entries appended between fsyncs
+FSYNC_EVERY = 100
+
+
+def journal_path_for(json_path):
+    base = json_path[:-len(".json")] if json_path.endswith(".json") else json_path
+    return base + ".jsonl"
+
+
+def entry_key(doc):
+    """Uniqueness key: id for titles, name for people and genres."""
+    if doc.get('id') is not None:
+        return (doc.get('type'), doc.get('id'))
+    return (doc.get('type'), doc.get('name'))
+
+
+def compact_sort_key(doc):
+    # Lowercase name first, so the output can also feed merge_autocomplete.py --sorted
+    return (str(doc.get('name', '')).strip().lower(), str(doc.get('type', '')))
+
+
+def read_journal(path):
+    """Yield journal entries, skipping a torn last line from an interrupted write."""
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def _ends_with_newline(path):
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+class AutocompleteJournal:
+    def __init__(self, json_path, fsync_every=FSYNC_EVERY):
+        self.json_path = json_path
+        self.path = journal_path_for(json_path)
+        self.fsync_every = fsync_every
+        self.seen_keys = {entry_key(doc) for doc in read_journal(self.path)}
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8", buffering=1)
+        self._unsynced = 0
+        if self._file.tell() and not _ends_with_newline(self.path):
+            # Terminate a torn line so the next entry starts cleanly
+            self._file.write("\n")
+
+    def __len__(self):
+        return len(self.seen_keys)
+
+    def add(self, doc):
+        """Append a document unless its key has been seen; returns True if it was new."""
+        key = entry_key(doc)
+        if key in self.seen_keys:
+            return False
+        self.seen_keys.add(key)
+        self._file.write(json.dumps(doc, ensure_ascii=False) + "\n")
+        self._unsynced += 1
+        if self._unsynced >= self.fsync_every:
+            self.checkpoint()
+        return True
+
+    def checkpoint(self):
+        """Flush and fsync everything appended so far."""
+        if self._unsynced:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+
+    def close(self):
+        self.checkpoint()
+        self._file.close()
+
+    def compact(self):
+        """Write the deduplicated, name-sorted JSON output; returns the entry count."""
+        self.checkpoint()
+        return compact(self.json_path)
+
+
+def compact(json_path):
+    unique = {}
+    for doc in read_journal(journal_path_for(json_path)):
+        unique.setdefault(entry_key(doc), doc)
+    docs = sorted(unique.values(), key=compact_sort_key)
+    tmp_path = f"{json_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(docs, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, json_path)
+    return len(docs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact an autocomplete journal into its JSON file")
+    parser.add_argument("json_path", nargs="+", help="Output JSON path(s), e.g. public/autocomplete-fresh.json")
+    args = parser.parse_args()
+    for json_path in args.json_path:
+        if not os.path.exists(journal_path_for(json_path)):
+            print(f"⚠️  No journal for {json_path}")
+            continue
+        print(f"✅ {json_path}: {compact(json_path):,} entries")
+
+
+if __name__ == "__main__":
+    main()
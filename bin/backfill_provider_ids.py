@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Backfill canonical watch_provider_ids on documents written before ingest
+recorded them, so provider filters can use single equality lookups.
+
+    python bin/backfill_provider_ids.py          # documents without ids
+    python bin/backfill_provider_ids.py --all    # recompute after a catalogue change
+"""
+
+import os
+import argparse
+from dotenv import load_dotenv
+from astrapy import DataAPIClient
+from tqdm import tqdm
+from embeddings import collection_name_for
+
+import functions_path  # noqa: F401
+from provider_catalog import canonical_provider_ids, provider_ids_by_payment_type
+
+load_dotenv()
+
+ASTRA_DB_APPLICATION_TOKEN = os.getenv("ASTRA_DB_APPLICATION_TOKEN")
+ASTRA_DB_API_ENDPOINT = os.getenv("ASTRA_DB_API_ENDPOINT")
+
+
+def provider_ids_from_document(doc):
+    us = (doc.get('watch_providers') or {}).get('US') or {}
+    # update_astra_movies.py stores the raw TMDB region payload (flatrate/rent/buy
+    # lists of provider dicts); the crawlers store names under stream/rent/buy.
+    if any(key in us for key in ('flatrate', 'ads', 'free')):
+        return provider_ids_by_payment_type(us)
+    return {pt: canonical_provider_ids(us.get(pt)) for pt in ('stream', 'rent', 'buy')}
+
+
+def backfill(collection, recompute=False):
+    updated = 0
+    cursor = collection.find(
+        {} if recompute else {"watch_provider_ids": {"$exists": False}},
+        projection={"_id": 1, "watch_providers.US": 1}
+    )
+    for doc in tqdm(cursor, desc=collection.name, unit="doc", ncols=100):
+        collection.update_one(
+            {"_id": doc["_id"]},
+            {"$set": {"watch_provider_ids": provider_ids_from_document(doc)}}
+        )
+        updated += 1
+    return updated
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill canonical watch_provider_ids")
+    parser.add_argument("--all", action="store_true",
+                        help="Recompute ids on every document (after provider_catalog.json changes)")
+    args = parser.parse_args()
+
+    client = DataAPIClient(ASTRA_DB_APPLICATION_TOKEN)
+    database = client.get_database(ASTRA_DB_API_ENDPOINT)
+    for base_name in ["movies2026", "tvshows2026"]:
+        collection = database.get_collection(collection_name_for(base_name))
+        print(f"✅ {collection.name}: backfilled {backfill(collection, args.all):,} documents")
+
+
+if __name__ == "__main__":
+    main()
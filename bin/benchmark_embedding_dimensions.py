@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Compare vector search latency and recall between the full 1536-dimension
+collection and its reduced-dimension copies.
+
+Query vectors are sampled from the full collection; the full collection's
+top-k for each query is treated as ground truth.
+"""
+
+import os
+import time
+import argparse
+import statistics
+from dotenv import load_dotenv
+from astrapy import DataAPIClient
+from embeddings import DEFAULT_EMBEDDING_DIMENSIONS, collection_name_for, truncate_and_normalize
+
+load_dotenv()
+
+ASTRA_DB_APPLICATION_TOKEN = os.getenv("ASTRA_DB_APPLICATION_TOKEN")
+ASTRA_DB_API_ENDPOINT = os.getenv("ASTRA_DB_API_ENDPOINT")
+
+
+def timed_search(collection, vector, k):
+    start = time.perf_counter()
+    results = list(collection.find({}, sort={"$vector": vector}, limit=k, projection={"_id": 1}))
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    return [r["_id"] for r in results], elapsed_ms
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark reduced-dimension vector collections")
+    parser.add_argument("--collection", default="movies2026", help="Full-size source collection")
+    parser.add_argument("--dimensions", type=int, nargs="+", default=[256, 512], help="Reduced sizes to compare")
+    parser.add_argument("--queries", type=int, default=50, help="Number of sampled query vectors")
+    parser.add_argument("-k", type=int, default=10, help="Top-k used for recall")
+    args = parser.parse_args()
+
+    client = DataAPIClient(ASTRA_DB_APPLICATION_TOKEN)
+    database = client.get_database(ASTRA_DB_API_ENDPOINT)
+    full = database.get_collection(args.collection)
+
+    print(f"Sampling {args.queries} query vectors from {args.collection}...")
+    samples = [
+        list(doc["$vector"])
+        for doc in full.find({}, sort={"popularity": -1}, limit=args.queries, projection={"$vector": 1})
+        if doc.get("$vector") is not None
+    ]
+    if not samples:
+        print("No vectors found - nothing to benchmark.")
+        return
+
+    truth = []
+    full_latencies = []
+    for vector in samples:
+        ids, ms = timed_search(full, vector, args.k)
+        truth.append(set(ids))
+        full_latencies.append(ms)
+
+    print(f"\n{'dims':>6} {'p50 ms':>9} {'p95 ms':>9} {f'recall@{args.k}':>11}")
+    print(f"{DEFAULT_EMBEDDING_DIMENSIONS:>6} {statistics.median(full_latencies):>9.1f} "
+          f"{percentile(full_latencies, 95):>9.1f} {1.0:>11.3f}")
+
+    for dimensions in args.dimensions:
+        reduced = database.get_collection(collection_name_for(args.collection, dimensions))
+        latencies = []
+        recalls = []
+        for vector, expected in zip(samples, truth):
+            ids, ms = timed_search(reduced, truncate_and_normalize(vector, dimensions), args.k)
+            latencies.append(ms)
+            recalls.append(len(expected & set(ids)) / max(len(expected), 1))
+        print(f"{dimensions:>6} {statistics.median(latencies):>9.1f} "
+              f"{percentile(latencies, 95):>9.1f} {statistics.mean(recalls):>11.3f}")
+
+
+if __name__ == "__main__":
+    main()
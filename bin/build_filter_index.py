@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Build the local pre-filter indexes used by netlify/functions/astra.py.
+
+Scans each vector collection once and writes one index per collection with
+per-value posting lists (sorted row ids) over genres, original_language and
+US watch providers, plus the unit-length vectors needed for a local
+similarity scan (a .npy file next to the index).
+Re-run after crawls so new titles become visible to filtered searches.
+"""
+
+import os
+import argparse
+from dotenv import load_dotenv
+from astrapy import DataAPIClient
+from tqdm import tqdm
+from embeddings import EMBEDDING_DIMENSIONS, collection_name_for
+
+import functions_path  # noqa: F401
+from filter_index import FilterIndex
+
+load_dotenv()
+
+ASTRA_DB_APPLICATION_TOKEN = os.getenv("ASTRA_DB_APPLICATION_TOKEN")
+ASTRA_DB_API_ENDPOINT = os.getenv("ASTRA_DB_API_ENDPOINT")
+
+BASE_COLLECTIONS = ["movies2026", "tvshows2026"]
+PROJECTION = {
+    "_id": 1,
+    "genres": 1,
+    "original_language": 1,
+    "watch_providers.US": 1,
+    "watch_provider_ids": 1,
+    "$vector": 1
+}
+
+
+def build(database, collection_name):
+    collection = database.get_collection(collection_name)
+    index = FilterIndex(collection_name, EMBEDDING_DIMENSIONS)
+    skipped = 0
+    for doc in tqdm(collection.find({}, projection=PROJECTION), desc=collection_name, unit="doc", ncols=100):
+        if not index.add(doc):
+            skipped += 1
+    path = index.save()
+    print(f"✅ {collection_name}: indexed {len(index.ids):,} documents ({skipped:,} without a usable vector) → {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build local pre-filter indexes for filtered vector search")
+    parser.add_argument("--collection", choices=BASE_COLLECTIONS, action="append", help="Collection to index (default: all)")
+    args = parser.parse_args()
+
+    client = DataAPIClient(ASTRA_DB_APPLICATION_TOKEN)
+    database = client.get_database(ASTRA_DB_API_ENDPOINT)
+
+    for base_name in args.collection or BASE_COLLECTIONS:
+        build(database, collection_name_for(base_name))
+
+
+if __name__ == "__main__":
+    main()
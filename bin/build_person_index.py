@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Build the person-id → titles index used for person filters and person pages.
+
+Reads the cast_ids/crew_ids recorded at ingest (falling back to ids inside
+cast_details) and ranks each person's titles by billing, then popularity.
+Documents written before ingest recorded person ids are skipped; re-crawl
+or run update_astra_movies.py to pick them up.
+"""
+
+import os
+from collections import defaultdict
+from dotenv import load_dotenv
+from astrapy import DataAPIClient
+from tqdm import tqdm
+from embeddings import collection_name_for
+
+import functions_path  # noqa: F401
+from person_index import CREW_BILLING, rank_credits, save_index
+
+load_dotenv()
+
+ASTRA_DB_APPLICATION_TOKEN = os.getenv("ASTRA_DB_APPLICATION_TOKEN")
+ASTRA_DB_API_ENDPOINT = os.getenv("ASTRA_DB_API_ENDPOINT")
+
+PROJECTION = {"_id": 1, "popularity": 1, "cast_ids": 1, "crew_ids": 1, "cast_details": 1}
+
+
+def person_credits(doc):
+    """Yield (person_id, billing_order) for every credited person in a document."""
+    cast_ids = doc.get('cast_ids')
+    if cast_ids is None:
+        cast_ids = [c.get('id') for c in doc.get('cast_details') or [] if isinstance(c, dict)]
+    for order, person_id in enumerate(cast_ids):
+        if person_id is not None:
+            yield person_id, order
+    for person_id in doc.get('crew_ids') or []:
+        yield person_id, CREW_BILLING
+
+
+def build(collection):
+    credits = defaultdict(list)
+    for doc in tqdm(collection.find({}, projection=PROJECTION), desc=collection.name, unit="doc", ncols=100):
+        popularity = doc.get('popularity') or 0
+        for person_id, order in person_credits(doc):
+            credits[str(person_id)].append((order, popularity, doc['_id']))
+    return {person_id: rank_credits(person_titles) for person_id, person_titles in credits.items()}
+
+
+def main():
+    client = DataAPIClient(ASTRA_DB_APPLICATION_TOKEN)
+    database = client.get_database(ASTRA_DB_API_ENDPOINT)
+
+    collections = {}
+    for base_name in ["movies2026", "tvshows2026"]:
+        collection = database.get_collection(collection_name_for(base_name))
+        collections[collection.name] = build(collection)
+        print(f"✅ {collection.name}: {len(collections[collection.name]):,} people indexed")
+
+    path = save_index(collections)
+    print(f"Person index written to {path}")
+
+
+if __name__ == "__main__":
+    main()
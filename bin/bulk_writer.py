@@ -0,0 +1,101 @@
+"""
+Chunked, concurrent upserts into an Astra DB collection.
+
+bulk_upsert() splits prepared documents into chunks of ASTRA_WRITE_CHUNK
+(default 20) and sends each chunk as one unordered insert_many on a small
+thread pool (ASTRA_WRITE_CONCURRENCY chunks in flight, default 4), so a page
+of titles costs one round trip instead of one per document. Documents a chunk
+could not insert (ids that already exist, or a failed request) are retried
+one by one as find_one_and_replace upserts with backoff; only the ids that
+still fail are reported back. With replace=True (rewriting documents that
+are known to exist, e.g. --reprocess-from-cache) the insert attempt is
+skipped and every document goes straight to find_one_and_replace.
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+
+load_dotenv()
+
+ASTRA_WRITE_CHUNK = int(os.getenv("ASTRA_WRITE_CHUNK", "20"))
+ASTRA_WRITE_CONCURRENCY = int(os.getenv("ASTRA_WRITE_CONCURRENCY", "4"))
+ASTRA_WRITE_RETRIES = 3
+
+
+def _inserted_ids(error):
+    """Ids a failed insert_many still wrote, or None if the error does not say."""
+    partial = getattr(error, "partial_result", None)
+    ids = getattr(partial, "inserted_ids", None)
+    if ids is None:
+        ids = getattr(error, "inserted_ids", None)
+    return ids
+
+
+def _upsert_one(collection, doc, retries):
+    for attempt in range(retries):
+        try:
+            collection.find_one_and_replace({"_id": doc["_id"]}, doc, upsert=True)
+            return True
+        except Exception:
+            if attempt + 1 < retries:
+                time.sleep(2 ** attempt)
+    return False
+
+
+def _write_chunk(collection, chunk, retries, replace=False):
+    """Write one chunk; returns (written, failed_ids, seconds)."""
+    started = time.monotonic()
+    done = set()
+    if not replace:
+        try:
+            collection.insert_many(chunk, ordered=False)
+            return len(chunk), [], time.monotonic() - started
+        except Exception as e:
+            inserted = _inserted_ids(e)
+            done = set(inserted) if inserted is not None else set()
+
+    written = len(done)
+    failed = []
+    for doc in chunk:
+        if doc["_id"] in done:
+            continue
+        if _upsert_one(collection, doc, retries):
+            written += 1
+        else:
+            failed.append(doc["_id"])
+    return written, failed, time.monotonic() - started
+
+
+def bulk_upsert(collection, documents, chunk_size=ASTRA_WRITE_CHUNK,
+                concurrency=ASTRA_WRITE_CONCURRENCY, retries=ASTRA_WRITE_RETRIES, replace=False):
+    """
+    Upsert `documents` (dicts with an "_id") in chunks. Returns a dict with the
+    number `written`, the `failed_ids` and the `chunk_seconds` of every chunk.
+    `replace` skips the insert_many attempt when the documents already exist.
+    """
+    result = {"written": 0, "failed_ids": [], "chunk_seconds": []}
+    documents = list(documents)
+    if not documents:
+        return result
+    chunks = [documents[i:i + chunk_size] for i in range(0, len(documents), chunk_size)]
+    if len(chunks) == 1:
+        outcomes = [_write_chunk(collection, chunks[0], retries, replace)]
+    else:
+        with ThreadPoolExecutor(max_workers=min(concurrency, len(chunks)), thread_name_prefix="astra") as pool:
+            outcomes = list(pool.map(lambda chunk: _write_chunk(collection, chunk, retries, replace), chunks))
+    for written, failed, seconds in outcomes:
+        result["written"] += written
+        result["failed_ids"].extend(failed)
+        result["chunk_seconds"].append(seconds)
+    return result
+
+
+def format_latency(result):
+    """One-line summary of per-chunk write latency, e.g. for a progress bar."""
+    seconds = sorted(result["chunk_seconds"])
+    if not seconds:
+        return "no writes"
+    median = seconds[len(seconds) // 2]
+    return f"{result['written']} written in {len(seconds)} chunk(s), p50 {median:.2f}s, max {seconds[-1]:.2f}s"
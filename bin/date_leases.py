@@ -0,0 +1,138 @@
+"""
+Leased date ranges, so several by-date crawlers can run at once.
+
+The crawl span is split into ranges of CRAWL_RANGE_DAYS days (default 365),
+each stored as a document in the crawler's metadata collection:
+
+    {"_id": "range:2025-12-31:2025-01-01", "kind": "date_range",
+     "newest": "2025-12-31", "oldest": "2025-01-01", "next": "2025-06-14",
+     "status": "leased", "owner": "host-1234", "lease_expires": 1767225600.0}
+
+A worker claims a pending range, or one whose lease has expired, with a
+single find_one_and_update, walks it from `next` back to `oldest` and
+checkpoints `next` after every finished day, which also renews the lease
+(CRAWL_LEASE_SECONDS, default 3600). A crashed worker's range is reclaimed
+once its lease runs out and resumes where it stopped; a worker whose lease
+was taken over stops working on that range.
+"""
+
+import os
+import time
+import socket
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+
+load_dotenv()
+
+CRAWL_RANGE_DAYS = int(os.getenv("CRAWL_RANGE_DAYS", "365"))
+CRAWL_LEASE_SECONDS = int(os.getenv("CRAWL_LEASE_SECONDS", "3600"))
+RANGE_KIND = "date_range"
+DATE_FORMAT = "%Y-%m-%d"
+
+
+def worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def _parse(date_str):
+    return datetime.strptime(date_str, DATE_FORMAT)
+
+
+def partition(newest, oldest, range_days=CRAWL_RANGE_DAYS):
+    """(newest, oldest) date strings of consecutive ranges, newest first."""
+    current = _parse(newest)
+    end = _parse(oldest)
+    while current >= end:
+        range_end = max(current - timedelta(days=range_days - 1), end)
+        yield current.strftime(DATE_FORMAT), range_end.strftime(DATE_FORMAT)
+        current = range_end - timedelta(days=1)
+
+
+def seed_ranges(metadata_col, newest, oldest, range_days=CRAWL_RANGE_DAYS):
+    """
+    Create the range documents on the first run; returns how many were
+    created. Existing ranges are never re-partitioned, so changing
+    CRAWL_RANGE_DAYS later cannot produce overlapping ranges.
+    """
+    if metadata_col.find_one({"kind": RANGE_KIND}, projection={"_id": 1}):
+        return 0
+    docs = [
+        {
+            "_id": f"range:{range_newest}:{range_oldest}",
+            "kind": RANGE_KIND,
+            "newest": range_newest,
+            "oldest": range_oldest,
+            "next": range_newest,
+            "status": "pending",
+            "owner": None,
+            "lease_expires": 0,
+        }
+        for range_newest, range_oldest in partition(newest, oldest, range_days)
+    ]
+    try:
+        metadata_col.insert_many(docs, ordered=False)
+    except Exception:
+        # Another worker seeded at the same time; its documents are identical
+        pass
+    return len(docs)
+
+
+def acquire(metadata_col, owner, lease_seconds=CRAWL_LEASE_SECONDS):
+    """Claim the newest pending or expired range; returns its document, or None when none are left."""
+    now = time.time()
+    return metadata_col.find_one_and_update(
+        {
+            "kind": RANGE_KIND,
+            "$or": [
+                {"status": "pending"},
+                {"status": "leased", "lease_expires": {"$lt": now}},
+            ],
+        },
+        {"$set": {"status": "leased", "owner": owner, "lease_expires": now + lease_seconds}},
+        sort={"newest": -1},
+        return_document="after",
+    )
+
+
+def lease_days(lease):
+    """Date strings still to crawl in a leased range, newest first."""
+    current = _parse(lease["next"])
+    end = _parse(lease["oldest"])
+    while current >= end:
+        yield current.strftime(DATE_FORMAT)
+        current -= timedelta(days=1)
+
+
+def _update_owned(metadata_col, lease, owner, fields):
+    return metadata_col.find_one_and_update(
+        {"_id": lease["_id"], "owner": owner, "status": "leased"},
+        {"$set": fields},
+        return_document="after",
+    ) is not None
+
+
+def checkpoint(metadata_col, lease, done_date, owner, lease_seconds=CRAWL_LEASE_SECONDS):
+    """Record `done_date` as finished and renew the lease; False if the lease was lost."""
+    next_date = (_parse(done_date) - timedelta(days=1)).strftime(DATE_FORMAT)
+    return _update_owned(metadata_col, lease, owner, {
+        "next": next_date,
+        "lease_expires": time.time() + lease_seconds,
+        "updated_at": datetime.utcnow().isoformat(),
+    })
+
+
+def complete(metadata_col, lease, owner):
+    return _update_owned(metadata_col, lease, owner, {"status": "done", "lease_expires": 0})
+
+
+def release(metadata_col, lease, owner):
+    """Hand an unfinished range back so another worker can pick it up immediately."""
+    return _update_owned(metadata_col, lease, owner, {"status": "pending", "owner": None, "lease_expires": 0})
+
+
+def summary(metadata_col):
+    """{status: range count} across all ranges."""
+    counts = {}
+    for doc in metadata_col.find({"kind": RANGE_KIND}, projection={"status": 1}):
+        counts[doc.get("status")] = counts.get(doc.get("status"), 0) + 1
+    return counts
@@ -0,0 +1,101 @@
+"""
+Adaptive partitioning of TMDB discover queries under the 500-page cap.
+
+Discover returns at most 500 pages (10,000 results) for one query. partition()
+requests page 1 of a range and, while the range has more pages than that,
+splits it in half along the first dimension that can still be split (release
+date, then vote average, then vote count) and recurses. Empty ranges cost
+that one request and are dropped, and every leaf it yields fits under the
+cap, so crawling every page of every leaf covers the whole range with the
+fewest discover calls. Page 1 of each leaf is asked for again by the crawl,
+which the raw-response cache (tmdb_cache.py) answers.
+
+TMDB has no popularity filter, so vote count bands stand in for popularity
+as the last dimension.
+"""
+
+from datetime import datetime, timedelta
+
+MAX_PAGES = 500
+DATE_FORMAT = "%Y-%m-%d"
+# Above the vote count of any title
+MAX_VOTE_COUNT = 1_000_000
+# Vote averages are continuous; bands narrower than this are not split
+VOTE_AVERAGE_RESOLUTION = 0.1
+
+# (gte parameter, lte parameter, kind, lowest, highest)
+VOTE_DIMENSIONS = [
+    ("vote_average.gte", "vote_average.lte", "float", 0.0, 10.0),
+    ("vote_count.gte", "vote_count.lte", "int", 0, MAX_VOTE_COUNT),
+]
+
+
+def date_dimension(gte_key, lte_key, oldest, newest):
+    return (gte_key, lte_key, "date", oldest, newest)
+
+
+def describe(params):
+    """Short label for a partition, e.g. "vote_average 5.0-7.5, vote_count 0-499"."""
+    names = dict.fromkeys(key.rsplit(".", 1)[0] for key in params)
+    return ", ".join(f"{name} {params.get(name + '.gte', '')}-{params.get(name + '.lte', '')}" for name in names) or "all"
+
+
+def _split(params, dimension):
+    """Two halves of `params` along one dimension, or None if it is too narrow to split."""
+    gte_key, lte_key, kind, lowest, highest = dimension
+    lo = params.get(gte_key, lowest)
+    hi = params.get(lte_key, highest)
+    if kind == "date":
+        first, last = datetime.strptime(lo, DATE_FORMAT), datetime.strptime(hi, DATE_FORMAT)
+        if first >= last:
+            return None
+        middle = first + timedelta(days=(last - first).days // 2)
+        bounds = [(lo, middle.strftime(DATE_FORMAT)), ((middle + timedelta(days=1)).strftime(DATE_FORMAT), hi)]
+    elif kind == "int":
+        if hi - lo < 1:
+            return None
+        middle = (lo + hi) // 2
+        bounds = [(lo, middle), (middle + 1, hi)]
+    else:
+        if hi - lo < VOTE_AVERAGE_RESOLUTION * 2:
+            return None
+        # Both halves include the midpoint: the filters are inclusive and the values continuous
+        middle = round((lo + hi) / 2, 2)
+        bounds = [(lo, middle), (middle, hi)]
+    return [dict(params, **{gte_key: gte, lte_key: lte}) for gte, lte in bounds]
+
+
+def partition(discover, params, dimensions, max_pages=MAX_PAGES):
+    """
+    Yield (params, total_results, total_pages) leaves covering `params`, each
+    with at most `max_pages` pages. `discover(page, params)` returns a
+    discover response. A leaf that cannot be split any further is yielded
+    capped at `max_pages`, with a warning; a range whose request fails is
+    reported and skipped.
+    """
+    stack = [params]
+    while stack:
+        current = stack.pop()
+        try:
+            data = discover(1, current)
+        except Exception as e:
+            print(f"\n⚠️  Error checking {describe(current)}: {e}")
+            continue
+        total_results = data.get('total_results', 0)
+        total_pages = data.get('total_pages', 0)
+        if not total_results:
+            continue
+        if total_pages <= max_pages:
+            yield current, total_results, total_pages
+            continue
+        halves = None
+        for dimension in dimensions:
+            halves = _split(current, dimension)
+            if halves:
+                break
+        if not halves:
+            print(f"\n⚠️  {describe(current)} has {total_pages} pages and cannot be split further - capping at {max_pages}")
+            yield current, total_results, max_pages
+            continue
+        # Pop the first half next, so leaves come out in dimension order
+        stack.extend(reversed(halves))
@@ -0,0 +1,79 @@
+"""
+Persistent cache of embedding vectors, shared by every embedding call in
+embeddings.py.
+
+Vectors are keyed by sha256(model, dimensions, text), so re-running a
+backfill, or a nightly update where only a watch provider or vote count
+changed, re-uses the stored vector instead of calling the API. Storage is
+one SQLite file (cache/embeddings.sqlite) holding float32 blobs; WAL mode
+lets the crawler's threads and parallel scripts read and write it at once.
+
+Set EMBEDDING_CACHE=0 to bypass the cache, EMBEDDING_CACHE_PATH to move it.
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from array import array
+from dotenv import load_dotenv
+
+load_dotenv()
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+EMBEDDING_CACHE = os.getenv("EMBEDDING_CACHE", "1") != "0"
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", os.path.join(ROOT_DIR, "cache", "embeddings.sqlite"))
+
+# SQLite limits the number of ? parameters per statement
+LOOKUP_CHUNK = 500
+
+_local = threading.local()
+
+
+def cache_key(model, dimensions, text):
+    return hashlib.sha256(f"{model}\n{dimensions}\n{text}".encode("utf-8")).hexdigest()
+
+
+def _connection():
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        os.makedirs(os.path.dirname(EMBEDDING_CACHE_PATH), exist_ok=True)
+        conn = sqlite3.connect(EMBEDDING_CACHE_PATH, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, dimensions INTEGER NOT NULL, vector BLOB NOT NULL, created_at REAL NOT NULL)"
+        )
+        _local.conn = conn
+    return conn
+
+
+def lookup(keys):
+    """{key: vector} for the keys that are cached."""
+    found = {}
+    keys = list(dict.fromkeys(keys))
+    conn = _connection()
+    for i in range(0, len(keys), LOOKUP_CHUNK):
+        chunk = keys[i:i + LOOKUP_CHUNK]
+        rows = conn.execute(
+            f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+        )
+        for key, blob in rows:
+            vector = array("f")
+            vector.frombytes(blob)
+            found[key] = vector.tolist()
+    return found
+
+
+def store(items):
+    """Save [(key, vector), ...]; existing keys are overwritten."""
+    if not items:
+        return
+    now = time.time()
+    conn = _connection()
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (key, dimensions, vector, created_at) VALUES (?, ?, ?, ?)",
+            [(key, len(vector), array("f", vector).tobytes(), now) for key, vector in items],
+        )
@@ -0,0 +1,217 @@
+import os
+import math
+import time
+from dotenv import load_dotenv
+import embedding_cache
+from rate_limiter import RETRYABLE_STATUS, AdaptiveRateLimiter, backoff_delay, parse_retry_after
+
+load_dotenv()
+
+# Embedding configuration shared by the ingestion scripts.
+# text-embedding-3-small natively returns 1536 dimensions, but the API can
+# return shortened vectors (e.g. 256 or 512) via the `dimensions` parameter.
+EMBEDDING_MODEL = "text-embedding-3-small"
+DEFAULT_EMBEDDING_DIMENSIONS = 1536
+EMBEDDING_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS", DEFAULT_EMBEDDING_DIMENSIONS))
+
+
+def collection_name_for(base_name, dimensions=EMBEDDING_DIMENSIONS):
+    """
+    Name of the vector collection holding embeddings of the given size.
+    Full-size vectors keep the original collection name; reduced-dimension
+    vectors live in a parallel collection, e.g. movies2026_d256.
+    """
+    if dimensions == DEFAULT_EMBEDDING_DIMENSIONS:
+        return base_name
+    return f"{base_name}_d{dimensions}"
+
+
+def embedding_request_params(dimensions=EMBEDDING_DIMENSIONS):
+    """Keyword arguments for openai_client.embeddings.create()."""
+    params = {"model": EMBEDDING_MODEL, "encoding_format": "float"}
+    if dimensions != DEFAULT_EMBEDDING_DIMENSIONS:
+        params["dimensions"] = dimensions
+    return params
+
+
+# OpenAI requests/second: starts at OPENAI_RATE_LIMIT and adapts up to
+# OPENAI_RATE_MAX, halving on 429s (see rate_limiter.AdaptiveRateLimiter)
+OPENAI_RATE_LIMIT = float(os.getenv("OPENAI_RATE_LIMIT", "10"))
+OPENAI_RATE_MAX = float(os.getenv("OPENAI_RATE_MAX", "50"))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "5"))
+
+openai_limiter = AdaptiveRateLimiter(OPENAI_RATE_LIMIT, OPENAI_RATE_MAX)
+
+
+def _is_retryable(error):
+    """429s, 5xx responses and connection errors; anything else is about the input."""
+    status = getattr(error, "status_code", None)
+    # APIConnectionError / APITimeoutError carry no status code
+    transient = status is None and type(error).__name__ in ("APIConnectionError", "APITimeoutError")
+    return status == 429 or status in RETRYABLE_STATUS or transient
+
+
+def _request_embeddings(openai_client, text_input, dimensions):
+    """
+    embeddings.create() behind the shared limiter. The client's own retries
+    are turned off so 429s reach the limiter; 429s, 5xx responses and
+    connection errors are retried here with backoff.
+    """
+    client = openai_client.with_options(max_retries=0)
+    attempt = 0
+    while True:
+        openai_limiter.acquire()
+        try:
+            response = client.embeddings.create(input=text_input, **embedding_request_params(dimensions))
+        except Exception as e:
+            if attempt >= OPENAI_MAX_RETRIES or not _is_retryable(e):
+                raise
+            if getattr(e, "status_code", None) == 429:
+                headers = getattr(getattr(e, "response", None), "headers", {}) or {}
+                delay = openai_limiter.throttle(parse_retry_after(headers.get("retry-after")))
+            else:
+                delay = backoff_delay(attempt)
+            openai_limiter.retry()
+            attempt += 1
+            time.sleep(delay)
+            continue
+        openai_limiter.success()
+        return response
+
+
+def create_embedding(openai_client, text, dimensions=EMBEDDING_DIMENSIONS):
+    """Generate a single embedding of the configured size (cached, see embedding_cache.py)."""
+    key = embedding_cache.cache_key(EMBEDDING_MODEL, dimensions, text)
+    if embedding_cache.EMBEDDING_CACHE:
+        cached = embedding_cache.lookup([key])
+        if key in cached:
+            return cached[key]
+    response = _request_embeddings(openai_client, text, dimensions)
+    vector = response.data[0].embedding
+    if embedding_cache.EMBEDDING_CACHE:
+        embedding_cache.store([(key, vector)])
+    return vector
+
+
+def truncate_and_normalize(vector, dimensions):
+    """
+    Shorten an existing embedding without calling the API.
+    text-embedding-3 vectors are trained so that a prefix is itself a usable
+    embedding once rescaled back to unit length.
+    """
+    truncated = list(vector[:dimensions])
+    norm = math.sqrt(sum(v * v for v in truncated))
+    if norm == 0:
+        return truncated
+    return [v / norm for v in truncated]
+
+
+# Batched requests: the embeddings endpoint accepts a list of inputs, so the
+# ingestion scripts send one request per batch instead of one per title.
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "100"))
+# Stay well under the API's per-request token limit (300k)
+EMBEDDING_BATCH_TOKENS = int(os.getenv("EMBEDDING_BATCH_TOKENS", "200000"))
+MAX_INPUT_TOKENS = 8191
+
+
+def estimate_tokens(text):
+    """
+    Cheap upper-bound token estimate: English averages ~4 characters per
+    token, so counting one token per 3 characters overestimates.
+    """
+    return len(text) // 3 + 1
+
+
+def create_embeddings(openai_client, texts, dimensions=EMBEDDING_DIMENSIONS):
+    """
+    Embed a list of texts in one request. Returns a list aligned with `texts`
+    holding either a vector or the exception for that input. If the request
+    is rejected, the batch is split in half and retried so a single bad input
+    only fails itself; a rate limit or outage that outlasted the retries fails
+    the whole batch instead of multiplying requests. Texts already in the
+    embedding cache are not sent.
+    """
+    results = [None] * len(texts)
+    sendable = []
+    for i, text in enumerate(texts):
+        if not text or not text.strip():
+            results[i] = ValueError("Empty embedding input")
+        elif estimate_tokens(text) > MAX_INPUT_TOKENS * 3:
+            # Far beyond the model's context even allowing for the rough estimate
+            results[i] = ValueError("Embedding input too long")
+        else:
+            sendable.append(i)
+
+    if embedding_cache.EMBEDDING_CACHE and sendable:
+        keys = {i: embedding_cache.cache_key(EMBEDDING_MODEL, dimensions, texts[i]) for i in sendable}
+        cached = embedding_cache.lookup(keys.values())
+        for i in sendable:
+            if keys[i] in cached:
+                results[i] = cached[keys[i]]
+        sendable = [i for i in sendable if results[i] is None]
+
+    def embed(indices):
+        try:
+            response = _request_embeddings(openai_client, [texts[i] for i in indices], dimensions)
+            for item in response.data:
+                results[indices[item.index]] = item.embedding
+        except Exception as e:
+            if len(indices) == 1 or _is_retryable(e):
+                for i in indices:
+                    results[i] = e
+                return
+            middle = len(indices) // 2
+            embed(indices[:middle])
+            embed(indices[middle:])
+
+    if sendable:
+        embed(sendable)
+        if embedding_cache.EMBEDDING_CACHE:
+            embedding_cache.store([
+                (keys[i], results[i]) for i in sendable if not isinstance(results[i], Exception)
+            ])
+    return results
+
+
+class BatchEmbedder:
+    """
+    Collects (key, text) pairs and embeds them in batches of up to
+    `batch_size` inputs or `token_budget` estimated tokens. add() and flush()
+    return the finished batch as [(key, vector, error), ...] with exactly one
+    of vector/error set.
+    """
+
+    def __init__(self, openai_client, batch_size=EMBEDDING_BATCH_SIZE,
+                 token_budget=EMBEDDING_BATCH_TOKENS, dimensions=EMBEDDING_DIMENSIONS):
+        self.openai_client = openai_client
+        self.batch_size = batch_size
+        self.token_budget = token_budget
+        self.dimensions = dimensions
+        self._pending = []
+        self._tokens = 0
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, key, text):
+        done = []
+        tokens = estimate_tokens(text or "")
+        if self._pending and self._tokens + tokens > self.token_budget:
+            done = self.flush()
+        self._pending.append((key, text))
+        self._tokens += tokens
+        if len(self._pending) >= self.batch_size:
+            done += self.flush()
+        return done
+
+    def flush(self):
+        if not self._pending:
+            return []
+        keys = [key for key, _ in self._pending]
+        vectors = create_embeddings(self.openai_client, [text for _, text in self._pending], self.dimensions)
+        self._pending = []
+        self._tokens = 0
+        return [
+            (key, None, vector) if isinstance(vector, Exception) else (key, vector, None)
+            for key, vector in zip(keys, vectors)
+        ]
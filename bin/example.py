@@ -7,6 +7,13 @@ from dotenv import load_dotenv
 from astrapy import DataAPIClient
 from openai import OpenAI
 from tqdm import tqdm
+from embeddings import EMBEDDING_MODEL, EMBEDDING_DIMENSIONS, collection_name_for, create_embedding, BatchEmbedder
+from known_ids import KnownIds
+from bulk_writer import bulk_upsert
+from tmdb_fetcher import fetch_details, tmdb_get_json
+
+import functions_path  # noqa: F401
+from provider_catalog import key_crew_ids, provider_ids_by_payment_type
 
 # Load environment variables
 load_dotenv()
@@ -28,9 +35,9 @@ if not ASTRA_DB_APPLICATION_TOKEN:
     raise ValueError("ASTRA_DB_APPLICATION_TOKEN not found in .env file")
 
 TMDB_BASE_URL = "https://api.themoviedb.org/3"
-COLLECTION_NAME = "moviesnew"
-EMBEDDING_MODEL = "text-embedding-3-small"  # 1536 dimensions
-EMBEDDING_DIMENSIONS = 1536
+# IDs fetched concurrently per crawl step; the shared limiter sets the pace
+FETCH_WINDOW = 50
+COLLECTION_NAME = collection_name_for("moviesnew")
 
 # Initialize OpenAI client
 openai_client = OpenAI(api_key=OPENAI_API_KEY)
@@ -80,9 +87,7 @@ def discover_movies(page=1, min_runtime=60):
         # Note: vote_count filter removed - we filter conditionally based on release date
     }
     
-    response = requests.get(url, params=params)
-    response.raise_for_status()
-    return response.json()
+    return tmdb_get_json(url, params=params)
 
 
 def get_movie_full_details(movie_id):
@@ -94,9 +99,7 @@ def get_movie_full_details(movie_id):
         "append_to_response": "credits,keywords,videos,images,reviews,recommendations,similar,watch/providers,release_dates,external_ids"
     }
     
-    response = requests.get(url, params=params)
-    response.raise_for_status()
-    return response.json()
+    return tmdb_get_json(url, params=params)
 
 
 def create_embedding_text(movie_details):
@@ -150,12 +153,7 @@ def create_embedding_text(movie_details):
 
 def generate_embedding(text):
     """Generate embedding using OpenAI API."""
-    response = openai_client.embeddings.create(
-        model=EMBEDDING_MODEL,
-        input=text,
-        encoding_format="float"
-    )
-    return response.data[0].embedding
+    return create_embedding(openai_client, text)
 
 
 def prepare_movie_document(movie_details, embedding):
@@ -174,14 +172,16 @@ def prepare_movie_document(movie_details, embedding):
     # Extract cast and crew
     credits = movie_details.get('credits', {})
     cast = [
-        {'name': c['name'], 'character': c.get('character', ''), 'order': c.get('order', 999)}
+        {'id': c.get('id'), 'name': c['name'], 'character': c.get('character', ''), 'order': c.get('order', 999)}
         for c in credits.get('cast', [])[:20]  # Top 20 cast members
     ]
+    cast_ids = [c['id'] for c in cast if c['id'] is not None]
     
     crew = credits.get('crew', [])
     directors = [c['name'] for c in crew if c['job'] == 'Director']
     writers = [c['name'] for c in crew if c['department'] == 'Writing'][:5]
     producers = [c['name'] for c in crew if c['job'] == 'Producer'][:5]
+    crew_ids = key_crew_ids(crew)
     
     # Document structure
     document = {
@@ -215,6 +215,8 @@ def prepare_movie_document(movie_details, embedding):
         "writers": writers,
         "producers": producers,
         "cast": cast,
+        "cast_ids": cast_ids,
+        "crew_ids": crew_ids,
         
         # Production
         "production_companies": [c['name'] for c in movie_details.get('production_companies', [])],
@@ -222,6 +224,7 @@ def prepare_movie_document(movie_details, embedding):
         
         # Watch Providers
         "watch_providers": watch_providers,
+        "watch_provider_ids": provider_ids_by_payment_type(wp_data.get('US')),
         
         # External IDs
         "imdb_id": movie_details.get('external_ids', {}).get('imdb_id'),
@@ -242,11 +245,20 @@ def prepare_movie_document(movie_details, embedding):
     return document
 
 
-def process_and_insert_movie(collection, movie_id, progress_bar=None):
-    """Process a single movie and insert into Astra DB."""
+def process_and_insert_movie(collection, movie_id, progress_bar=None, prefetched=None, embedder=None, known_ids=None):
+    """
+    Process a single movie and insert into Astra DB. `prefetched` is the
+    (details, error) pair from fetch_details; without it details are fetched here.
+    With an `embedder` the movie is queued for batched embedding instead and
+    "queued" is returned; insert_embedded() writes it once the batch is flushed.
+    `known_ids` (a KnownIds) answers the existence check without a query.
+    """
     try:
         # Check if movie already exists in database
-        existing = collection.find_one({"tmdb_id": movie_id})
+        if known_ids is not None:
+            existing = movie_id in known_ids
+        else:
+            existing = collection.find_one({"tmdb_id": movie_id})
         if existing:
             if progress_bar is not None:
                 progress_bar.set_postfix_str(f"⏭️  Already exists")
@@ -254,7 +266,12 @@ def process_and_insert_movie(collection, movie_id, progress_bar=None):
         
         # Get full movie details
         try:
-            movie_details = get_movie_full_details(movie_id)
+            if prefetched is None:
+                movie_details = get_movie_full_details(movie_id)
+            else:
+                movie_details, fetch_error = prefetched
+                if fetch_error:
+                    raise fetch_error
         except requests.exceptions.HTTPError as e:
             if e.response.status_code == 404:
                 if progress_bar is not None:
@@ -297,6 +314,9 @@ def process_and_insert_movie(collection, movie_id, progress_bar=None):
         # Create embedding text
         embedding_text = create_embedding_text(movie_details)
         
+        if embedder is not None:
+            return ("queued", embedder.add(movie_details, embedding_text))
+        
         # Generate embedding
         embedding = generate_embedding(embedding_text)
         
@@ -318,6 +338,29 @@ def process_and_insert_movie(collection, movie_id, progress_bar=None):
         return False
 
 
+def insert_embedded(collection, finished, stats, known_ids=None):
+    """Insert a finished embedding batch: [(movie_details, embedding, error), ...]."""
+    documents = []
+    for movie_details, embedding, error in finished:
+        try:
+            if error:
+                raise error
+            documents.append(prepare_movie_document(movie_details, embedding))
+        except Exception as e:
+            stats['errors'] += 1
+            print(f"\n⚠️  Error preparing movie {movie_details.get('id')}: {str(e)}")
+    if not documents:
+        return
+    result = bulk_upsert(collection, documents)
+    if known_ids is not None:
+        failed = set(result['failed_ids'])
+        known_ids.add(doc['tmdb_id'] for doc in documents if doc['_id'] not in failed)
+    stats['inserted'] += result['written']
+    stats['errors'] += len(result['failed_ids'])
+    for movie_id in result['failed_ids']:
+        print(f"\n⚠️  Error inserting movie {movie_id}")
+
+
 def get_latest_tmdb_id(collection):
     """Get the highest TMDB ID currently in the database."""
     try:
@@ -356,39 +399,56 @@ def crawl_and_populate(start_id=1):
     
     # Process IDs indefinitely
     pbar = tqdm(initial=current_id, unit="id", desc="Processing", ncols=100)
+    embedder = BatchEmbedder(openai_client)
+    # Existence checks are answered from a local index of the stored ids
+    known_ids = KnownIds(collection)
+    pbar.write(f"📚 Loaded {known_ids.load():,} known ids")
     
     while True:
-        current_id += 1
+        # Fetch a window of IDs concurrently, then process them in order
+        batch_ids = list(range(current_id + 1, current_id + 1 + FETCH_WINDOW))
         try:
-            stats['processed'] += 1
-            
-            # Process and insert
-            success = process_and_insert_movie(collection, current_id, pbar)
-            
-            if success == True:
-                stats['inserted'] += 1
-                pbar.set_description(f"Processing ID {current_id} (Inserted)")
-            elif success == "exists":
-                stats['already_exists'] += 1
-                pbar.set_description(f"Processing ID {current_id} (Exists)")
-            elif success == "not_found":
-                stats['not_found'] += 1
-                pbar.set_description(f"Processing ID {current_id} (404)")
-            else:
-                stats['skipped'] += 1
-                pbar.set_description(f"Processing ID {current_id} (Skipped)")
+            # Stored IDs are skipped without fetching their details
+            new_ids = known_ids.filter_new(batch_ids)
+            skipped = len(batch_ids) - len(new_ids)
+            stats['processed'] += skipped
+            stats['already_exists'] += skipped
+            pbar.update(skipped)
             
-            pbar.update(1)
-            
-            # Rate limiting - be nice to APIs
-            time.sleep(0.1)
+            for movie_id, movie_details, fetch_error in fetch_details(new_ids, get_movie_full_details):
+                current_id = movie_id
+                stats['processed'] += 1
+                
+                # Process and insert
+                success = process_and_insert_movie(collection, current_id, pbar, (movie_details, fetch_error),
+                                                   embedder, known_ids)
+                
+                if isinstance(success, tuple):
+                    insert_embedded(collection, success[1], stats, known_ids)
+                    pbar.set_description(f"Processing ID {current_id} (Queued)")
+                elif success == "exists":
+                    stats['already_exists'] += 1
+                    pbar.set_description(f"Processing ID {current_id} (Exists)")
+                elif success == "not_found":
+                    stats['not_found'] += 1
+                    pbar.set_description(f"Processing ID {current_id} (404)")
+                else:
+                    stats['skipped'] += 1
+                    pbar.set_description(f"Processing ID {current_id} (Skipped)")
+                
+                pbar.update(1)
+                
+                # Periodic status update
+                if stats['processed'] % 100 == 0:
+                    pbar.write(f"Stats: {stats['inserted']} inserted, {stats['skipped']} skipped, {stats['not_found']} 404s")
             
-            # Periodic status update
-            if stats['processed'] % 100 == 0:
-                pbar.write(f"Stats: {stats['inserted']} inserted, {stats['skipped']} skipped, {stats['not_found']} 404s")
+            # Resume is based on the highest stored ID, so write each window before moving on
+            insert_embedded(collection, embedder.flush(), stats, known_ids)
+            current_id = batch_ids[-1]
                 
         except KeyboardInterrupt:
             print("\n\n🛑 Stopping crawl...")
+            insert_embedded(collection, embedder.flush(), stats, known_ids)
             break
         except Exception as e:
             print(f"\n⚠️  Error on ID {current_id}: {str(e)}")
@@ -2,76 +2,209 @@
 """
 Export unique autocomplete entries from Astra DB to a static JSON file.
 This file can be loaded once on page start for instant in-memory filtering.
+The browser's binary copy (public/autocomplete.bin) and the "movies" prefix
+shards are published by merge_autocomplete.py only, from the merged entries
+that carry ids; this export does not write them.
+
+Each entry carries a compact integer score (title popularity and vote count;
+summed title popularity for people and genres), and entries are sorted
+best-first within each two-character prefix bucket so top-N prefix results
+can be read off the front of a bucket without sorting at query time.
+
+The export streams: the collection is scanned with a minimal projection,
+sorted runs are spilled to temp files and k-way merged with deduplication,
+and the JSON is written incrementally. Pass --debug for an indented copy,
+or --json-only to skip the trigram index, which holds every entry in memory.
 """
 
 import os
 import json
 import gzip
+import heapq
+import argparse
+import tempfile
 from dotenv import load_dotenv
 from astrapy import DataAPIClient
+from embeddings import collection_name_for
+
+import functions_path  # noqa: F401
+from autocomplete import BUCKET_SORT_MARKER, normalize_name, popularity_score, prefix_bucket, title_score
+from trigram_index import trigram_path_for, write_trigram_index
 
 load_dotenv()
 
 ASTRA_DB_APPLICATION_TOKEN = os.getenv("ASTRA_DB_APPLICATION_TOKEN")
 ASTRA_DB_API_ENDPOINT = os.getenv("ASTRA_DB_API_ENDPOINT")
 
-def main():
-    print("Connecting to Astra DB...")
-    client = DataAPIClient(ASTRA_DB_APPLICATION_TOKEN)
-    db = client.get_database(ASTRA_DB_API_ENDPOINT)
-    
-    # Read from autocomplete collection
-    autocomplete_collection = db.get_collection("autocomplete")
-    
-    print("Fetching all autocomplete documents...")
-    
-    # Use a set to deduplicate by (type, name)
-    seen = set()
-    entries = []
-    
-    # Fetch all documents
-    cursor = autocomplete_collection.find({}, projection={"type": 1, "name": 1, "searchName": 1})
-    
+SCORE_SOURCES = [("movies2026", "title"), ("tvshows2026", "name")]
+
+def collect_scores(db):
+    """
+    Scan the title collections once and return score lookups keyed by
+    normalized name: titles (best matching title wins), people and genres
+    (summed popularity of their titles).
+    """
+    title_scores = {}
+    person_popularity = {}
+    genre_popularity = {}
+    for base_name, title_field in SCORE_SOURCES:
+        collection_name = collection_name_for(base_name)
+        print(f"Collecting popularity from {collection_name}...")
+        cursor = db.get_collection(collection_name).find(
+            {}, projection={title_field: 1, "popularity": 1, "vote_count": 1, "cast": 1, "genres": 1}
+        )
+        for doc in cursor:
+            popularity = doc.get("popularity") or 0
+            title = doc.get(title_field)
+            if title:
+                key = normalize_name(title)
+                title_scores[key] = max(title_scores.get(key, 0), title_score(popularity, doc.get("vote_count")))
+            for person in doc.get("cast") or []:
+                # cast is a list of names or of {name, ...} dicts depending on the writer
+                person_name = person.get("name") if isinstance(person, dict) else person
+                if person_name:
+                    key = normalize_name(person_name)
+                    person_popularity[key] = person_popularity.get(key, 0) + popularity
+            for genre in doc.get("genres") or []:
+                genre_name = genre.get("name") if isinstance(genre, dict) else genre
+                if genre_name:
+                    key = normalize_name(genre_name)
+                    genre_popularity[key] = genre_popularity.get(key, 0) + popularity
+    return {
+        "movie": title_scores,
+        "person": {k: popularity_score(v) for k, v in person_popularity.items()},
+        "genre": {k: popularity_score(v) for k, v in genre_popularity.items()},
+    }
+
+TYPES = ["movie", "person", "genre"]
+TYPE_CODES = {t: i for i, t in enumerate(TYPES)}
+
+# Entries held in memory before a sorted run is spilled to disk
+RUN_SIZE = int(os.getenv("AUTOCOMPLETE_RUN_SIZE", "100000"))
+
+def sort_key(row):
+    """Best-first within each prefix bucket; (type, name) last so duplicates sort together."""
+    type_code, name, _, score = row
+    return (prefix_bucket(name), -score, normalize_name(name), type_code, name)
+
+def spill_run(rows, tmp_dir):
+    """Sort one run and write it to a temp file, one JSON row per line."""
+    rows.sort(key=sort_key)
+    fd, path = tempfile.mkstemp(suffix=".jsonl", dir=tmp_dir)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(row, separators=(",", ":")) + "\n")
+    return path
+
+def read_run(path):
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            yield json.loads(line)
+
+def scan_rows(cursor, scores):
+    """Compact rows [typeCode, name, searchName, score] straight off the cursor."""
     count = 0
     for doc in cursor:
         count += 1
         if count % 10000 == 0:
             print(f"  Processed {count} documents...")
-        
+
         doc_type = doc.get("type")
         name = doc.get("name")
-        search_name = doc.get("searchName", name.lower() if name else "")
-        
         if not name or not doc_type:
             continue
-            
-        key = (doc_type, name)
-        if key in seen:
-            continue
-        seen.add(key)
-        
-        # Compact format: [type, name, searchName]
+        search_name = doc.get("searchName", name.lower())
+
         # type: 0=movie, 1=person, 2=genre (for smaller file size)
-        type_code = {"movie": 0, "person": 1, "genre": 2}.get(doc_type, 0)
-        entries.append([type_code, name, search_name])
-    
+        type_code = TYPE_CODES.get(doc_type, 0)
+        score = scores.get(doc_type, scores["movie"]).get(normalize_name(name), 0)
+        yield [type_code, name, search_name, score]
     print(f"Total documents processed: {count}")
-    print(f"Unique entries: {len(entries)}")
-    
-    # Sort by type then name for better compression
-    entries.sort(key=lambda x: (x[0], x[2]))
+
+def sorted_unique_rows(rows, tmp_dir, run_size=RUN_SIZE):
+    """
+    External sort: spill sorted runs of `run_size` rows to `tmp_dir`, then
+    k-way merge them, dropping repeated (type, name) pairs as they meet.
+    """
+    runs = []
+    buffer = []
+    for row in rows:
+        buffer.append(row)
+        if len(buffer) >= run_size:
+            runs.append(spill_run(buffer, tmp_dir))
+            buffer = []
+    buffer.sort(key=sort_key)
+    if runs:
+        print(f"Merging {len(runs) + 1} sorted runs...")
+
+    previous = None
+    for row in heapq.merge(*[read_run(path) for path in runs], buffer, key=sort_key):
+        identity = (row[0], row[1])
+        if identity == previous:
+            continue
+        previous = identity
+        yield row
+
+def write_entries(path, rows, debug_file=None):
+    """Write the compact JSON file one entry at a time; returns the entry count."""
+    count = 0
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        f.write('{"types":%s,"sorted":%s,"entries":[' % (json.dumps(TYPES), json.dumps(BUCKET_SORT_MARKER)))
+        if debug_file:
+            debug_file.write('{\n  "types": %s,\n  "sorted": %s,\n  "entries": [' % (json.dumps(TYPES), json.dumps(BUCKET_SORT_MARKER)))
+        for row in rows:
+            separator = "," if count else ""
+            f.write(separator + json.dumps(row, separators=(",", ":")))
+            if debug_file:
+                debug_file.write(separator + "\n    " + json.dumps(row, ensure_ascii=False))
+            count += 1
+        f.write("]}")
+        if debug_file:
+            debug_file.write("\n  ]\n}\n")
+    return count
+
+def main():
+    parser = argparse.ArgumentParser(description="Export autocomplete entries from Astra DB")
+    parser.add_argument("--debug", action="store_true", help="Also write an indented public/autocomplete_debug.json")
+    parser.add_argument("--json-only", action="store_true",
+                        help="Skip the trigram index, which holds every entry in memory")
+    parser.add_argument("--run-size", type=int, default=RUN_SIZE, help=f"Entries per sorted run (default: {RUN_SIZE})")
+    args = parser.parse_args()
+
+    print("Connecting to Astra DB...")
+    client = DataAPIClient(ASTRA_DB_APPLICATION_TOKEN)
+    db = client.get_database(ASTRA_DB_API_ENDPOINT)
     
-    # Write compact JSON
-    output = {
-        "types": ["movie", "person", "genre"],  # Type index lookup
-        "entries": entries  # [[typeCode, name, searchName], ...]
-    }
+    scores = collect_scores(db)
+
+    # Read from autocomplete collection
+    autocomplete_collection = db.get_collection("autocomplete")
     
+    print("Fetching all autocomplete documents...")
+    cursor = autocomplete_collection.find({}, projection={"type": 1, "name": 1, "searchName": 1})
+
     output_path = "public/autocomplete.json.gz"
+    debug_path = "public/autocomplete_debug.json"
     os.makedirs("public", exist_ok=True)
+
+    # The trigram index needs the full entry list; keep it only when it is wanted
+    entries = None if args.json_only else []
+
+    def collect(rows):
+        for row in rows:
+            if entries is not None:
+                entries.append(row)
+            yield row
+
+    with tempfile.TemporaryDirectory(prefix="autocomplete-runs-") as tmp_dir:
+        rows = collect(sorted_unique_rows(scan_rows(cursor, scores), tmp_dir, args.run_size))
+        if args.debug:
+            with open(debug_path, "w", encoding="utf-8") as debug_file:
+                unique = write_entries(output_path, rows, debug_file)
+        else:
+            unique = write_entries(output_path, rows)
     
-    with gzip.open(output_path, "wt", encoding="utf-8") as f:
-        json.dump(output, f, separators=(",", ":"))  # Compact JSON
+    print(f"Unique entries: {unique}")
     
     # Check file size
     size_bytes = os.path.getsize(output_path)
@@ -80,13 +213,16 @@ def main():
     
     print(f"\nOutput: {output_path}")
     print(f"Size: {size_kb:.1f} KB ({size_mb:.2f} MB)")
-    print(f"Estimated gzipped: ~{size_kb/4:.1f} KB")
-    
-    # Also create a human-readable version for debugging
-    with open("public/autocomplete_debug.json", "w") as f:
-        json.dump(output, f, indent=2)
-    
-    print(f"\nDebug version: public/autocomplete_debug.json")
+
+    if entries is None:
+        print("Skipping trigram index (--json-only)")
+    else:
+        # Trigram index for typo-tolerant lookups, aligned with the entry order above
+        trigram_path = write_trigram_index([normalize_name(e[1]) for e in entries], trigram_path_for(output_path))
+        print(f"Trigram index: {trigram_path} ({os.path.getsize(trigram_path) / 1024:.1f} KB)")
+
+    if args.debug:
+        print(f"\nDebug version: {debug_path}")
 
 if __name__ == "__main__":
     main()
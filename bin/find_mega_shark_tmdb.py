@@ -1,6 +1,6 @@
-import requests
 import os
 from dotenv import load_dotenv
+from tmdb_fetcher import tmdb_get
 import json
 
 load_dotenv()
@@ -15,8 +15,7 @@ def search_tmdb(query):
         "query": query,
         "include_adult": "false"
     }
-    response = requests.get(url, params=params)
-    response.raise_for_status()
+    response = tmdb_get(url, params=params)
     return response.json()
 
 def main():
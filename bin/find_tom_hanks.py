@@ -8,6 +8,7 @@ load_dotenv()
 ASTRA_DB_API_ENDPOINT = os.getenv("ASTRA_DB_API_ENDPOINT")
 ASTRA_DB_APPLICATION_TOKEN = os.getenv("ASTRA_DB_APPLICATION_TOKEN")
 COLLECTION_NAME = "movies"
+TOM_HANKS_PERSON_ID = 31  # TMDB person id
 
 # Initialize the client
 client = DataAPIClient(ASTRA_DB_APPLICATION_TOKEN)
@@ -15,8 +16,9 @@ database = client.get_database(ASTRA_DB_API_ENDPOINT)
 collection = database.get_collection(COLLECTION_NAME)
 
 def find_tom_hanks():
-    # Try both 'cast.searchName' and 'cast.name'
+    # Person id (recorded at ingest) first, then the older name-based fields
     queries = [
+        {"cast_ids": TOM_HANKS_PERSON_ID},
         {"cast.searchName": {"$eq": "tom hanks"}},
         {"cast.name": {"$eq": "Tom Hanks"}}
     ]
@@ -26,8 +28,11 @@ def find_tom_hanks():
         print(f"Found {len(results)} results.")
         for movie in results:
             print(f"Movie: {movie.get('title', 'Unknown Title')}")
-            for person in movie.get("cast", []):
-                if person.get("name", "").lower() == "tom hanks" or person.get("searchName", "") == "tom hanks":
+            for person in movie.get("cast_details") or movie.get("cast", []):
+                # cast is a list of names or a list of dicts depending on the writer
+                if isinstance(person, str):
+                    person = {"name": person}
+                if person.get("id") == TOM_HANKS_PERSON_ID or person.get("name", "").lower() == "tom hanks":
                     print(f"  Cast: {person}")
 
 if __name__ == "__main__":
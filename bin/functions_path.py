@@ -0,0 +1,15 @@
+"""
+Make the Netlify function modules (netlify/functions) importable from the
+bin/ scripts, which share their catalogue, autocomplete and index code:
+
+    import functions_path  # noqa: F401
+    from provider_catalog import provider_ids_by_payment_type
+"""
+
+import os
+import sys
+
+FUNCTIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "netlify", "functions")
+
+if FUNCTIONS_DIR not in sys.path:
+    sys.path.insert(0, FUNCTIONS_DIR)
@@ -1,9 +1,9 @@
-import requests
 import os
 import json
-import time
 from dotenv import load_dotenv
 from openai import OpenAI
+from embeddings import BatchEmbedder, collection_name_for
+from tmdb_fetcher import tmdb_get
 
 load_dotenv()
 
@@ -20,31 +20,41 @@ headers = {
     "Authorization": f"Bearer {TMDB_READ_TOKEN}"
 }
 
-def get_embedding(text):
-    if not text:
-        return None
-    try:
-        response = client.embeddings.create(input=text, model="text-embedding-3-small")
-        return response.data[0].embedding
-    except Exception as e:
-        print(f"Error generating embedding: {e}")
-        return None
-
 def fetch_popular(media_type, limit=100):
     results = []
+    # Items are embedded in batches; vectors come back mapped to their items
+    embedder = BatchEmbedder(client)
+
+    def accept(finished):
+        for item, vector, error in finished:
+            if error:
+                print(f"Error generating embedding: {error}")
+                continue
+            item['$vector'] = vector
+            item['type'] = media_type
+            # Ensure unique ID format if not present
+            if '_id' not in item:
+                item['_id'] = f"{media_type}_{item['id']}"
+            
+            results.append(item)
+            title = item.get('title') if media_type == 'movie' else item.get('name')
+            print(f"Processed {len(results)}/{limit} {media_type}: {title}")
+
     page = 1
     while len(results) < limit:
         url = f"https://api.themoviedb.org/3/{media_type}/popular?language=en-US&page={page}"
-        response = requests.get(url, headers=headers)
+        response = tmdb_get(url, headers=headers, raise_for_status=False)
         if response.status_code != 200:
             print(f"Error fetching {media_type}: {response.status_code}")
             break
         
         data = response.json()
         items = data.get('results', [])
+        if not items:
+            break
         
         for item in items:
-            if len(results) >= limit:
+            if len(results) + len(embedder) >= limit:
                 break
             
             # Construct text for embedding
@@ -53,21 +63,14 @@ def fetch_popular(media_type, limit=100):
             text_to_embed = f"{title}: {overview}"
             
             # Add Vector
-            vector = get_embedding(text_to_embed)
-            
-            if vector:
-                item['$vector'] = vector
-                item['type'] = media_type
-                # Ensure unique ID format if not present
-                if '_id' not in item:
-                    item['_id'] = f"{media_type}_{item['id']}"
-                
-                results.append(item)
-                print(f"Processed {len(results)}/{limit} {media_type}: {title}")
+            accept(embedder.add(item, text_to_embed))
+        
+        if len(results) + len(embedder) >= limit:
+            accept(embedder.flush())
                 
         page += 1
-        time.sleep(0.2) # clear rate limits
-        
+    
+    accept(embedder.flush())
     return results
 
 def main():
@@ -79,8 +82,8 @@ def main():
     
     # Structure data with specific keys for separate collections
     data_payload = {
-        "movies2026": movies,
-        "tvshows2026": tv_shows
+        collection_name_for("movies2026"): movies,
+        collection_name_for("tvshows2026"): tv_shows
     }
     
     output_file = os.path.join(os.path.dirname(__file__), '../database_upload.json')
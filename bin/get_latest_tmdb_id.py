@@ -1,6 +1,6 @@
-import requests
 import os
 from dotenv import load_dotenv
+from tmdb_fetcher import tmdb_get
 
 # Load environment variables
 load_dotenv()
@@ -16,8 +16,7 @@ def get_tmdb_latest_id():
     url = f"{TMDB_BASE_URL}/movie/latest"
     params = {"api_key": TMDB_API_KEY}
     try:
-        response = requests.get(url, params=params)
-        response.raise_for_status()
+        response = tmdb_get(url, params=params)
         return response.json().get('id')
     except Exception as e:
         print(f"Error fetching latest ID: {e}")
@@ -0,0 +1,66 @@
+"""
+Local index of the TMDB ids already stored in a collection.
+
+The crawlers used to spend one find_one per discovered title to learn that
+it already exists, which is most titles on a re-crawl. KnownIds loads every
+id once at crawl start from a projection-only scan and keeps it as a sorted
+int array (8 bytes per id), plus a set of ids written since. filter_new()
+answers from memory; ids it has not seen are confirmed with a single $in
+query per call, since another crawler may have written them after the scan.
+"""
+
+from array import array
+from bisect import bisect_left
+
+
+class KnownIds:
+    def __init__(self, collection, field="tmdb_id"):
+        self.collection = collection
+        self.field = field
+        self._loaded = array("q")
+        self._added = set()
+
+    def load(self):
+        """Scan the collection's ids; returns how many were loaded."""
+        ids = array("q")
+        for doc in self.collection.find({}, projection={self.field: 1}):
+            value = doc.get(self.field)
+            if isinstance(value, int):
+                ids.append(value)
+        self._loaded = array("q", sorted(set(ids)))
+        self._added = set()
+        return len(self._loaded)
+
+    def __len__(self):
+        return len(self._loaded) + len(self._added)
+
+    def __contains__(self, item_id):
+        if item_id in self._added:
+            return True
+        i = bisect_left(self._loaded, item_id)
+        return i < len(self._loaded) and self._loaded[i] == item_id
+
+    def add(self, ids):
+        for item_id in ids:
+            if isinstance(item_id, int) and item_id not in self:
+                self._added.add(item_id)
+
+    def filter_new(self, ids):
+        """
+        The ids that are not stored yet, in their original order. Costs nothing
+        when every id is known, and one $in query otherwise. If that query
+        fails the unknown ids are returned, as the writes are upserts anyway.
+        """
+        unknown = [item_id for item_id in ids if item_id not in self]
+        if not unknown:
+            return []
+        try:
+            found = {
+                doc.get(self.field)
+                for doc in self.collection.find({self.field: {"$in": unknown}}, projection={self.field: 1})
+            }
+        except Exception as e:
+            print(f"Error checking existence: {e}")
+            return unknown
+        self.add(found)
+        return [item_id for item_id in unknown if item_id not in found]
@@ -1,5 +1,8 @@
 import json
 import os
+import heapq
+import argparse
+import itertools
 
 # Define paths relative to the script location
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -10,6 +13,12 @@ FILE_MOVIES = os.path.join(PUBLIC_DIR, 'autocomplete-fresh.json')
 FILE_TV = os.path.join(PUBLIC_DIR, 'autocomplete-tv-fresh.json')
 FILE_OUTPUT = os.path.join(PUBLIC_DIR, 'autocomplete.json')
 
+import functions_path  # noqa: F401
+from autocomplete import normalize_name, prefix_bucket
+from trigram_index import trigram_path_for, write_trigram_index
+from autocomplete_binary import binary_path_for, write_binary_index
+from autocomplete_shards import write_shards
+
 def load_data(filepath):
     if not os.path.exists(filepath):
         print(f"Warning: File not found: {filepath}")
@@ -26,6 +35,124 @@ def load_data(filepath):
         print(f"Error loading {filepath}: {e}")
         return []
 
+def get_type_label(type_code, context):
+    """
+    Convert numeric type codes to named categories based on context.
+    0 -> Movie (if movie context) or TV Show (if tv context)
+    1 -> Person
+    2 -> Genre
+    """
+    # Handle None explicitly
+    if type_code is None:
+         if context == "movie": return "Movie"
+         if context == "tv": return "TV Show"
+         return context.title() if context else "Unknown"
+
+    s = str(type_code)
+    
+    # Explicit types (1=Person, 2=Genre) ALWAYS override context
+    if s == "1":
+        return "Person"
+    if s == "2":
+        return "Genre"
+
+    # Type 0 is context-dependent
+    if s == "0":
+        if context == "movie":
+            return "Movie"
+        elif context == "tv":
+            return "TV Show"
+    
+    # If it's already a named string, return it formatted
+    if not s.isdigit():
+        return s.title()
+        
+    # Fallback
+    if context == "movie": return "Movie"
+    if context == "tv": return "TV Show"
+    return context.title() if context else "Unknown"
+
+def to_entry(item, context):
+    """Normalize one input item to {type, name, (id), (score)}, or None if it has no name."""
+    raw_type = None
+    name = None
+    obj_id = None
+    score = None
+    
+    # Extract
+    if isinstance(item, list) and len(item) >= 2:
+        raw_type = item[0]
+        name = item[1]
+        if len(item) > 2:
+            obj_id = item[2]
+        if len(item) > 3 and isinstance(item[3], (int, float)):
+            score = item[3]
+    elif isinstance(item, dict):
+        raw_type = item.get('type')
+        name = item.get('name') or item.get('title')
+        obj_id = item.get('id') or item.get('movieId')
+        score = item.get('score')
+    elif isinstance(item, str):
+        raw_type = "string"
+        name = item
+
+    if not name:
+        return None
+    entry = {
+        "type": get_type_label(raw_type, context),
+        "name": str(name).strip()
+    }
+    if obj_id is not None:
+        entry["id"] = obj_id
+    if score is not None:
+        entry["score"] = score
+    return entry
+
+def dedupe_key(entry):
+    # (Label, Lowercase Name): "Tom Hanks" (Person) from movies merges with "Tom Hanks" (Person) from TV
+    return (entry["type"], entry["name"].lower())
+
+def merge_duplicate(existing, new_entry):
+    """Resolve two entries with the same dedupe key; returns the one to keep."""
+    # Prefer entry with ID if existing lacks it
+    if "id" not in existing and "id" in new_entry:
+        if "score" in existing:
+            new_entry["score"] = max(existing["score"], new_entry.get("score", 0))
+        return new_entry
+    if "score" in new_entry:
+        # A person credited in both movies and TV ranks by the higher score
+        existing["score"] = max(existing.get("score", 0), new_entry["score"])
+    return existing
+
+def bucket_sort_key(item):
+    # Group by two-letter prefix, best-scored first within each group, so the
+    # autocomplete function can serve short prefixes off the front of a bucket
+    return (prefix_bucket(item.get('name', '')), -item.get('score', 0), item.get('name', '').lower())
+
+def write_outputs(combined, output_path=FILE_OUTPUT, base_version=None):
+    """
+    Write the merged JSON and everything derived from it (trigram, binary,
+    shards). This is the only script that publishes public/autocomplete.bin
+    and the "movies" shards: its entries carry the ids the browser needs.
+    `base_version` (set by autocomplete_deltas.py compact) is recorded in the
+    shard manifest as the last delta the entries include.
+    """
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(combined, f, separators=(',', ':'), ensure_ascii=False)
+
+    print(f"Successfully wrote to {output_path}")
+
+    trigram_path = write_trigram_index([normalize_name(item['name']) for item in combined], trigram_path_for(output_path))
+    print(f"Successfully wrote trigram index to {trigram_path}")
+
+    binary_path = write_binary_index(combined, binary_path_for(output_path))
+    print(f"Successfully wrote binary index to {binary_path}")
+
+    manifest_path, manifest = write_shards(combined, "movies", base_version=base_version)
+    print(f"Successfully wrote {len(manifest['shards'])} autocomplete shards ({manifest_path})")
+
 def main():
     print(f"Loading data from {os.path.basename(FILE_MOVIES)} and {os.path.basename(FILE_TV)}...")
     
@@ -36,86 +163,14 @@ def main():
     # Value is the actual item data.
     unique_items = {}
 
-    def get_type_label(type_code, context):
-        """
-        Convert numeric type codes to named categories based on context.
-        0 -> Movie (if movie context) or TV Show (if tv context)
-        1 -> Person
-        2 -> Genre
-        """
-        # Handle None explicitly
-        if type_code is None:
-             if context == "movie": return "Movie"
-             if context == "tv": return "TV Show"
-             return "Unknown"
-
-        s = str(type_code)
-        
-        # Explicit types (1=Person, 2=Genre) ALWAYS override context
-        if s == "1":
-            return "Person"
-        if s == "2":
-            return "Genre"
-
-        # Type 0 is context-dependent
-        if s == "0":
-            if context == "movie":
-                return "Movie"
-            elif context == "tv":
-                return "TV Show"
-        
-        # If it's already a named string, return it formatted
-        if not s.isdigit():
-            return s.title()
-            
-        # Fallback
-        if context == "movie": return "Movie"
-        if context == "tv": return "TV Show"
-        return "Unknown"
-
     def process_items(items, context):
         count = 0
         for item in items:
-            raw_type = None
-            name = None
-            obj_id = None
-            
-            # Extract
-            if isinstance(item, list) and len(item) >= 2:
-                raw_type = item[0]
-                name = item[1]
-                if len(item) > 2:
-                    obj_id = item[2]
-            elif isinstance(item, dict):
-                raw_type = item.get('type')
-                name = item.get('name')
-                obj_id = item.get('id') or item.get('movieId')
-            elif isinstance(item, str):
-                raw_type = "string"
-                name = item
-
-            if name:
-                label = get_type_label(raw_type, context)
-                
-                # Dedupe key: (Label, Lowercase Name)
-                # This ensures "Tom Hanks" (Person) from movies merges with "Tom Hanks" (Person) from TV
-                key = (label, str(name).strip().lower())
-                
-                new_entry = {
-                    "type": label,
-                    "name": str(name).strip()
-                }
-                if obj_id is not None:
-                    new_entry["id"] = obj_id
-                
+            new_entry = to_entry(item, context)
+            if new_entry:
+                key = dedupe_key(new_entry)
                 existing = unique_items.get(key)
-                if not existing:
-                    unique_items[key] = new_entry
-                else:
-                    # Prefer entry with ID if existing lacks it
-                    if "id" not in existing and "id" in new_entry:
-                        unique_items[key] = new_entry
-                    
+                unique_items[key] = merge_duplicate(existing, new_entry) if existing else new_entry
             count += 1
         return count
 
@@ -127,20 +182,111 @@ def main():
 
     combined = list(unique_items.values())
 
-    # Sort alphabetically by name
-    def get_sort_key(item):
-        return item.get('name', '').lower()
-
-    combined.sort(key=get_sort_key)
+    combined.sort(key=bucket_sort_key)
 
     print(f"Total unique entries: {len(combined)}")
 
-    os.makedirs(os.path.dirname(FILE_OUTPUT), exist_ok=True)
+    write_outputs(combined)
+
+# ---------------------------------------------------------------------------
+# Streaming k-way merge
+# ---------------------------------------------------------------------------
+
+def merge_sort_key(entry):
+    """Merge order: lowercase name. Types are not ordered, since producers code them differently."""
+    return entry["name"].lower()
+
+def iter_input(path, context):
+    """
+    Yield normalized entries from one input in merge order. JSON arrays are
+    loaded whole anyway, so they are sorted here. JSONL files (one item per
+    line) are streamed and must already be sorted by lowercase name; raw
+    crawler journals are not, so compact them first (autocomplete_journal.py)
+    and pass the resulting JSON. Raises ValueError on an out-of-order JSONL.
+    """
+    if not path.endswith('.jsonl'):
+        entries = (to_entry(item, context) for item in load_data(path))
+        yield from sorted((entry for entry in entries if entry), key=merge_sort_key)
+        return
+
+    previous = None
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = to_entry(json.loads(line), context)
+            if not entry:
+                continue
+            key = merge_sort_key(entry)
+            if previous is not None and key < previous:
+                raise ValueError(
+                    f"{path} is not sorted by name ({entry['name']!r} follows {previous!r}); "
+                    f"compact it with bin/autocomplete_journal.py and merge the JSON instead"
+                )
+            previous = key
+            yield entry
+
+def stream_merge(inputs):
+    """
+    Heap-based k-way merge of (path, context) inputs. Entries with the same
+    lowercase name meet consecutively; each such group is deduplicated by
+    (type, lowercase name), so memory is bounded by the number of inputs and
+    the largest group of same-named entries.
+    """
+    merged = heapq.merge(*[iter_input(path, context) for path, context in inputs], key=merge_sort_key)
+    for _, group in itertools.groupby(merged, key=merge_sort_key):
+        unique = {}
+        for entry in group:
+            key = dedupe_key(entry)
+            unique[key] = merge_duplicate(unique[key], entry) if key in unique else entry
+        yield from sorted(unique.values(), key=lambda entry: entry["type"])
+
+def write_compact(entries, output_path):
+    """Write a compact JSON array one entry at a time; returns the entry count."""
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    count = 0
+    tmp_path = output_path + ".tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write("[")
+            for entry in entries:
+                f.write(("," if count else "") + "\n" + json.dumps(entry, separators=(',', ':'), ensure_ascii=False))
+                count += 1
+            f.write("\n]\n")
+    except Exception:
+        # Leave the previous output in place
+        os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, output_path)
+    return count
 
-    with open(FILE_OUTPUT, 'w', encoding='utf-8') as f:
-        json.dump(combined, f, indent=2)
+def parse_input(spec):
+    """'path[:context]' -> (path, context); context defaults from the file name."""
+    path, sep, context = spec.rpartition(':')
+    if not sep or os.sep in context:
+        path, context = spec, None
+    if not context:
+        base = os.path.basename(path).lower()
+        context = "tv" if "tv" in base else "boardgame" if "boardgame" in base else "movie"
+    return path, context
 
-    print(f"Successfully wrote to {FILE_OUTPUT}")
+def main_sorted(args):
+    inputs = [parse_input(spec) for spec in args.inputs] or [(FILE_MOVIES, "movie"), (FILE_TV, "tv")]
+    for path, context in inputs:
+        print(f"  {path} ({context})")
+    count = write_compact(stream_merge(inputs), args.output)
+    print(f"Successfully merged {count} unique entries into {args.output}")
+    print("Run bin/shard_autocomplete.py on the output to refresh the shards.")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Merge movie and TV autocomplete files")
+    parser.add_argument("--sorted", action="store_true",
+                        help="k-way merge of the inputs; JSONL inputs must be sorted by lowercase name")
+    parser.add_argument("--output", default=FILE_OUTPUT, help="Output file (--sorted mode)")
+    parser.add_argument("inputs", nargs="*",
+                        help="Input files as path[:context] for --sorted mode (context: movie, tv, boardgame)")
+    args = parser.parse_args()
+    if args.sorted:
+        main_sorted(args)
+    else:
+        main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Copy a vector collection into a parallel reduced-dimension collection.
+
+Vectors are either truncated and renormalized locally (fast, no API calls)
+or re-embedded from the document text with the `dimensions` parameter.
+"""
+
+import os
+import argparse
+from dotenv import load_dotenv
+from astrapy import DataAPIClient
+from openai import OpenAI
+from tqdm import tqdm
+from embeddings import collection_name_for, create_embedding, truncate_and_normalize
+from bulk_writer import bulk_upsert
+
+load_dotenv()
+
+ASTRA_DB_APPLICATION_TOKEN = os.getenv("ASTRA_DB_APPLICATION_TOKEN")
+ASTRA_DB_API_ENDPOINT = os.getenv("ASTRA_DB_API_ENDPOINT")
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+
+if not ASTRA_DB_APPLICATION_TOKEN or not ASTRA_DB_API_ENDPOINT:
+    raise ValueError("Missing required environment variables")
+
+SOURCE_COLLECTIONS = ["movies2026", "tvshows2026"]
+INSERT_CHUNK_SIZE = 20
+
+
+def get_or_create_target(database, name, dimensions):
+    try:
+        collection = database.create_collection(
+            name,
+            dimension=dimensions,
+            metric="cosine",
+            # Field hashes are only read back by _id, never filtered on
+            indexing={"deny": ["_field_hashes"]}
+        )
+        print(f"✅ Created new collection: {name} ({dimensions} dimensions)")
+    except Exception as e:
+        if "already exists" in str(e).lower():
+            collection = database.get_collection(name)
+            print(f"✅ Using existing collection: {name}")
+        else:
+            raise
+    return collection
+
+
+def build_embedding_text(source_name, doc):
+    # Reuse the text builders of the add_vectors scripts so re-embedded
+    # vectors match what those scripts would have written.
+    if source_name.startswith("tvshows"):
+        from add_vectors_to_tv import create_embedding_text
+    else:
+        from add_vectors_to_movies import create_embedding_text
+    return create_embedding_text(doc)
+
+
+def flush(target, docs, stats):
+    if not docs:
+        return
+    # Re-running the migration hits duplicate ids; bulk_upsert replaces those
+    result = bulk_upsert(target, docs)
+    stats['written'] += result['written']
+    stats['errors'] += len(result['failed_ids'])
+    for doc_id in result['failed_ids']:
+        print(f"\n⚠️  Error writing {doc_id}")
+    docs.clear()
+
+
+def migrate(database, source_name, dimensions, mode, limit=None):
+    source = database.get_collection(source_name)
+    target = get_or_create_target(database, collection_name_for(source_name, dimensions), dimensions)
+    openai_client = OpenAI(api_key=OPENAI_API_KEY) if mode == "reembed" else None
+
+    stats = {'read': 0, 'written': 0, 'skipped': 0, 'errors': 0}
+    pending = []
+
+    cursor = source.find({}, projection={"*": 1}, limit=limit)
+    for doc in tqdm(cursor, desc=f"{source_name} → {dimensions}d", unit="doc", ncols=100):
+        stats['read'] += 1
+        vector = doc.get('$vector')
+        try:
+            if mode == "truncate":
+                if vector is None:
+                    stats['skipped'] += 1
+                    continue
+                doc['$vector'] = truncate_and_normalize(list(vector), dimensions)
+            else:
+                doc['$vector'] = create_embedding(openai_client, build_embedding_text(source_name, doc), dimensions)
+        except Exception as e:
+            stats['errors'] += 1
+            print(f"\n⚠️  Error converting {doc.get('_id')}: {e}")
+            continue
+
+        pending.append(doc)
+        if len(pending) >= INSERT_CHUNK_SIZE:
+            flush(target, pending, stats)
+
+    flush(target, pending, stats)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate vectors into reduced-dimension collections")
+    parser.add_argument("--dimensions", type=int, required=True, help="Target embedding size, e.g. 256 or 512")
+    parser.add_argument("--mode", choices=["truncate", "reembed"], default="truncate",
+                        help="truncate+renormalize existing vectors, or re-embed the document text")
+    parser.add_argument("--collection", choices=SOURCE_COLLECTIONS, action="append",
+                        help="Source collection (default: all)")
+    parser.add_argument("--limit", type=int, default=None, help="Only migrate the first N documents")
+    args = parser.parse_args()
+
+    if args.mode == "reembed" and not OPENAI_API_KEY:
+        raise ValueError("OPENAI_API_KEY is required for --mode reembed")
+
+    client = DataAPIClient(ASTRA_DB_APPLICATION_TOKEN)
+    database = client.get_database(ASTRA_DB_API_ENDPOINT)
+
+    for source_name in args.collection or SOURCE_COLLECTIONS:
+        stats = migrate(database, source_name, args.dimensions, args.mode, args.limit)
+        print(f"\n{source_name}: read {stats['read']:,}, wrote {stats['written']:,}, "
+              f"skipped {stats['skipped']:,}, errors {stats['errors']:,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+"""
+Staged, threaded pipeline for the bin/ ingestion scripts.
+
+A crawl is a chain of stages (discover a page -> fetch details -> build the
+embedding text -> embed a batch -> write a batch). Running them in sequence
+per title adds up every network wait; here each stage has its own worker
+threads and a bounded input queue, so all stages work at once and throughput
+is set by the slowest one. A full queue blocks the stage feeding it, which
+keeps memory bounded when e.g. the writer falls behind.
+
+A stage function takes one item (or, for batch stages, a list of items) and
+returns an iterable of outputs for the next stage, or None. Exceptions are
+counted and printed, and the item is dropped.
+
+    pipeline = Pipeline([
+        Stage("fetch", fetch, workers=8),
+        Stage("embed", embed, batch_size=100),
+        Stage("write", write, workers=4, batch_size=20),
+    ])
+    pipeline.run(ids)
+    print(pipeline.report())
+
+run() can be called repeatedly; counters accumulate across runs. On Ctrl-C
+it stops reading the source, lets in-flight items drain through every stage
+and then re-raises KeyboardInterrupt.
+
+To learn when everything derived from one unit of input (e.g. a crawl day)
+has left the pipeline, without draining it, items carry their key as their
+first element and stage functions are wrapped with KeyTracker.tracked():
+
+    tracker = KeyTracker(on_done=checkpoint_day)
+    Stage("fetch", tracker.tracked(fetch), workers=8)
+"""
+
+import time
+import queue
+import threading
+from collections import deque
+
+QUEUE_SIZE = 100
+
+_DONE = object()
+
+
+class SharedStats(dict):
+    """A stats dict that stage threads can update safely with add()."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lock = threading.Lock()
+
+    def add(self, key, n=1):
+        with self._lock:
+            self[key] = self.get(key, 0) + n
+
+
+class KeyTracker:
+    """
+    Counts in-flight items per key. The source opens a key, counts each item
+    it yields with add() and seals the key after its last item; tracked stage
+    functions count their outputs in and their inputs out. Once a sealed key
+    has nothing left in flight, on_done(key) is called, in the order keys
+    were opened, so a key is only reported after every earlier one.
+    Callbacks run outside the counting lock (they may do network writes), one
+    at a time under a separate lock.
+    """
+
+    def __init__(self, on_done=None):
+        self.on_done = on_done
+        self._counts = {}
+        self._order = []
+        self._sealed = set()
+        self._ready = deque()
+        self._lock = threading.Lock()
+        self._callback_lock = threading.Lock()
+
+    def open(self, key):
+        with self._lock:
+            self._order.append(key)
+
+    def add(self, key, n=1):
+        with self._lock:
+            self._counts[key] = self._counts.get(key, 0) + n
+
+    def seal(self, key):
+        with self._lock:
+            self._sealed.add(key)
+            self._finish()
+        self._deliver()
+
+    def done(self, key, n=1):
+        with self._lock:
+            count = self._counts.get(key, 0) - n
+            if count > 0:
+                self._counts[key] = count
+            else:
+                self._counts.pop(key, None)
+            self._finish()
+        self._deliver()
+
+    def _finish(self):
+        # Called under the lock: queue finished keys, in order, for _deliver()
+        while self._order and self._order[0] in self._sealed and not self._counts.get(self._order[0]):
+            key = self._order.pop(0)
+            self._sealed.discard(key)
+            self._ready.append(key)
+
+    def _deliver(self):
+        # Whichever thread holds the callback lock drains the queue in order
+        with self._callback_lock:
+            while True:
+                with self._lock:
+                    if not self._ready:
+                        return
+                    key = self._ready.popleft()
+                if self.on_done:
+                    self.on_done(key)
+
+    def pending(self):
+        """Opened keys not reported done yet, oldest first."""
+        with self._lock:
+            return list(self._ready) + list(self._order)
+
+    def tracked(self, fn, batch=False):
+        """
+        Wrap a stage function whose inputs and outputs are tuples starting with
+        their key. Outputs are counted in before the inputs are counted out,
+        and inputs are counted out even when fn raises.
+        """
+        def run(payload):
+            outputs = []
+            try:
+                outputs = list(fn(payload) or ())
+                for output in outputs:
+                    self.add(output[0])
+            finally:
+                for item in (payload if batch else [payload]):
+                    self.done(item[0])
+            return outputs
+        return run
+
+
+class Stage:
+    def __init__(self, name, fn, workers=1, queue_size=QUEUE_SIZE, batch_size=None, batch_timeout=None):
+        """
+        `batch_size` makes fn receive lists of up to that many items; a partial
+        batch is passed on after `batch_timeout` seconds without new input, or
+        when the input ends.
+        """
+        self.name = name
+        self.fn = fn
+        self.workers = workers
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.batch_timeout = batch_timeout
+        self.received = 0
+        self.emitted = 0
+        self.errors = 0
+        self.busy = 0.0
+        self._lock = threading.Lock()
+
+    def _call(self, payload, emit):
+        started = time.monotonic()
+        blocked = 0.0
+        emitted = 0
+        failed = 0
+        try:
+            for output in self.fn(payload) or ():
+                wait_started = time.monotonic()
+                emit(output)
+                blocked += time.monotonic() - wait_started
+                emitted += 1
+        except Exception as e:
+            failed = 1
+            print(f"\n⚠️  {self.name} stage error: {e}")
+        with self._lock:
+            self.emitted += emitted
+            self.errors += failed
+            # Time spent blocked on a full downstream queue is not work
+            self.busy += time.monotonic() - started - blocked
+
+    def _work(self, inbox, emit):
+        batch = []
+        while True:
+            timeout = self.batch_timeout if batch and self.batch_timeout else None
+            try:
+                item = inbox.get(timeout=timeout)
+            except queue.Empty:
+                self._call(batch, emit)
+                batch = []
+                continue
+            if item is _DONE:
+                if batch:
+                    self._call(batch, emit)
+                return
+            with self._lock:
+                self.received += 1
+            if not self.batch_size:
+                self._call(item, emit)
+                continue
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                self._call(batch, emit)
+                batch = []
+
+
+class Pipeline:
+    def __init__(self, stages):
+        self.stages = stages
+        self.elapsed = 0.0
+
+    def _start(self):
+        queues = [queue.Queue(maxsize=stage.queue_size) for stage in self.stages]
+        threads = []
+        for i, stage in enumerate(self.stages):
+            outbox = queues[i + 1] if i + 1 < len(queues) else None
+            next_workers = self.stages[i + 1].workers if outbox is not None else 0
+            emit = outbox.put if outbox is not None else (lambda output: None)
+            remaining = [stage.workers]
+            lock = threading.Lock()
+
+            def run_worker(stage=stage, inbox=queues[i], emit=emit, outbox=outbox,
+                           next_workers=next_workers, remaining=remaining, lock=lock):
+                stage._work(inbox, emit)
+                with lock:
+                    remaining[0] -= 1
+                    last = remaining[0] == 0
+                # The last worker of a stage ends the next one
+                if last and outbox is not None:
+                    for _ in range(next_workers):
+                        outbox.put(_DONE)
+
+            for n in range(stage.workers):
+                thread = threading.Thread(target=run_worker, name=f"{stage.name}-{n}", daemon=True)
+                thread.start()
+                threads.append(thread)
+        return queues[0], threads
+
+    def run(self, source):
+        """Feed every item of `source` through the stages and wait until all are processed."""
+        started = time.monotonic()
+        inbox, threads = self._start()
+        interrupted = False
+        try:
+            for item in source:
+                inbox.put(item)
+        except KeyboardInterrupt:
+            interrupted = True
+            print("\n🛑 Stopping: draining in-flight work (Ctrl-C again to abort)...")
+        for _ in range(self.stages[0].workers):
+            inbox.put(_DONE)
+        for thread in threads:
+            # Join in slices so a second Ctrl-C is not swallowed
+            while thread.is_alive():
+                thread.join(0.5)
+        self.elapsed += time.monotonic() - started
+        if interrupted:
+            raise KeyboardInterrupt
+
+    def report(self):
+        """Per-stage counters: items in/out, errors, throughput and worker utilisation."""
+        elapsed = self.elapsed or 1e-9
+        lines = []
+        for stage in self.stages:
+            utilisation = stage.busy / (elapsed * stage.workers)
+            lines.append(
+                f"   {stage.name:<10} in {stage.received:>8,}  out {stage.emitted:>8,}  "
+                f"errors {stage.errors:>5,}  {stage.received / elapsed:>7.1f}/s  "
+                f"busy {utilisation:>4.0%} x{stage.workers}"
+            )
+        return "\n".join(lines)
@@ -1,13 +1,29 @@
 import requests
 import json
 import os
-import time
+import argparse
+import multiprocessing
 from datetime import datetime, timedelta
 from calendar import monthrange
 from dotenv import load_dotenv
 from astrapy import DataAPIClient
 from openai import OpenAI
 from tqdm import tqdm
+from embeddings import EMBEDDING_MODEL, EMBEDDING_DIMENSIONS, EMBEDDING_BATCH_SIZE, BatchEmbedder, collection_name_for, openai_limiter
+from autocomplete_journal import AutocompleteJournal
+from known_ids import KnownIds
+from bulk_writer import ASTRA_WRITE_CHUNK, ASTRA_WRITE_CONCURRENCY, bulk_upsert, format_latency
+from pipeline import KeyTracker, Pipeline, SharedStats, Stage
+from tmdb_cache import iter_cached
+from discover_partitions import VOTE_DIMENSIONS, partition
+from date_leases import (
+    CRAWL_RANGE_DAYS, acquire, checkpoint, complete, lease_days, release, seed_ranges,
+    summary as range_summary, worker_id,
+)
+from tmdb_fetcher import TMDB_CONCURRENCY, latency_report, tmdb_get_json, tmdb_limiter
+
+import functions_path  # noqa: F401
+from provider_catalog import key_crew_ids, provider_ids_by_payment_type
 
 # Load environment variables
 load_dotenv()
@@ -29,9 +45,12 @@ if not ASTRA_DB_APPLICATION_TOKEN:
     raise ValueError("ASTRA_DB_APPLICATION_TOKEN not found in .env file")
 
 TMDB_BASE_URL = "https://api.themoviedb.org/3"
-COLLECTION_NAME = "movies2026"
-EMBEDDING_MODEL = "text-embedding-3-small"  # 1536 dimensions
-EMBEDDING_DIMENSIONS = 1536
+COLLECTION_NAME = collection_name_for("movies2026")
+# Full crawl span, newest day first
+CRAWL_START = "2025-12-31"
+CRAWL_END = "1930-01-01"
+# Partial embedding/write batches are passed on after this long without new titles
+PARTIAL_BATCH_SECONDS = 5
 
 # Initialize OpenAI client
 openai_client = OpenAI(api_key=OPENAI_API_KEY)
@@ -45,9 +64,10 @@ def init_astra_collections():
             COLLECTION_NAME,
             dimension=EMBEDDING_DIMENSIONS,
             metric="cosine",
-            indexing={"deny": ["none"]}
+            # Field hashes are only read back by _id, never filtered on
+            indexing={"deny": ["_field_hashes"]}
         )
-        print(f"✅ Created new collection: {COLLECTION_NAME} with index on everything")
+        print(f"✅ Created new collection: {COLLECTION_NAME} (field hashes not indexed)")
     except Exception as e:
         if "already exists" in str(e).lower():
             collection = database.get_collection(COLLECTION_NAME)
@@ -64,7 +84,7 @@ def init_astra_collections():
             print(f"⚠️ Warning: Could not create metadata collection: {e}")
     return collection, database
 
-def discover_movies_by_date(page=1, date_min=None, date_max=None):
+def discover_movies_by_date(page=1, date_min=None, date_max=None, filters=None):
     url = f"{TMDB_BASE_URL}/discover/movie"
     params = {
         "api_key": TMDB_API_KEY,
@@ -76,9 +96,9 @@ def discover_movies_by_date(page=1, date_min=None, date_max=None):
         "primary_release_date.gte": date_min,
         "primary_release_date.lte": date_max
     }
-    response = requests.get(url, params=params)
-    response.raise_for_status()
-    return response.json()
+    # Extra bounds from discover_partitions, e.g. a vote average band
+    params.update(filters or {})
+    return tmdb_get_json(url, params=params)
 
 def get_movie_full_details(movie_id):
     url = f"{TMDB_BASE_URL}/movie/{movie_id}"
@@ -87,20 +107,7 @@ def get_movie_full_details(movie_id):
         "language": "en-US",
         "append_to_response": "credits,keywords,videos,images,reviews,recommendations,similar,watch/providers,release_dates,external_ids"
     }
-    response = requests.get(url, params=params)
-    response.raise_for_status()
-    return response.json()
-
-def update_progress(database, current_date):
-    try:
-        metadata_col = database.get_collection("crawler_metadata_2026_filtered")
-        metadata_col.find_one_and_update(
-            {"_id": "tmdb_progress_date"},
-            {"$set": {"last_date": current_date, "updated_at": datetime.utcnow().isoformat()}},
-            upsert=True
-        )
-    except Exception:
-        pass
+    return tmdb_get_json(url, params=params)
 
 def get_last_processed_date(database):
     try:
@@ -171,14 +178,6 @@ def create_embedding_text(movie_details):
         parts.append(f"Production: {company_names}")
     return '\n'.join(parts)
 
-def generate_embedding(text):
-    response = openai_client.embeddings.create(
-        model=EMBEDDING_MODEL,
-        input=text,
-        encoding_format="float"
-    )
-    return response.data[0].embedding
-
 def prepare_movie_document(movie_details, embedding):
     watch_providers = {}
     wp_data = movie_details.get('watch/providers', {}).get('results', {})
@@ -192,14 +191,16 @@ def prepare_movie_document(movie_details, embedding):
         }
     credits = movie_details.get('credits', {})
     cast_details = [
-        {'name': c['name'], 'character': c.get('character', ''), 'order': c.get('order', 999), 'searchName': c['name'].lower()}
+        {'id': c.get('id'), 'name': c['name'], 'character': c.get('character', ''), 'order': c.get('order', 999), 'searchName': c['name'].lower()}
         for c in credits.get('cast', [])[:20]
     ]
     cast = [c['name'] for c in cast_details]
+    cast_ids = [c['id'] for c in cast_details if c['id'] is not None]
     crew = credits.get('crew', [])
     directors = [c['name'] for c in crew if c['job'] == 'Director']
     writers = [c['name'] for c in crew if c['department'] == 'Writing'][:5]
     producers = [c['name'] for c in crew if c['job'] == 'Producer'][:5]
+    crew_ids = key_crew_ids(crew)
 
     document = {
         "_id": str(movie_details['id']),
@@ -224,8 +225,11 @@ def prepare_movie_document(movie_details, embedding):
         "producers": producers,
         "cast": cast,
         "cast_details": cast_details,
+        "cast_ids": cast_ids,
+        "crew_ids": crew_ids,
         "production_companies": [c['name'] for c in movie_details.get('production_companies', [])],
         "watch_providers": watch_providers,
+        "watch_provider_ids": provider_ids_by_payment_type(wp_data.get('US')),
         "imdb_id": movie_details.get('external_ids', {}).get('imdb_id'),
         "tmdb_id": movie_details.get('id'),
         "homepage": movie_details.get('homepage'),
@@ -236,229 +240,332 @@ def prepare_movie_document(movie_details, embedding):
     }
     return document
 
-def process_single_day(collection, date, stats, autocomplete_docs, seen_keys, json_path):
+def prepare_embedded(finished, stats):
+    """Documents for a finished embedding batch: [(movie_details, embedding, error), ...]."""
+    documents = []
+    for movie_details, embedding, error in finished:
+        try:
+            if error:
+                raise error
+            documents.append(prepare_movie_document(movie_details, embedding))
+        except Exception as e:
+            stats.add('errors')
+            print(f"⚠️  Error preparing movie {movie_details.get('id')}: {e}")
+    return documents
+
+def insert_documents(collection, documents, stats, label, known_ids=None, replace=False):
+    if not documents:
+        return
+    result = bulk_upsert(collection, documents, replace=replace)
+    if known_ids is not None:
+        failed = set(result['failed_ids'])
+        known_ids.add(doc['tmdb_id'] for doc in documents if doc['_id'] not in failed)
+    stats.add('inserted', result['written'])
+    stats.add('errors', len(result['failed_ids']))
+    if result['failed_ids']:
+        print(f"⚠️  Error batch inserting {label}: {len(result['failed_ids'])} failed ({format_latency(result)})")
+
+def build_pipeline(collection, stats, journal, known_ids, progress, tracker, replace=False):
     """
-    Process a single day. If it has >500 pages, cap at 500 (API limit).
-    Returns the number of new documents written since last checkpoint.
+    Crawl stages: discover a (date, filters, page) -> fetch details -> build the
+    embedding text and autocomplete entries -> embed a batch -> write a batch.
+    Every item carries its crawl date first, and `tracker` (pipeline.KeyTracker)
+    counts them, so a day is reported done once its last write finishes.
+    `replace` writes with find_one_and_replace only, for documents that exist.
     """
-    new_since_last_write = 0
+    def discover(date_filters_page):
+        date, filters, page = date_filters_page
+        results = discover_movies_by_date(page=page, date_min=date, date_max=date, filters=filters).get('results', [])
+        # Check existence against the known ids; only new titles are fetched
+        page_ids = [movie.get('id') for movie in results]
+        stats.add('processed', len(page_ids))
+        new_ids = known_ids.filter_new(page_ids)
+        stats.add('already_exists', len(page_ids) - len(new_ids))
+        return [(date, movie_id) for movie_id in new_ids]
+
+    def fetch(date_movie):
+        date, movie_id = date_movie
+        try:
+            return [(date, movie_id, get_movie_full_details(movie_id), None)]
+        except Exception as e:
+            return [(date, movie_id, None, e)]
+
+    def prepare(fetched):
+        date, movie_id, movie_details, fetch_error = fetched
+        if fetch_error:
+            if isinstance(fetch_error, requests.exceptions.HTTPError) and fetch_error.response.status_code == 404:
+                stats.add('not_found')
+            else:
+                stats.add('errors')
+            return None
+        # Skip movies shorter than 60 minutes
+        runtime = movie_details.get('runtime', 0)
+        if not runtime or runtime < 60:
+            stats.add('skipped_short')
+            return None
+        # Autocomplete doc creation
+        try:
+            for doc in create_autocomplete_documents(movie_details):
+                # Uniqueness: ID for titles, name for people/genres
+                journal.add(doc)
+        except Exception as e:
+            print(f"⚠️  Error generating autocomplete doc for movie {movie_id}: {e}")
+
+        try:
+            return [(date, movie_details, create_embedding_text(movie_details))]
+        except Exception as e:
+            stats.add('errors')
+            print(f"⚠️  Error preparing movie {movie_id}: {e}")
+            return None
+
+    def embed(batch):
+        # BatchEmbedder splits the batch again if it is over the token budget
+        embedder = BatchEmbedder(openai_client)
+        finished = []
+        for date, movie_details, embedding_text in batch:
+            finished += embedder.add((date, movie_details), embedding_text)
+        finished += embedder.flush()
+        return [
+            (date, document)
+            for (date, movie_details), embedding, error in finished
+            for document in prepare_embedded([(movie_details, embedding, error)], stats)
+        ]
+
+    def write(dated_documents):
+        documents = [document for _, document in dated_documents]
+        insert_documents(collection, documents, stats, f"{len(documents)} movies", known_ids, replace)
+        progress.update(len(documents))
+
+    return Pipeline([
+        Stage("discover", tracker.tracked(discover), workers=2),
+        Stage("fetch", tracker.tracked(fetch), workers=TMDB_CONCURRENCY),
+        Stage("prepare", tracker.tracked(prepare)),
+        Stage("embed", tracker.tracked(embed, batch=True), workers=2, batch_size=EMBEDDING_BATCH_SIZE,
+              batch_timeout=PARTIAL_BATCH_SECONDS),
+        Stage("write", tracker.tracked(write, batch=True), workers=ASTRA_WRITE_CONCURRENCY,
+              batch_size=ASTRA_WRITE_CHUNK, batch_timeout=PARTIAL_BATCH_SECONDS),
+    ])
+
+def day_pages(date):
+    """
+    (date, filters, page) items for every discover page of one day. Days with
+    more than 500 pages (the API limit) are split into vote bands until every
+    band fits (discover_partitions.py).
+    """
+    def discover_day(page, filters):
+        return discover_movies_by_date(page=page, date_min=date, date_max=date, filters=filters)
     
-    # Check total pages for this day
     try:
-        data = discover_movies_by_date(page=1, date_min=date, date_max=date)
-        total_pages = data.get('total_pages', 1)
-        total_results = data.get('total_results', 0)
-            
+        leaves = list(partition(discover_day, {}, VOTE_DIMENSIONS))
     except Exception as e:
         print(f"\n⚠️  Error checking {date}: {e}")
-        return new_since_last_write
+        return []
     
     # Skip if no results
-    if total_results == 0:
-        return new_since_last_write
-    
-    # Cap at 500 pages if needed
-    if total_pages > 500:
-        print(f"\n⚠️  {date} has {total_pages} pages - capping at 500 (API limit)")
-        total_pages = 500
+    if not leaves:
+        return []
     
-    # Process this day page by page
-    print(f"\n🚀 Processing {date} ({total_results} movies, {min(total_pages, 500)} pages)")
+    total_results = sum(results for _, results, _ in leaves)
+    total_pages = sum(pages for _, _, pages in leaves)
+    split = f" in {len(leaves)} vote bands" if len(leaves) > 1 else ""
+    print(f"\n🚀 Processing {date} ({total_results} movies, {total_pages} pages{split})")
     
-    current_page = 1
-    while current_page <= total_pages:
-        try:
-            data = discover_movies_by_date(page=current_page, date_min=date, date_max=date)
-            results = data.get('results', [])
-            
-            if not results:
-                break
-            
-            # Batch process this page
-            batch_documents = []
-            pbar = tqdm(results, desc=f"{date} | Page {current_page}/{total_pages}", ncols=100)
-            
-            for movie in pbar:
-                movie_id = movie.get('id')
-                stats['processed'] += 1
-                
-                # Check if already exists
-                try:
-                    existing = collection.find_one({"tmdb_id": movie_id})
-                    if existing:
-                        pbar.set_postfix_str(f"⏭️  Exists")
-                        stats['already_exists'] += 1
-                        continue
-                except Exception as e:
-                    print(f"Error checking existence: {e}")
+    return [(date, filters, page) for filters, _, pages in leaves for page in range(1, pages + 1)]
 
-                # Get full details
-                try:
-                    movie_details = get_movie_full_details(movie_id)
-                except requests.exceptions.HTTPError as e:
-                    if e.response.status_code == 404:
-                        stats['not_found'] += 1
-                        pbar.set_postfix_str(f"❌ Not Found")
-                        continue
-                    else:
-                        stats['errors'] += 1
-                        continue
-                except Exception as e:
-                    stats['errors'] += 1
-                    continue
-                
-                # Skip movies shorter than 60 minutes
-                runtime = movie_details.get('runtime', 0)
-                if not runtime or runtime < 60:
-                    stats['skipped_short'] += 1
-                    pbar.set_postfix_str(f"⏭️  Short ({runtime}m)")
-                    continue
-
-                # Prepare document
-                try:
-                    embedding_text = create_embedding_text(movie_details)
-                    embedding = generate_embedding(embedding_text)
-                    document = prepare_movie_document(movie_details, embedding)
-                    batch_documents.append(document)
-                    
-                    pbar.set_postfix_str(f"✅ {movie_details.get('title', '')[:20]}")
-                except Exception as e:
-                    stats['errors'] += 1
-                    print(f"⚠️  Error preparing movie {movie_id}: {e}")
-                
-                # Autocomplete doc creation
-                try:
-                    ac_docs = create_autocomplete_documents(movie_details)
-                    for doc in ac_docs:
-                        # Uniqueness check: ID for movies, Name for people/genres
-                        if doc.get('type') == 'movie':
-                            key = ('movie', doc.get('id'))
-                        else:
-                            key = (doc.get('type'), doc.get('name'))
-
-                        if key in seen_keys:
-                            continue
-                        seen_keys.add(key)
-                        autocomplete_docs.append(doc)
-                        new_since_last_write += 1
-                        if new_since_last_write >= 100:
-                            with open(json_path, "w") as f:
-                                json.dump(autocomplete_docs, f, ensure_ascii=False, indent=2)
-                            new_since_last_write = 0
-                except Exception as e:
-                    print(f"⚠️  Error generating autocomplete doc for movie {movie_id}: {e}")
-            
-            # Batch insert all documents from this page
-            if batch_documents:
-                try:
-                    for doc in batch_documents:
-                        collection.find_one_and_replace(
-                            {"_id": doc["_id"]},
-                            doc,
-                            upsert=True
-                        )
-                    stats['inserted'] += len(batch_documents)
-                except Exception as e:
-                    stats['errors'] += len(batch_documents)
-                    print(f"⚠️  Error batch inserting page {current_page}: {e}")
-            
-            current_page += 1
-            time.sleep(0.25)
-            
-        except KeyboardInterrupt:
-            raise
-        except Exception as e:
-            print(f"\n⚠️  Error on page {current_page}: {e}")
-            stats['errors'] += 1
-            break
-    
-    return new_since_last_write
+def print_summary(stats, pipeline, title="CRAWL COMPLETE"):
+    print(f"\n{'='*80}")
+    print(f"🎉 {title}")
+    print(f"{'='*80}")
+    print(f"Total Processed: {stats['processed']:,}")
+    print(f"Successfully Inserted: {stats['inserted']:,}")
+    print(f"Already Existed: {stats['already_exists']:,}")
+    print(f"Skipped (<60m): {stats['skipped_short']:,}")
+    print(f"Not Found (404): {stats['not_found']:,}")
+    print(f"Errors: {stats['errors']:,}")
+    print("Pipeline stages:")
+    print(pipeline.report())
+    print("TMDB latency by endpoint:")
+    print(latency_report())
+    print(f"OpenAI embeddings: {openai_limiter.report()}")
+    print(f"{'='*80}\n")
 
-def crawl_and_populate_by_day():
+def crawl_and_populate_by_day(process_count=1):
+    # Rate limiters are per process; N crawler processes split the configured rates
+    tmdb_limiter.share(process_count)
+    openai_limiter.share(process_count)
     collection, database = init_astra_collections()
     
-    stats = {
+    stats = SharedStats({
         'processed': 0,
         'inserted': 0,
         'already_exists': 0,
         'not_found': 0,
         'errors': 0,
         'skipped_short': 0
-    }
+    })
     
     # Autocomplete export setup
-    autocomplete_docs = []
-    seen_keys = set()
     os.makedirs("public", exist_ok=True)
     json_path = "public/autocomplete-fresh.json"
+    # Checkpoints append to a JSONL journal; the JSON is compacted once at the end
+    journal = AutocompleteJournal(json_path)
+    
+    # Existence checks are answered from a local index of the stored ids
+    known_ids = KnownIds(collection)
+    print(f"📚 Loaded {known_ids.load():,} known ids")
     
-    # Check for last processed date
+    # Days are crawled in leased ranges, so several workers can run at once.
+    # The legacy single checkpoint, if any, becomes the newest day to crawl.
+    metadata_col = database.get_collection("crawler_metadata_2026_filtered")
     last_date = get_last_processed_date(database)
-    if last_date:
-        # Start from the day before the last processed date
-        start_date = datetime.strptime(last_date, "%Y-%m-%d") - timedelta(days=1)
-        print(f"\n📍 Resuming from {start_date.strftime('%Y-%m-%d')} (last processed: {last_date})")
-    else:
-        start_date = datetime(2025, 12, 31)
-        print(f"\n🆕 Starting fresh from {start_date.strftime('%Y-%m-%d')}")
+    newest = (datetime.strptime(last_date, "%Y-%m-%d") - timedelta(days=1)).strftime("%Y-%m-%d") if last_date else CRAWL_START
+    created = seed_ranges(metadata_col, newest, CRAWL_END)
+    if created:
+        print(f"\n🆕 Split {newest} → {CRAWL_END} into {created} date ranges")
+    owner = worker_id()
+    print(f"\n👷 Worker {owner}: {range_summary(metadata_col)}")
     
-    end_date = datetime(1930, 1, 1)
-    current_date = start_date
+    # date -> (lease, last day of the lease?) for days in flight, and the
+    # leases this worker still holds (acquired, not yet completed or lost)
+    day_leases = {}
+    held = {}
     
-    while current_date >= end_date:
-        date_str = current_date.strftime("%Y-%m-%d")
-        
-        try:
-            new_since_last_write = process_single_day(
-                collection, date_str, stats, autocomplete_docs, seen_keys, json_path
-            )
-            
-            # Update metadata with current date
-            update_progress(database, date_str)
-            
-            # Write any remaining data
-            if new_since_last_write > 0:
-                with open(json_path, "w") as f:
-                    json.dump(autocomplete_docs, f, ensure_ascii=False, indent=2)
-                    
-        except KeyboardInterrupt:
-            print("\n🛑 Stopping crawl...")
-            # Final write before exiting
-            with open(json_path, "w") as f:
-                json.dump(autocomplete_docs, f, ensure_ascii=False, indent=2)
-            print(f"Saved {len(autocomplete_docs)} autocomplete entries before stopping")
-            break
-        
-        # Move to previous day
-        current_date -= timedelta(days=1)
+    def day_done(date_str):
+        # Called in date order once a day's last write has finished
+        lease, last_day = day_leases.pop(date_str)
+        if lease['_id'] not in held:
+            return
+        # Make the day's autocomplete entries durable before checkpointing it
+        journal.checkpoint()
+        if not checkpoint(metadata_col, lease, date_str, owner):
+            print(f"\n⚠️  Lease on {lease['_id']} expired and was taken over; moving on")
+            held.pop(lease['_id'], None)
+        elif last_day:
+            complete(metadata_col, lease, owner)
+            held.pop(lease['_id'], None)
+    
+    tracker = KeyTracker(on_done=day_done)
+    
+    def leased_pages():
+        while True:
+            lease = acquire(metadata_col, owner)
+            if lease is None:
+                print("\n✅ No date ranges left to crawl")
+                return
+            print(f"\n📍 Leased {lease['newest']} → {lease['oldest']} (resuming at {lease['next']})")
+            held[lease['_id']] = lease
+            days = list(lease_days(lease))
+            if not days:
+                complete(metadata_col, lease, owner)
+                held.pop(lease['_id'], None)
+            for i, date_str in enumerate(days):
+                if lease['_id'] not in held:
+                    break
+                day_leases[date_str] = (lease, i == len(days) - 1)
+                tracker.open(date_str)
+                for item in day_pages(date_str):
+                    tracker.add(date_str)
+                    yield item
+                tracker.seal(date_str)
+    
+    # One long-running pipeline over every leased day, so the stages overlap
+    # across day boundaries and embedding batches fill up
+    progress = tqdm(unit="title", desc="Written", ncols=100)
+    pipeline = build_pipeline(collection, stats, journal, known_ids, progress, tracker)
+    
+    try:
+        pipeline.run(leased_pages())
+    except KeyboardInterrupt:
+        print("\n🛑 Stopping crawl...")
+        # Unfinished leases go back to the pool, resuming after their last checkpoint
+        for lease in list(held.values()):
+            release(metadata_col, lease, owner)
+        # Final write before exiting
+        journal.checkpoint()
+        print(f"Saved {len(journal)} autocomplete entries to {journal.path} before stopping")
+    
+    progress.close()
     
     # Final write
-    with open(json_path, "w") as f:
-        json.dump(autocomplete_docs, f, ensure_ascii=False, indent=2)
-    print(f"Final export: {len(autocomplete_docs)} autocomplete entries to {json_path}")
+    exported = journal.compact()
+    journal.close()
+    print(f"Final export: {exported} autocomplete entries to {json_path}")
     
-    print(f"\n{'='*80}")
-    print(f"🎉 CRAWL COMPLETE")
-    print(f"{'='*80}")
-    print(f"Total Processed: {stats['processed']:,}")
-    print(f"Successfully Inserted: {stats['inserted']:,}")
-    print(f"Already Existed: {stats['already_exists']:,}")
-    print(f"Skipped (<60m): {stats['skipped_short']:,}")
-    print(f"Not Found (404): {stats['not_found']:,}")
-    print(f"Errors: {stats['errors']:,}")
-    print(f"{'='*80}\n")
+    print_summary(stats, pipeline)
+
+def reprocess_from_cache():
+    """
+    Rebuild every movie document from the cached TMDB details (tmdb_cache.py)
+    without calling TMDB, e.g. after changing create_embedding_text or
+    prepare_movie_document. Titles enter the pipeline at the prepare stage.
+    """
+    collection, database = init_astra_collections()
+    
+    stats = SharedStats({
+        'processed': 0,
+        'inserted': 0,
+        'already_exists': 0,
+        'not_found': 0,
+        'errors': 0,
+        'skipped_short': 0
+    })
+    
+    json_path = "public/autocomplete-fresh.json"
+    journal = AutocompleteJournal(json_path)
+    # Nothing is discovered, so the stored ids are not needed up front
+    known_ids = KnownIds(collection)
+    progress = tqdm(unit="title", desc="Rewritten", ncols=100)
+    # Nothing is checkpointed, so items carry no date; the documents exist, so writes skip insert_many
+    pipeline = Pipeline(build_pipeline(collection, stats, journal, known_ids, progress, KeyTracker(),
+                                       replace=True).stages[2:])
+    
+    cached = (
+        (None, record["payload"].get("id"), record["payload"], None)
+        for record in iter_cached("/movie/{id}")
+        if isinstance(record.get("payload"), dict)
+    )
+    try:
+        pipeline.run(cached)
+    except KeyboardInterrupt:
+        print("\n🛑 Stopping reprocess...")
+    progress.close()
+    
+    exported = journal.compact()
+    journal.close()
+    print(f"Final export: {exported} autocomplete entries to {json_path}")
+    print_summary(stats, pipeline, "REPROCESS COMPLETE")
 
 def main():
+    parser = argparse.ArgumentParser(description="Crawl TMDB movies day by day into Astra DB")
+    parser.add_argument("--reprocess-from-cache", action="store_true",
+                        help="Rebuild documents from cached TMDB details instead of crawling")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Crawler processes to run on this machine; each leases its own date ranges and gets 1/N of the rate limits")
+    args = parser.parse_args()
+    
     print("="*80)
     print("TMDB to Astra Vector Database Crawler (By Day)")
     print("="*80)
     print(f"\n⚙️  Configuration:")
-    print(f"   Date Range: 2025-12-31 → 1930-01-01 (day by day)")
-    print(f"   Caps at 500 pages per day (API limit)")
+    print(f"   Date Range: {CRAWL_START} → {CRAWL_END} (day by day, leased in {CRAWL_RANGE_DAYS}-day ranges)")
+    print(f"   Workers: {args.workers}")
+    print(f"   Days over 500 pages (API limit) are split into vote bands")
     print(f"   Embedding Model: {EMBEDDING_MODEL}")
     print(f"   Embedding Dimensions: {EMBEDDING_DIMENSIONS}")
     print()
-    crawl_and_populate_by_day()
+    if args.reprocess_from_cache:
+        reprocess_from_cache()
+    elif args.workers > 1:
+        # Separate processes, so each gets its own pipeline and connections,
+        # and a 1/N share of the TMDB and OpenAI rate limits
+        context = multiprocessing.get_context("spawn")
+        workers = [context.Process(target=crawl_and_populate_by_day, args=(args.workers,)) for _ in range(args.workers)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+    else:
+        crawl_and_populate_by_day()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,12 +1,19 @@
 import requests
 import json
 import os
-import time
 from datetime import datetime
 from dotenv import load_dotenv
 from astrapy import DataAPIClient
 from openai import OpenAI
 from tqdm import tqdm
+from embeddings import EMBEDDING_MODEL, EMBEDDING_DIMENSIONS, collection_name_for, create_embedding, BatchEmbedder, openai_limiter
+from known_ids import KnownIds
+from bulk_writer import bulk_upsert
+from discover_partitions import VOTE_DIMENSIONS, date_dimension, describe, partition
+from tmdb_fetcher import fetch_details, latency_report, tmdb_get_json
+
+import functions_path  # noqa: F401
+from provider_catalog import key_crew_ids, provider_ids_by_payment_type
 
 # Load environment variables
 load_dotenv()
@@ -28,9 +35,7 @@ if not ASTRA_DB_APPLICATION_TOKEN:
     raise ValueError("ASTRA_DB_APPLICATION_TOKEN not found in .env file")
 
 TMDB_BASE_URL = "https://api.themoviedb.org/3"
-COLLECTION_NAME = "movies2026"
-EMBEDDING_MODEL = "text-embedding-3-small"  # 1536 dimensions
-EMBEDDING_DIMENSIONS = 1536
+COLLECTION_NAME = collection_name_for("movies2026")
 
 # Initialize OpenAI client
 openai_client = OpenAI(api_key=OPENAI_API_KEY)
@@ -44,9 +49,10 @@ def init_astra_collections():
             COLLECTION_NAME,
             dimension=EMBEDDING_DIMENSIONS,
             metric="cosine",
-            indexing={"deny": ["none"]}  # Example indexed fields
+            # Field hashes are only read back by _id, never filtered on
+            indexing={"deny": ["_field_hashes"]}
         )
-        print(f"✅ Created new collection: {COLLECTION_NAME} with index on everything")
+        print(f"✅ Created new collection: {COLLECTION_NAME} (field hashes not indexed)")
     except Exception as e:
         if "already exists" in str(e).lower():
             collection = database.get_collection(COLLECTION_NAME)
@@ -63,8 +69,19 @@ def init_astra_collections():
             print(f"⚠️ Warning: Could not create metadata collection: {e}")
     return collection
 
-def discover_movies_filtered(page=1, vote_min=0, vote_max=10):
-    url = f"{TMDB_BASE_URL}/search/movie"
+# Crawl span; discover_partitions splits it by release date, vote average
+# and vote count until every partition fits under the 500-page cap
+FILTERED_RANGE = {
+    "with_release_date.gte": "1950-01-01",
+    "with_release_date.lte": "2025-01-01",  # Theatrical and Digital
+    "vote_count.gte": 10,
+}
+FILTERED_DIMENSIONS = [
+    date_dimension("with_release_date.gte", "with_release_date.lte", "1950-01-01", "2025-01-01"),
+] + VOTE_DIMENSIONS
+
+def discover_movies_filtered(page=1, filters=None):
+    url = f"{TMDB_BASE_URL}/discover/movie"
     params = {
         "api_key": TMDB_API_KEY,
         "language": "en-US",
@@ -73,19 +90,10 @@ def discover_movies_filtered(page=1, vote_min=0, vote_max=10):
         "include_video": False,
         "page": page,
         "with_runtime.gte": 60,
-        "vote_average.gte": vote_min,
-        "vote_average.lte": vote_max,
-        "vote_count.gte": 10,
         "region": "US",
-        "with_release_date.gte": "1950-01-01",
-        "with_release_date.lte": "2025-01-01"  # Theatrical and Digital
-
-
     }
-    response = requests.get(url, params=params)
-    print(response.json())
-    response.raise_for_status()
-    return response.json()
+    params.update(filters or FILTERED_RANGE)
+    return tmdb_get_json(url, params=params)
 
 def get_movie_full_details(movie_id):
     url = f"{TMDB_BASE_URL}/movie/{movie_id}"
@@ -94,9 +102,7 @@ def get_movie_full_details(movie_id):
         "language": "en-US",
         "append_to_response": "credits,keywords,videos,images,reviews,recommendations,similar,watch/providers,release_dates,external_ids"
     }
-    response = requests.get(url, params=params)
-    response.raise_for_status()
-    return response.json()
+    return tmdb_get_json(url, params=params)
 
 def create_autocomplete_documents(movie_details):
     """
@@ -158,12 +164,7 @@ def create_embedding_text(movie_details):
     return '\n'.join(parts)
 
 def generate_embedding(text):
-    response = openai_client.embeddings.create(
-        model=EMBEDDING_MODEL,
-        input=text,
-        encoding_format="float"
-    )
-    return response.data[0].embedding
+    return create_embedding(openai_client, text)
 
 def prepare_movie_document(movie_details, embedding):
     watch_providers = {}
@@ -179,14 +180,16 @@ def prepare_movie_document(movie_details, embedding):
         }
     credits = movie_details.get('credits', {})
     cast_details = [
-        {'name': c['name'], 'character': c.get('character', ''), 'order': c.get('order', 999), 'searchName': c['name'].lower()}
+        {'id': c.get('id'), 'name': c['name'], 'character': c.get('character', ''), 'order': c.get('order', 999), 'searchName': c['name'].lower()}
         for c in credits.get('cast', [])[:20]
     ]
     cast = [c['name'] for c in cast_details]
+    cast_ids = [c['id'] for c in cast_details if c['id'] is not None]
     crew = credits.get('crew', [])
     directors = [c['name'] for c in crew if c['job'] == 'Director']
     writers = [c['name'] for c in crew if c['department'] == 'Writing'][:5]
     producers = [c['name'] for c in crew if c['job'] == 'Producer'][:5]
+    crew_ids = key_crew_ids(crew)
 
     document = {
         "_id": str(movie_details['id']),
@@ -211,8 +214,11 @@ def prepare_movie_document(movie_details, embedding):
         "producers": producers,
         "cast": cast,
         "cast_details": cast_details,
+        "cast_ids": cast_ids,
+        "crew_ids": crew_ids,
         "production_companies": [c['name'] for c in movie_details.get('production_companies', [])],
         "watch_providers": watch_providers,
+        "watch_provider_ids": provider_ids_by_payment_type(wp_data.get('US')),
         "imdb_id": movie_details.get('external_ids', {}).get('imdb_id'),
         "tmdb_id": movie_details.get('id'),
         "homepage": movie_details.get('homepage'),
@@ -264,6 +270,28 @@ def process_and_insert_movie(collection, movie_id, progress_bar=None):
         print(f"\n⚠️  Error processing movie {movie_id}: {str(e)}")
         return False
 
+def save_embedded(collection, finished, stats, known_ids=None):
+    """Upsert a finished embedding batch: [(movie_details, embedding, error), ...]."""
+    documents = []
+    for movie_details, embedding, error in finished:
+        try:
+            if error:
+                raise error
+            documents.append(prepare_movie_document(movie_details, embedding))
+        except Exception as e:
+            stats['errors'] += 1
+            print(f"⚠️  Error preparing movie {movie_details.get('id')}: {e}")
+    if not documents:
+        return
+    result = bulk_upsert(collection, documents)
+    if known_ids is not None:
+        failed = set(result['failed_ids'])
+        known_ids.add(doc['tmdb_id'] for doc in documents if doc['_id'] not in failed)
+    stats['inserted'] += result['written']
+    stats['errors'] += len(result['failed_ids'])
+    for movie_id in result['failed_ids']:
+        print(f"⚠️  Error inserting movie {movie_id}")
+
 def update_progress(database, current_page):
     try:
         metadata_col = database.get_collection("crawler_metadata_2026_filtered")
@@ -276,15 +304,9 @@ def update_progress(database, current_page):
         pass
 
 def crawl_and_populate_filtered():
+    collection = init_astra_collections()
     database = collection.database
     
-    # Vote ranges to process (high to low) - 0.1 increments to avoid page limits
-    vote_ranges = []
-    for i in range(100, 0, -1):
-        upper = i / 10.0
-        lower = (i - 1) / 10.0
-        vote_ranges.append((lower, upper))
-
     stats = {
         'processed': 0,
         'inserted': 0,
@@ -299,61 +321,51 @@ def crawl_and_populate_filtered():
     os.makedirs("public", exist_ok=True)
     json_path = "public/autocomplete-fresh.json"
     new_since_last_write = 0
+    # Titles are embedded in batches that can span pages
+    embedder = BatchEmbedder(openai_client)
+    # Existence checks are answered from a local index of the stored ids
+    known_ids = KnownIds(collection)
+    print(f"📚 Loaded {known_ids.load():,} known ids")
 
-    for v_min, v_max in vote_ranges:
+    # Partitions are found as the crawl goes; each fits under the page cap
+    partitions = partition(lambda page, filters: discover_movies_filtered(page, filters),
+                           FILTERED_RANGE, FILTERED_DIMENSIONS)
+    for filters, total_results, range_pages in partitions:
         current_page = 1
-        print(f"\n🚀 Starting crawl for vote average {v_min} - {v_max}")
+        label = describe(filters)
+        print(f"\n🚀 Starting crawl for {label} ({total_results} movies, {range_pages} pages)")
         
         while True:
             try:
-                data = discover_movies_filtered(page=current_page, vote_min=v_min, vote_max=v_max)
+                data = discover_movies_filtered(page=current_page, filters=filters)
                 results = data.get('results', [])
-                total_pages = data.get('total_pages', 1)
+                total_pages = min(data.get('total_pages', 1), range_pages)
                 
                 if not results:
-                    print(f"No results on page {current_page} for range {v_min}-{v_max}. Moving to next range.")
+                    print(f"No results on page {current_page} for {label}. Moving to next range.")
                     break
                 
-                pbar = tqdm(results, desc=f"Range {v_min}-{v_max} | Page {current_page}/{total_pages}", ncols=100)
-                for movie in pbar:
-                    movie_id = movie.get('id')
-                    stats['processed'] += 1
-                    
-                    # Check if already exists
-                    try:
-                        existing = collection.find_one({"tmdb_id": movie_id})
-                        if existing:
-                            pbar.set_postfix_str(f"⏭️  Exists")
-                            stats['already_exists'] += 1
-                            continue # Skip processing if exists
-                    except Exception as e:
-                        print(f"Error checking existence: {e}")
+                # Check existence against the known ids, then fetch the remaining details concurrently
+                page_ids = [movie.get('id') for movie in results]
+                stats['processed'] += len(page_ids)
+                new_ids = known_ids.filter_new(page_ids)
+                stats['already_exists'] += len(page_ids) - len(new_ids)
 
-                    # Get full details once for both DB and autocomplete
-                    try:
-                        movie_details = get_movie_full_details(movie_id)
-                    except Exception as e:
+                pbar = tqdm(fetch_details(new_ids, get_movie_full_details), total=len(new_ids),
+                            desc=f"Page {current_page}/{total_pages}", ncols=100)
+                for movie_id, movie_details, fetch_error in pbar:
+                    # Full details once for both DB and autocomplete
+                    if fetch_error:
                         stats['errors'] += 1
-                        # print(f"⚠️  Error fetching details for movie {movie_id}: {e}")
                         continue
                     
-                    # Insert into Astra DB
+                    # Queue for embedding; full batches are inserted into Astra DB
                     try:
-                        embedding_text = create_embedding_text(movie_details)
-                        embedding = generate_embedding(embedding_text)
-                        document = prepare_movie_document(movie_details, embedding)
-                        
-                        collection.find_one_and_replace(
-                            {"_id": document["_id"]},
-                            document,
-                            upsert=True
-                        )
-                        
+                        save_embedded(collection, embedder.add(movie_details, create_embedding_text(movie_details)), stats, known_ids)
                         pbar.set_postfix_str(f"✅ {movie_details.get('title', '')[:20]}")
-                        stats['inserted'] += 1
                     except Exception as e:
                         stats['errors'] += 1
-                        print(f"⚠️  Error inserting movie {movie_id}: {e}")
+                        print(f"⚠️  Error queueing movie {movie_id}: {e}")
                     
                     # Autocomplete doc creation
                     try:
@@ -377,21 +389,23 @@ def crawl_and_populate_filtered():
                 # update_progress(database, current_page) # Progress tracking is complex with ranges, skipping for now
                 
                 if current_page >= total_pages:
-                    print(f"All pages processed for range {v_min}-{v_max}.")
+                    print(f"All pages processed for {label}.")
                     print(str(stats['inserted']) + "so far")
                     break
                 
                 current_page += 1
-                time.sleep(0.5)
             
             except KeyboardInterrupt:
                 print("\n🛑 Stopping crawl...")
+                save_embedded(collection, embedder.flush(), stats, known_ids)
                 return # Exit completely
             except Exception as e:
                 print(f"\n⚠️  Error on page {current_page}: {str(e)}")
                 stats['errors'] += 1
                 break # Move to next range on error? Or retry? Let's break to next range.
 
+        save_embedded(collection, embedder.flush(), stats, known_ids)
+
     # Final write at the end if there are unwritten entries
     if new_since_last_write > 0:
         with open(json_path, "w") as f:
@@ -405,6 +419,9 @@ def crawl_and_populate_filtered():
     print(f"Already Existed: {stats['already_exists']:,}")
     print(f"Not Found (404): {stats['not_found']:,}")
     print(f"Errors: {stats['errors']:,}")
+    print("TMDB latency by endpoint:")
+    print(latency_report())
+    print(f"OpenAI embeddings: {openai_limiter.report()}")
     print(f"{'='*80}\n")
 
 def main():
@@ -413,11 +430,11 @@ def main():
     print("="*80)
     print(f"\n⚙️  Configuration:")
     print(f"   Min Runtime: 60 minutes")
-    print(f"   Vote Average: 0-10 (processed in ranges)")
+    print(f"   Vote Average: 0-10 (split with release date and vote count to stay under 500 pages)")
     print(f"   Vote Count: >= 10")
     print(f"   Embedding Model: {EMBEDDING_MODEL}")
     print(f"   Embedding Dimensions: {EMBEDDING_DIMENSIONS}")
-    print(f".  Release Date: 1950-01-01 to 2010-01-01")
+    print(f"   Release Date: {FILTERED_RANGE['with_release_date.gte']} to {FILTERED_RANGE['with_release_date.lte']}")
     response = input("\n⚠️  This will crawl TMDB Discover API with filters. Continue? (yes/no): ")
     if response.lower() not in ('yes', 'y', ''):
         print("Cancelled.")
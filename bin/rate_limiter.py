@@ -0,0 +1,153 @@
+import time
+import random
+import threading
+import email.utils
+
+# Thread-safe token bucket shared by everything that calls a rate-limited API.
+#
+# Tokens refill continuously at `rate` per second up to `burst`; acquire()
+# blocks until a token is available. One bucket per API keeps concurrent
+# threads under the provider's global limit no matter how many there are.
+# Buckets are per process: when several processes share one API key, each
+# calls share(n) so their rates add up to the configured limit.
+
+
+class TokenBucket:
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(1, rate))
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def share(self, processes):
+        """Scale this bucket to a 1/`processes` share of its rate (one of `processes` peers)."""
+        if processes <= 1:
+            return
+        with self._lock:
+            self.rate /= processes
+            self.burst = max(1.0, self.burst / processes)
+            self._tokens = min(self._tokens, self.burst)
+
+    def acquire(self, tokens=1):
+        """Block until `tokens` are available, then take them."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+# Adaptive variant: the provider's real limit is found by probing instead of
+# being configured. The rate creeps up by about one request/second every
+# second while requests succeed and halves on a 429, which also pauses every
+# caller for the server's Retry-After (plus jitter, so they do not all resume
+# in the same instant). Transient failures (5xx, timeouts) are retried with
+# exponential backoff by the callers through backoff_delay().
+
+RETRYABLE_STATUS = {500, 502, 503, 504}
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date), or None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+def backoff_delay(attempt, base=1.0, cap=60.0):
+    """Exponential backoff with full jitter for retry number `attempt` (0-based)."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class AdaptiveRateLimiter(TokenBucket):
+    def __init__(self, rate, max_rate, min_rate=1.0, burst=None):
+        super().__init__(rate, burst)
+        self.max_rate = float(max_rate)
+        self.min_rate = float(min_rate)
+        self.requests = 0
+        self.throttled = 0
+        self.retried = 0
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._first = None
+        self._last = None
+
+    def share(self, processes):
+        """Scale the starting, ceiling and floor rates to a 1/`processes` share."""
+        if processes <= 1:
+            return
+        super().share(processes)
+        with self._lock:
+            self.max_rate /= processes
+            self.min_rate /= processes
+
+    def acquire(self, tokens=1):
+        while True:
+            with self._lock:
+                pause = self._paused_until - time.monotonic()
+            if pause <= 0:
+                break
+            time.sleep(pause)
+        super().acquire(tokens)
+        with self._lock:
+            now = time.monotonic()
+            self._first = self._first if self._first is not None else now
+            self._last = now
+            self.requests += tokens
+
+    def success(self):
+        """Additive increase: about +1 request/second per second of successes."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = min(self.max_rate, self.rate + 1.0 / self.rate)
+
+    def throttle(self, retry_after=None):
+        """
+        Multiplicative decrease after a 429, at most once per second so a burst
+        of concurrent 429s counts as one signal. Returns the seconds to wait.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.throttled += 1
+            if now - self._last_decrease >= 1.0:
+                self._refill(now)
+                self.rate = max(self.min_rate, self.rate / 2)
+                self._last_decrease = now
+            wait = (retry_after if retry_after is not None else 1.0) + random.uniform(0, 1.0)
+            self._paused_until = max(self._paused_until, now + wait)
+            return wait
+
+    def retry(self):
+        with self._lock:
+            self.retried += 1
+
+    def achieved_rate(self):
+        """Mean requests/second between the first and the latest request."""
+        with self._lock:
+            if self._first is None or self._last <= self._first:
+                return 0.0
+            return (self.requests - 1) / (self._last - self._first)
+
+    def report(self):
+        return (
+            f"{self.requests:,} requests at {self.achieved_rate():.1f}/s achieved, "
+            f"limit now {self.rate:.1f}/s (max {self.max_rate:.0f}), "
+            f"{self.throttled:,} throttled (429), {self.retried:,} retried"
+        )
@@ -3,6 +3,7 @@ import os
 import json
 import argparse
 from dotenv import load_dotenv
+from tmdb_fetcher import tmdb_get
 
 # Load environment variables from .env file
 load_dotenv()
@@ -26,8 +27,7 @@ def search_movie(query):
     
     try:
         print(f"Searching for: '{query}'...")
-        response = requests.get(url, params=params)
-        response.raise_for_status()
+        response = tmdb_get(url, params=params)
         data = response.json()
         
         results = data.get("results", [])
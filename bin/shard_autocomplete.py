@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Split an autocomplete JSON file into prefix shards plus a manifest, so the
+browser fetches only the shard for what has been typed.
+
+merge_autocomplete.py publishes the "movies" shards itself; use this for
+other datasets or to re-shard an existing file:
+
+    python bin/shard_autocomplete.py public/autocomplete-boardgames.json --dataset boardgames
+"""
+
+import json
+import gzip
+import argparse
+
+import functions_path  # noqa: F401
+from autocomplete_shards import SHARD_DIR, write_shards
+
+
+def load_entries(path):
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        return data.get('entries', []), data.get('types')
+    return data, None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shard an autocomplete file by name prefix")
+    parser.add_argument("input", help="autocomplete JSON file (.json or .json.gz)")
+    parser.add_argument("--dataset", required=True, help="Dataset name used in shard and manifest file names")
+    parser.add_argument("--out-dir", default=SHARD_DIR, help="Output directory (default: public/autocomplete)")
+    args = parser.parse_args()
+
+    entries, types = load_entries(args.input)
+    path, manifest = write_shards(entries, args.dataset, types, args.out_dir)
+    largest = max((s["bytes"] for s in manifest["shards"].values()), default=0)
+    print(f"✅ {manifest['total']:,} entries in {len(manifest['shards']):,} shards "
+          f"(largest {largest / 1024:.1f} KB)")
+    print(f"Manifest written to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,9 @@ import json
 from dotenv import load_dotenv
 from astrapy import DataAPIClient
 
+import functions_path  # noqa: F401
+from provider_catalog import canonical_provider_id
+
 load_dotenv(override=True)
 
 def run_search():
@@ -31,38 +34,22 @@ def run_search():
         filter_conditions.append({"genres": genre})
 
     if providers:
+        # Canonical provider ids are written at ingest, so each provider/payment
+        # type pair is a single equality lookup instead of a list of name variants
+        provider_ids = [canonical_provider_id(provider_name=p) for p in providers]
+        provider_ids = [p for p in provider_ids if p is not None]
         provider_clauses = []
-        for provider in providers:
-            variants = [provider]
-            if provider == "Disney+":
-                variants.append("Disney Plus")
-            if provider == "Paramount+":
-                variants.extend(["Paramount Plus", "Paramount Plus Essential", "Paramount Plus Premium"])
-            if provider == "Apple TV+":
-                variants.extend(["Apple TV", "Apple TV Plus"])
-            if provider == "Amazon Prime Video":
-                variants.append("Amazon Prime Video with Ads")
-            if provider == "Peacock":
-                variants.extend(["Peacock Premium", "Peacock Premium Plus"])
-            if provider == "YouTube":
-                variants.extend(["YouTube Premium", "YouTube TV"])
-            if provider == "Tubi":
-                variants.append("Tubi TV")
-            
-            clauses = []
-            if 'stream' in payment_types:
-                clauses.append({"watch_providers.US.stream": {"$in": variants}})
-            if 'rent' in payment_types:
-                clauses.append({"watch_providers.US.rent": {"$in": variants}})
-            if 'buy' in payment_types:
-                clauses.append({"watch_providers.US.buy": {"$in": variants}})
-            
-            if not clauses:
-                clauses.append({"watch_providers.US.stream": {"$in": variants}})
-                
-            provider_clauses.append({"$or": clauses})
-        
-        filter_conditions.append({"$or": provider_clauses})
+        for payment_type in payment_types or ["stream"]:
+            field = f"watch_provider_ids.{payment_type}"
+            if len(provider_ids) == 1:
+                provider_clauses.append({field: provider_ids[0]})
+            else:
+                provider_clauses.append({field: {"$in": provider_ids}})
+
+        if len(provider_clauses) == 1:
+            filter_conditions.append(provider_clauses[0])
+        else:
+            filter_conditions.append({"$or": provider_clauses})
     else:
         # Fallback: check for existence if no specific provider selected
         payment_clauses = []
@@ -0,0 +1,192 @@
+"""
+Persistent on-disk cache of raw TMDB responses.
+
+tmdb_fetcher.tmdb_get_json() stores every successful payload here, keyed by
+a hash of the URL and its parameters (the API key is left out of both the
+key and the stored record). Files are gzip-compressed JSON in a directory
+sharded by the first two hex digits of the key:
+
+    cache/tmdb/3f/3f9c...e1.json.gz
+
+Each endpoint has its own time-to-live: the changes feed goes stale within
+hours, detail payloads are kept for a month. Re-running a crawler, or
+changing how documents are built from the payloads, then re-reads the
+cache instead of re-downloading; iter_cached() walks every stored payload
+of one endpoint for the crawlers' --reprocess-from-cache mode.
+
+Stale files are kept for that mode, so the cache only shrinks when pruned:
+
+    python bin/tmdb_cache.py --max-age-days 90 --max-mb 2000
+
+deletes files older than the age limit, then the oldest files until the
+cache fits the size limit (defaults: TMDB_CACHE_MAX_AGE_DAYS and
+TMDB_CACHE_MAX_MB, unset means no limit).
+
+Set TMDB_CACHE=0 to bypass the cache, TMDB_CACHE_DIR to move it.
+"""
+
+import os
+import json
+import argparse
+import gzip
+import time
+import hashlib
+from dotenv import load_dotenv
+
+load_dotenv()
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+CACHE_DIR = os.getenv("TMDB_CACHE_DIR", os.path.join(ROOT_DIR, "cache", "tmdb"))
+TMDB_CACHE = os.getenv("TMDB_CACHE", "1") != "0"
+TMDB_CACHE_MAX_AGE_DAYS = float(os.getenv("TMDB_CACHE_MAX_AGE_DAYS") or 0) or None
+TMDB_CACHE_MAX_MB = float(os.getenv("TMDB_CACHE_MAX_MB") or 0) or None
+
+HOUR = 3600
+DAY = 24 * HOUR
+# Seconds a payload stays fresh, by endpoint (see tmdb_fetcher.endpoint_for)
+ENDPOINT_TTLS = {
+    "/movie/changes": 6 * HOUR,
+    "/tv/changes": 6 * HOUR,
+    "/discover/movie": DAY,
+    "/discover/tv": DAY,
+    "/movie/{id}": 30 * DAY,
+    "/tv/{id}": 30 * DAY,
+}
+DEFAULT_TTL = DAY
+
+# Never written to disk
+SECRET_PARAMS = {"api_key"}
+
+
+def _public_params(params):
+    return {k: v for k, v in (params or {}).items() if k not in SECRET_PARAMS}
+
+
+def cache_key(url, params=None):
+    canonical = json.dumps([url, _public_params(params)], sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def cache_path(key):
+    return os.path.join(CACHE_DIR, key[:2], f"{key}.json.gz")
+
+
+def _read(path):
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def get(url, params, endpoint, max_age=None):
+    """The cached payload if it is younger than `max_age` (default: the endpoint's TTL), else None."""
+    path = cache_path(cache_key(url, params))
+    if not os.path.exists(path):
+        return None
+    ttl = max_age if max_age is not None else ENDPOINT_TTLS.get(endpoint, DEFAULT_TTL)
+    try:
+        record = _read(path)
+    except (OSError, ValueError, EOFError):
+        # A torn write from an interrupted run; refetch
+        return None
+    if time.time() - record.get("fetched_at", 0) > ttl:
+        return None
+    return record.get("payload")
+
+
+def put(url, params, endpoint, payload):
+    path = cache_path(cache_key(url, params))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    record = {
+        "url": url,
+        "params": _public_params(params),
+        "endpoint": endpoint,
+        "fetched_at": time.time(),
+        "payload": payload,
+    }
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        json.dump(record, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+def iter_cached(endpoint):
+    """Yield every stored record ({url, params, endpoint, fetched_at, payload}) of one endpoint, stale or not."""
+    if not os.path.isdir(CACHE_DIR):
+        return
+    for shard in sorted(os.listdir(CACHE_DIR)):
+        shard_dir = os.path.join(CACHE_DIR, shard)
+        if not os.path.isdir(shard_dir):
+            continue
+        for filename in sorted(os.listdir(shard_dir)):
+            if not filename.endswith(".json.gz"):
+                continue
+            try:
+                record = _read(os.path.join(shard_dir, filename))
+            except (OSError, ValueError, EOFError):
+                continue
+            if record.get("endpoint") == endpoint:
+                yield record
+
+
+def _iter_files():
+    """(path, mtime, size) of every file under the cache, including torn .tmp writes."""
+    if not os.path.isdir(CACHE_DIR):
+        return
+    for shard in os.listdir(CACHE_DIR):
+        shard_dir = os.path.join(CACHE_DIR, shard)
+        if not os.path.isdir(shard_dir):
+            continue
+        for filename in os.listdir(shard_dir):
+            path = os.path.join(shard_dir, filename)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            yield path, stat.st_mtime, stat.st_size
+
+
+def prune(max_age=None, max_bytes=None, dry_run=False):
+    """
+    Delete cache files older than `max_age` seconds, then the oldest files
+    until the cache is at most `max_bytes`. A file's mtime is its fetch time
+    (put() writes it whole), so no payload is decompressed. .tmp files left
+    by interrupted writes are removed once they are an hour old.
+    Returns (files removed, bytes removed, bytes kept).
+    """
+    now = time.time()
+    files = sorted(_iter_files(), key=lambda f: f[1])
+    kept_bytes = sum(size for _, _, size in files)
+    removed, removed_bytes = 0, 0
+    for path, mtime, size in files:
+        expired = max_age is not None and now - mtime > max_age
+        oversize = max_bytes is not None and kept_bytes > max_bytes
+        torn = path.endswith(".tmp") and now - mtime > HOUR
+        if not (expired or oversize or torn):
+            continue
+        if not dry_run:
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+        removed += 1
+        removed_bytes += size
+        kept_bytes -= size
+    return removed, removed_bytes, kept_bytes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prune the on-disk TMDB response cache by age and size.")
+    parser.add_argument("--max-age-days", type=float, default=TMDB_CACHE_MAX_AGE_DAYS,
+                        help="Delete files fetched more than this many days ago (default: TMDB_CACHE_MAX_AGE_DAYS)")
+    parser.add_argument("--max-mb", type=float, default=TMDB_CACHE_MAX_MB,
+                        help="Then delete the oldest files until the cache fits (default: TMDB_CACHE_MAX_MB)")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would be deleted without deleting")
+    args = parser.parse_args()
+
+    if args.max_age_days is None and args.max_mb is None:
+        parser.error("Give --max-age-days and/or --max-mb (or set TMDB_CACHE_MAX_AGE_DAYS / TMDB_CACHE_MAX_MB)")
+    max_age = args.max_age_days * DAY if args.max_age_days is not None else None
+    max_bytes = int(args.max_mb * 1024 * 1024) if args.max_mb is not None else None
+    removed, removed_bytes, kept_bytes = prune(max_age, max_bytes, args.dry_run)
+    verb = "Would remove" if args.dry_run else "Removed"
+    print(f"🧹 {verb} {removed} files ({removed_bytes / 1024 / 1024:.1f} MB) from {CACHE_DIR}; "
+          f"{kept_bytes / 1024 / 1024:.1f} MB kept")
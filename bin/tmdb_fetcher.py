@@ -0,0 +1,175 @@
+"""
+Rate-limited concurrent TMDB fetching shared by the bin/ scripts.
+
+Every TMDB request made through tmdb_get() takes a token from one
+process-wide adaptive limiter (rate_limiter.AdaptiveRateLimiter): it starts
+at TMDB_RATE_LIMIT requests/second (default 40), climbs towards
+TMDB_RATE_MAX (default 100) while requests succeed and halves on a 429,
+pausing for Retry-After. 429s, 5xx responses and timeouts are retried up to
+TMDB_MAX_RETRIES times with jittered exponential backoff. The limiter is per
+process; crawlers started with --workers N give each process a 1/N share.
+Requests go out on one pooled keep-alive session, so connections (and their
+TLS handshakes) are reused across requests and threads. Requests time out
+after TMDB_CONNECT_TIMEOUT / TMDB_READ_TIMEOUT seconds instead of hanging a
+crawl, and their latency is tallied per endpoint for latency_report().
+tmdb_get_json() additionally serves payloads from the on-disk raw-response
+cache in tmdb_cache.py.
+
+fetch_details() runs detail requests on a bounded thread pool
+(TMDB_CONCURRENCY workers, default 8), yielding results in submission order
+so callers keep their existing per-outcome bookkeeping.
+"""
+
+import os
+import re
+import time
+import atexit
+import threading
+import requests
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from rate_limiter import RETRYABLE_STATUS, AdaptiveRateLimiter, backoff_delay, parse_retry_after
+import tmdb_cache
+
+load_dotenv()
+
+TMDB_RATE_LIMIT = float(os.getenv("TMDB_RATE_LIMIT", "40"))
+TMDB_RATE_MAX = float(os.getenv("TMDB_RATE_MAX", "100"))
+TMDB_MAX_RETRIES = int(os.getenv("TMDB_MAX_RETRIES", "5"))
+TMDB_CONCURRENCY = int(os.getenv("TMDB_CONCURRENCY", "8"))
+TMDB_CONNECT_TIMEOUT = float(os.getenv("TMDB_CONNECT_TIMEOUT", "5"))
+TMDB_READ_TIMEOUT = float(os.getenv("TMDB_READ_TIMEOUT", "30"))
+# Pooled connections: the fetch workers plus a few callers outside the pool
+POOL_SIZE = TMDB_CONCURRENCY + 4
+
+tmdb_limiter = AdaptiveRateLimiter(TMDB_RATE_LIMIT, TMDB_RATE_MAX)
+
+_executor = None
+_session = None
+_session_lock = threading.Lock()
+_latency = {}
+_cache_hits = {}
+_latency_lock = threading.Lock()
+
+
+def _get_session():
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update({"Accept": "application/json", "Accept-Encoding": "gzip"})
+            _session = session
+            atexit.register(session.close)
+        return _session
+
+
+def endpoint_for(url):
+    """Endpoint label for latency accounting, e.g. /movie/{id}/changes."""
+    path = urlsplit(url).path
+    path = re.sub(r"^/3(?=/)", "", path)
+    return re.sub(r"/\d+(?=/|$)", "/{id}", path)
+
+
+def _record_latency(endpoint, seconds):
+    with _latency_lock:
+        count, total, worst = _latency.get(endpoint, (0, 0.0, 0.0))
+        _latency[endpoint] = (count + 1, total + seconds, max(worst, seconds))
+
+
+def tmdb_get(url, params=None, headers=None, raise_for_status=True):
+    """
+    GET a TMDB URL behind the shared limiter on the pooled session, retrying
+    429s, 5xx responses and connection errors/timeouts. Raises for HTTP
+    errors (after the retries) unless `raise_for_status` is False, and for
+    timeouts that outlast the retries.
+    """
+    endpoint = endpoint_for(url)
+    attempt = 0
+    while True:
+        tmdb_limiter.acquire()
+        started = time.monotonic()
+        try:
+            response = _get_session().get(url, params=params, headers=headers,
+                                          timeout=(TMDB_CONNECT_TIMEOUT, TMDB_READ_TIMEOUT))
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            if attempt >= TMDB_MAX_RETRIES:
+                raise
+            delay = backoff_delay(attempt)
+        else:
+            if response.status_code == 429:
+                delay = tmdb_limiter.throttle(parse_retry_after(response.headers.get("Retry-After")))
+            elif response.status_code in RETRYABLE_STATUS:
+                delay = backoff_delay(attempt)
+            else:
+                tmdb_limiter.success()
+                break
+            if attempt >= TMDB_MAX_RETRIES:
+                break
+        finally:
+            _record_latency(endpoint, time.monotonic() - started)
+        tmdb_limiter.retry()
+        attempt += 1
+        time.sleep(delay)
+    if raise_for_status:
+        response.raise_for_status()
+    return response
+
+
+def tmdb_get_json(url, params=None, headers=None, max_age=None):
+    """
+    Parsed JSON of a TMDB GET, served from the raw-response cache
+    (tmdb_cache.py) while fresh. Only successful responses are cached.
+    """
+    endpoint = endpoint_for(url)
+    if tmdb_cache.TMDB_CACHE:
+        payload = tmdb_cache.get(url, params, endpoint, max_age)
+        if payload is not None:
+            with _latency_lock:
+                _cache_hits[endpoint] = _cache_hits.get(endpoint, 0) + 1
+            return payload
+    payload = tmdb_get(url, params=params, headers=headers).json()
+    if tmdb_cache.TMDB_CACHE:
+        tmdb_cache.put(url, params, endpoint, payload)
+    return payload
+
+
+def latency_report():
+    """Request count, cache hits and mean/max latency per TMDB endpoint, slowest total first."""
+    with _latency_lock:
+        rows = sorted(_latency.items(), key=lambda item: item[1][1], reverse=True)
+        hits = dict(_cache_hits)
+    lines = [
+        f"   {endpoint:<28} {count:>8,} requests  avg {total / count * 1000:>6.0f}ms  max {worst * 1000:>6.0f}ms"
+        f"  {hits.pop(endpoint, 0):>8,} cached"
+        for endpoint, (count, total, worst) in rows
+    ]
+    lines += [f"   {endpoint:<28} {0:>8,} requests  {hits[endpoint]:>34,} cached" for endpoint in sorted(hits)]
+    lines.append(f"   Rate: {tmdb_limiter.report()}")
+    return "\n".join(lines)
+
+
+def _pool():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=TMDB_CONCURRENCY, thread_name_prefix="tmdb")
+        atexit.register(_executor.shutdown, wait=False)
+    return _executor
+
+
+def fetch_details(ids, fetch_fn):
+    """
+    Call fetch_fn(id) for every id on the shared pool. Yields
+    (id, result, error) in the order ids were given; error is the exception
+    raised for that id (e.g. requests.exceptions.HTTPError), or None.
+    """
+    futures = [(item_id, _pool().submit(fetch_fn, item_id)) for item_id in ids]
+    for item_id, future in futures:
+        try:
+            yield item_id, future.result(), None
+        except Exception as e:
+            yield item_id, None, e
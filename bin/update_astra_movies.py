@@ -1,10 +1,16 @@
-import requests
 import os
+import json
+import hashlib
 import datetime
-import time
 from dotenv import load_dotenv
 from openai import OpenAI
 from astrapy import DataAPIClient
+from embeddings import BatchEmbedder, collection_name_for, openai_limiter
+from tmdb_fetcher import latency_report, tmdb_get
+from autocomplete_deltas import publish as publish_autocomplete_deltas, record_changes
+
+import functions_path  # noqa: F401
+from provider_catalog import key_crew_ids, provider_ids_by_payment_type
 
 # Load environment variables
 load_dotenv()
@@ -16,10 +22,31 @@ ASTRA_ENDPOINT = os.getenv("ASTRA_DB_API_ENDPOINT")
 
 # Collection mapping
 COLLECTIONS = {
-    "movie": "movies2026",
-    "tv": "tvshows2026"
+    "movie": collection_name_for("movies2026"),
+    "tv": collection_name_for("tvshows2026")
 }
 METADATA_COLLECTION = "maintenance_metadata"
+# Fields of the replaced document needed to diff its autocomplete entries
+AUTOCOMPLETE_PROJECTION = {"_id": 1, "title": 1, "name": 1, "cast": 1, "genres": 1}
+# Short hash of each material field, stored on the document so the next
+# update can tell which fields changed without reading them back
+FIELD_HASHES = "_field_hashes"
+# Date the whole document was last written; volatile fields (popularity,
+# vote counts, raw credits, ...) are only refreshed with a material change or
+# once this is UPDATE_REFRESH_DAYS old
+REFRESHED_AT = "_refreshed_at"
+REFRESH_DAYS = int(os.getenv("UPDATE_REFRESH_DAYS", "30"))
+EXISTING_PROJECTION = dict(AUTOCOMPLETE_PROJECTION, **{FIELD_HASHES: 1, REFRESHED_AT: 1})
+# Fields the embedding text is built from
+TEXT_FIELDS = ("title", "name", "overview")
+# Fields whose change is worth a write: the embedded text, filter fields,
+# providers and the person ids
+MATERIAL_FIELDS = TEXT_FIELDS + (
+    "genres", "original_language", "release_date", "first_air_date", "keywords",
+    "cast", "cast_ids", "crew_ids", "watch_provider_ids",
+)
+# Astra DB accepts at most 100 values in an $in filter
+UPDATE_CHUNK = 100
 
 if not all([TMDB_TOKEN, OPENAI_KEY, ASTRA_TOKEN, ASTRA_ENDPOINT]):
     print("Error: Missing necessary environment variables.")
@@ -87,7 +114,7 @@ def get_changed_ids_for_date(media_type, target_date):
         }
         
         try:
-            resp = requests.get(url, headers=headers)
+            resp = tmdb_get(url, headers=headers, raise_for_status=False)
             if resp.status_code != 200:
                 print(f"   Failed to fetch changes page {page}: {resp.text}")
                 break
@@ -107,7 +134,6 @@ def get_changed_ids_for_date(media_type, target_date):
                 break
                 
             page += 1
-            time.sleep(0.1) 
             
         except Exception as e:
             print(f"   Error fetching changes: {e}")
@@ -115,17 +141,11 @@ def get_changed_ids_for_date(media_type, target_date):
             
     return list(changed_ids)
 
-def get_embedding(text):
-    if not text:
-        return None
-    try:
-        response = openai_client.embeddings.create(input=text, model="text-embedding-3-small")
-        return response.data[0].embedding
-    except Exception as e:
-        print(f"   Embedding error: {e}")
-        return None
-
-def update_item(media_type, item_id):
+def prepare_item(media_type, item_id):
+    """
+    Fetch and reshape one changed item. Returns (document, text to embed),
+    or None if the item is gone or has nothing to embed.
+    """
     # Fetch FULL details including cast (credits), keywords, and providers
     url = f"https://api.themoviedb.org/3/{media_type}/{item_id}?append_to_response=credits,keywords,watch/providers"
     headers = {
@@ -134,12 +154,13 @@ def update_item(media_type, item_id):
     }
     
     try:
-        resp = requests.get(url, headers=headers)
+        resp = tmdb_get(url, headers=headers, raise_for_status=False)
         if resp.status_code == 404:
-            return # Deleted
+            return None # Deleted
         
         if resp.status_code != 200:
-            return
+            print(f"   Failed to fetch {media_type} {item_id}: HTTP {resp.status_code}")
+            return None
 
         data = resp.json()
         
@@ -154,7 +175,7 @@ def update_item(media_type, item_id):
         overview = data.get('overview', '')
         
         if not title and not overview:
-            return
+            return None
 
         # Structure rich data for frontend (main.js expectation)
         
@@ -164,8 +185,11 @@ def update_item(media_type, item_id):
         if 'cast' in credits:
             data['cast'] = [actor.get('name') for actor in credits['cast'] if actor.get('name')]
             data['cast_details'] = credits['cast'] # Frontend often looks here for full details
+            data['cast_ids'] = [actor['id'] for actor in credits['cast'] if actor.get('id') is not None]
         if 'crew' in credits:
             data['crew'] = credits['crew']
+        # TMDB person ids for the person index (cast/crew names are not unique)
+        data['crew_ids'] = key_crew_ids(credits.get('crew'), data.get('created_by'))
 
         # 2. Keywords
         kws = data.get('keywords', {})
@@ -179,28 +203,113 @@ def update_item(media_type, item_id):
         wp = data.get('watch/providers', {})
         if 'results' in wp:
             data['watch_providers'] = wp['results']
+            data['watch_provider_ids'] = provider_ids_by_payment_type(wp['results'].get('US'))
 
-        text_to_embed = f"{title}: {overview}"
-        vector = get_embedding(text_to_embed)
-        
-        if vector:
-            data['$vector'] = vector
-            data['type'] = media_type
-            data['_id'] = _id
-            
-            target_collection_name = COLLECTIONS[media_type]
-            collection = db.get_collection(target_collection_name)
-            
-            collection.find_one_and_replace(
-                {"_id": _id},
-                data,
-                upsert=True
-            )
-        else:
-            print(f"   Skipping {item_id}: No vector generated.")
+        data['type'] = media_type
+        data['_id'] = _id
+        return data, f"{title}: {overview}"
 
     except Exception as e:
         print(f"   Error updating {item_id}: {e}")
+        return None
+
+def field_hashes(doc):
+    """{field: short content hash} for the MATERIAL_FIELDS present in doc."""
+    return {
+        field: hashlib.sha256(
+            json.dumps(doc[field], sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+        ).hexdigest()[:16]
+        for field in MATERIAL_FIELDS
+        if field in doc
+    }
+
+def diff_fields(old_hashes, new_hashes):
+    """(changed or added fields, removed fields) between two field_hashes() results."""
+    changed = [field for field, digest in new_hashes.items() if old_hashes.get(field) != digest]
+    # Older documents hashed every field; only material ones count as removed
+    removed = [field for field in old_hashes if field in MATERIAL_FIELDS and field not in new_hashes]
+    return changed, removed
+
+def stale_text_hashes(hashes, old_hashes):
+    """hashes with the TEXT_FIELDS entries reverted to old_hashes (dropped if absent there)."""
+    hashes = {field: digest for field, digest in hashes.items() if field not in TEXT_FIELDS}
+    hashes.update((field, old_hashes[field]) for field in TEXT_FIELDS if field in old_hashes)
+    return hashes
+
+def load_existing(collection, ids):
+    """{_id: stored field hashes and autocomplete fields} for the ids that exist."""
+    existing = {}
+    for doc in collection.find({"_id": {"$in": ids}}, projection=EXISTING_PROJECTION):
+        existing[doc["_id"]] = doc
+    return existing
+
+def write_update(collection, media_type, data, previous, update, stats):
+    try:
+        collection.update_one({"_id": data['_id']}, update)
+        # Autocomplete add/remove deltas for what this update changed
+        record_changes(media_type, previous, data)
+        stats['updated'] += 1
+    except Exception as e:
+        print(f"   Error updating {data['_id']}: {e}")
+
+def save_items(media_type, prepared, stats):
+    """
+    Write one chunk of prepared items [(document, text to embed), ...].
+    Documents written before field hashes existed (or not at all) are
+    replaced whole. Others are skipped unless a material field changed or
+    the document is due a refresh; then every field is $set and removed
+    material fields are $unset. Only changed texts are re-embedded; if that
+    fails the other changes are still written.
+    """
+    collection = db.get_collection(COLLECTIONS[media_type])
+    existing = load_existing(collection, [data['_id'] for data, _ in prepared])
+    embedder = BatchEmbedder(openai_client)
+    embedded = []
+    today = datetime.date.today()
+    refresh_before = (today - datetime.timedelta(days=REFRESH_DAYS)).isoformat()
+    for data, text in prepared:
+        hashes = field_hashes(data)
+        data[FIELD_HASHES] = hashes
+        data[REFRESHED_AT] = today.isoformat()
+        previous = existing.get(data['_id'])
+        if not previous or not previous.get(FIELD_HASHES):
+            embedded += embedder.add((data, previous, None), text)
+            continue
+        changed, removed = diff_fields(previous[FIELD_HASHES], hashes)
+        if not changed and not removed and previous.get(REFRESHED_AT, "") >= refresh_before:
+            stats['unchanged'] += 1
+            continue
+        update = {"$set": {field: value for field, value in data.items() if field != "_id"}}
+        if removed:
+            update["$unset"] = {field: "" for field in removed}
+        if any(field in changed or field in removed for field in TEXT_FIELDS):
+            embedded += embedder.add((data, previous, update), text)
+        else:
+            write_update(collection, media_type, data, previous, update, stats)
+    embedded += embedder.flush()
+
+    for (data, previous, update), vector, error in embedded:
+        if error and update is not None:
+            # Keep the other changes; the text fields keep their old hashes
+            # so the next run sees them as changed and re-embeds
+            print(f"   Updating {data['_id']} without a new vector ({error}).")
+            update["$set"][FIELD_HASHES] = stale_text_hashes(update["$set"][FIELD_HASHES], previous[FIELD_HASHES])
+            write_update(collection, media_type, data, previous, update, stats)
+            continue
+        if error:
+            print(f"   Skipping {data['_id']}: No vector generated ({error}).")
+            continue
+        if update is not None:
+            update["$set"]["$vector"] = vector
+            write_update(collection, media_type, data, previous, update, stats)
+            continue
+        data['$vector'] = vector
+        try:
+            collection.find_one_and_replace({"_id": data['_id']}, data, upsert=True)
+            record_changes(media_type, previous, data)
+            stats['replaced'] += 1
+        except Exception as e:
+            print(f"   Error updating {data['_id']}: {e}")
 
 def main():
     today = datetime.date.today()
@@ -232,17 +341,32 @@ def main():
             else:
                 print(f"   Found {len(ids)} changes. Processing...")
                 count = 0
+                stats = {'replaced': 0, 'updated': 0, 'unchanged': 0}
+                # Changed items are diffed against the stored documents a chunk at a time
+                pending = []
                 for mid in ids:
-                    update_item(media_type, mid)
+                    prepared = prepare_item(media_type, mid)
+                    if prepared:
+                        pending.append(prepared)
+                    if len(pending) >= UPDATE_CHUNK:
+                        save_items(media_type, pending, stats)
+                        pending = []
                     count += 1
                     if count % 50 == 0:
                         print(f"   ... processed {count}/{len(ids)}")
-                    time.sleep(0.2) 
+                if pending:
+                    save_items(media_type, pending, stats)
+                print(f"   {stats['replaced']} replaced, {stats['updated']} updated, "
+                      f"{stats['unchanged']} unchanged")
             
             update_checkpoint(media_type, current_date)
             current_date += datetime.timedelta(days=1)
 
     print("\nBatch update complete.")
+    print("TMDB latency by endpoint:")
+    print(latency_report())
+    print(f"OpenAI embeddings: {openai_limiter.report()}")
+    publish_autocomplete_deltas()
 
 if __name__ == "__main__":
     main()
@@ -3,10 +3,44 @@ import fetch from "node-fetch";
 import fs from "fs";
 import path from "path";
 import dotenv from "dotenv";
+import providerCatalog from "./provider_catalog.json" with { type: "json" };
 
 dotenv.config({ override: true });
 
 const EMBEDDING_MODEL = "text-embedding-3-small"; 
+const DEFAULT_EMBEDDING_DIMENSIONS = 1536;
+const EMBEDDING_DIMENSIONS = parseInt(process.env.EMBEDDING_DIMENSIONS || DEFAULT_EMBEDDING_DIMENSIONS, 10);
+
+// Reduced-dimension embeddings live in parallel collections (e.g. movies2026_d256)
+function vectorCollectionName(baseName) {
+  return EMBEDDING_DIMENSIONS === DEFAULT_EMBEDDING_DIMENSIONS ? baseName : `${baseName}_d${EMBEDDING_DIMENSIONS}`;
+}
+const MOVIES_COLLECTION = vectorCollectionName('movies2026');
+const TV_COLLECTION = vectorCollectionName('tvshows2026');
+
+// Canonical watch-provider ids, from the catalogue shared with provider_catalog.py.
+// Documents store watch_provider_ids.{stream,rent,buy} arrays of these ids.
+const PAYMENT_TYPES = ['stream', 'rent', 'buy'];
+
+function normalizeProviderName(name) {
+  return String(name).toLowerCase().replace(/\+/g, ' plus ').replace(/[^a-z0-9]+/g, ' ').trim();
+}
+
+const providerIdsByTmdbId = new Map();
+const providerIdsByName = new Map();
+for (const provider of providerCatalog) {
+  provider.tmdb_ids.forEach(tmdbId => providerIdsByTmdbId.set(tmdbId, provider.id));
+  [provider.name, ...provider.aliases].forEach(name => providerIdsByName.set(normalizeProviderName(name), provider.id));
+}
+
+// Canonical id for a provider name ("Disney Plus") or TMDB id ("337"); null for an unknown name
+function canonicalProviderId(provider) {
+  if (/^\d+$/.test(String(provider))) {
+    const tmdbId = parseInt(provider, 10);
+    return providerIdsByTmdbId.get(tmdbId) ?? tmdbId;
+  }
+  return providerIdsByName.get(normalizeProviderName(provider)) ?? null;
+}
 
 // Instantiate client globally to reuse connection across invocations
 const client = new DataAPIClient(process.env.ASTRA_DB_APPLICATION_TOKEN);
@@ -59,7 +93,11 @@ async function generateEmbedding(text) {
       "Authorization": `Bearer ${process.env.OPENAI_API_KEY}`,
       "Content-Type": "application/json"
     },
-    body: JSON.stringify({ model: EMBEDDING_MODEL, input: text })
+    body: JSON.stringify({
+      model: EMBEDDING_MODEL,
+      input: text,
+      ...(EMBEDDING_DIMENSIONS !== DEFAULT_EMBEDDING_DIMENSIONS ? { dimensions: EMBEDDING_DIMENSIONS } : {})
+    })
   });
   
   const data = await response.json();
@@ -135,12 +173,12 @@ export async function handler(event) {
   const contentTypesParam = qs.content_types || "movies";
   const contentTypes = contentTypesParam.split(',').map(t => t.trim());
   const collections = [];
-  if (contentTypes.includes('movies')) collections.push({ name: 'movies2026', type: 'movie' });
-  if (contentTypes.includes('tvshows')) collections.push({ name: 'tvshows2026', type: 'tv' });
+  if (contentTypes.includes('movies')) collections.push({ name: MOVIES_COLLECTION, type: 'movie' });
+  if (contentTypes.includes('tvshows')) collections.push({ name: TV_COLLECTION, type: 'tv' });
   if (contentTypes.includes('boardgames')) collections.push({ name: 'bgg_board_games', type: 'boardgame', keyspace: 'boardgames' });
-  if (collections.length === 0) collections.push({ name: 'movies2026', type: 'movie' });
+  if (collections.length === 0) collections.push({ name: MOVIES_COLLECTION, type: 'movie' });
   
-  const moviesCollection = db.collection('movies2026');
+  const moviesCollection = db.collection(MOVIES_COLLECTION);
 
   try {
     switch (action) {
@@ -297,25 +335,15 @@ export async function handler(event) {
             if (languages.length > 0) filterConditions.push({ original_language: { $in: languages } });
 
             if (providers.length > 0) {
-                 const providerClauses = providers.map(provider => {
-                     let variants = [provider];
-                     if (provider === "Disney+") variants.push("Disney Plus");
-                     if (provider === "Paramount+") variants.push("Paramount Plus", "Paramount Plus Essential", "Paramount Plus Premium");
-                     if (provider === "Apple TV+") variants.push("Apple TV", "Apple TV Plus");
-                     if (provider === "Amazon Prime Video") variants.push("Amazon Prime Video with Ads");
-                     if (provider === "Peacock") variants.push("Peacock Premium", "Peacock Premium Plus");
-                     if (provider === "YouTube") variants.push("YouTube Premium", "YouTube TV");
-                     if (provider === "Tubi") variants.push("Tubi TV");
-                     
-                     const clauses = [];
-                     if (paymentTypes.includes('stream')) clauses.push({ "watch_providers.US.stream": { $in: variants } });
-                     if (paymentTypes.includes('rent')) clauses.push({ "watch_providers.US.rent": { $in: variants } });
-                     if (paymentTypes.includes('buy')) clauses.push({ "watch_providers.US.buy": { $in: variants } });
-                     if (clauses.length === 0) clauses.push({ "watch_providers.US.stream": { $in: variants } });
-                     
-                     return { $or: clauses };
-                });
-                filterConditions.push({ $or: providerClauses });
+                 // One equality (or $in) on the canonical id arrays written at ingest
+                 const providerIds = [...new Set(providers.map(canonicalProviderId).filter(id => id !== null))];
+                 const types = paymentTypes.filter(pt => PAYMENT_TYPES.includes(pt));
+                 const providerClauses = (types.length > 0 ? types : ['stream']).map(pt => ({
+                     [`watch_provider_ids.${pt}`]: providerIds.length === 1 ? providerIds[0] : { $in: providerIds }
+                 }));
+                 if (providerIds.length > 0) {
+                     filterConditions.push(providerClauses.length === 1 ? providerClauses[0] : { $or: providerClauses });
+                 }
             } else {
                  const paymentClauses = [];
                  if (paymentTypes.includes('stream')) paymentClauses.push({ "watch_providers.US.stream": { $exists: true } });
@@ -478,8 +506,8 @@ export async function handler(event) {
          if(!itemId) return { statusCode: 400, body: JSON.stringify({ error: "Missing item ID" }) };
          
          const lookupCollections = [
-           { name: 'movies2026', type: 'movie' }, 
-           { name: 'tvshows2026', type: 'tv' },
+           { name: MOVIES_COLLECTION, type: 'movie' }, 
+           { name: TV_COLLECTION, type: 'tv' },
            { name: 'bgg_board_games', type: 'boardgame', keyspace: 'boardgames' }
          ];
          
@@ -518,7 +546,7 @@ export async function handler(event) {
          // If type is tvshow, prioritize tvshows collection
          if (itemType === 'tvshow' || itemType === 'tv') {
              try {
-                const collection = getCollection({ name: 'tvshows2026', type: 'tv' });
+                const collection = getCollection({ name: TV_COLLECTION, type: 'tv' });
                 console.log(`[Details] Looking up TV show with _id: ${itemId}`);
                 const item = await collection.findOne({ _id: itemId });
                 if(item) {
@@ -787,8 +815,8 @@ export async function handler(event) {
         console.log(`[Similar] Searching for vector for item: ${itemId}`);
 
         const allCollections = [
-          { name: 'movies2026', type: 'movie' },
-          { name: 'tvshows2026', type: 'tv' }
+          { name: MOVIES_COLLECTION, type: 'movie' },
+          { name: TV_COLLECTION, type: 'tv' }
         ];
         
         // 1. Find the source item and its vector
@@ -3,12 +3,28 @@ import time
 import json
 from astrapy import DataAPIClient
 from dotenv import load_dotenv
+from filter_index import get_index, MAX_LOCAL_SCAN
+from provider_catalog import PAYMENT_TYPES, canonical_provider_id
+from person_index import titles_for_person
 
 load_dotenv()
 
 ASTRA_DB_API_ENDPOINT = os.getenv("ASTRA_DB_API_ENDPOINT")
 ASTRA_DB_APPLICATION_TOKEN = os.getenv("ASTRA_DB_APPLICATION_TOKEN")
 
+# Reduced-dimension embeddings are stored in parallel collections
+# (e.g. movies2026_d256); query vectors must come from the same size.
+DEFAULT_EMBEDDING_DIMENSIONS = 1536
+EMBEDDING_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS", DEFAULT_EMBEDDING_DIMENSIONS))
+
+def _vector_collection_name(base_name):
+    if EMBEDDING_DIMENSIONS == DEFAULT_EMBEDDING_DIMENSIONS:
+        return base_name
+    return f"{base_name}_d{EMBEDDING_DIMENSIONS}"
+
+MOVIES_COLLECTION = _vector_collection_name("movies2026")
+TV_COLLECTION = _vector_collection_name("tvshows2026")
+
 # Initialize client
 client = DataAPIClient(ASTRA_DB_APPLICATION_TOKEN)
 database = client.get_database(ASTRA_DB_API_ENDPOINT)
@@ -43,7 +59,101 @@ def _save_to_cache(key, data):
 def get_collection(name):
     return database.get_collection(name)
 
-def search_movies(vector=None, limit=20, genre=None, person=None, sort=None, sort_order=None):
+def _find_by_ids(collection_name, ids, filters=None):
+    """Fetch documents by _id (optionally also matching `filters`), preserving the order of `ids`."""
+    collection = get_collection(collection_name)
+    docs = {}
+    for i in range(0, len(ids), 100):  # $in accepts at most 100 values
+        query = dict(filters or {})
+        query["_id"] = {"$in": ids[i:i + 100]}
+        for doc in collection.find(query, projection={"$vector": 0}):
+            docs[doc["_id"]] = doc
+    return [docs[i] for i in ids if i in docs]
+
+def _person_search(collection_name, person_id, limit, filters=None, sort=None):
+    """
+    Titles for a TMDB person id from the person index. Returns None when the
+    index hasn't been built.
+
+    Without `sort` the posting list (best first) is fetched 100 ids at a time
+    until `limit` titles pass the other filters. With a sort ({"$vector": ...}
+    or {field: 1/-1}) every chunk returns its best `limit` titles and those
+    are merged, so the whole posting list is ranked.
+    """
+    title_ids = titles_for_person(collection_name, person_id)
+    if title_ids is None:
+        return None
+    chunks = [title_ids[i:i + 100] for i in range(0, len(title_ids), 100)]  # $in accepts at most 100 values
+    if not sort:
+        results = []
+        for chunk in chunks:
+            results += _find_by_ids(collection_name, chunk, filters)
+            if len(results) >= limit:
+                break
+        return results[:limit]
+
+    collection = get_collection(collection_name)
+    by_similarity = "$vector" in sort
+    ranked = []
+    for chunk in chunks:
+        query = dict(filters or {})
+        query["_id"] = {"$in": chunk}
+        ranked += collection.find(query, sort=sort, limit=limit, projection={"$vector": 0},
+                                  include_similarity=by_similarity)
+    if by_similarity:
+        ranked.sort(key=lambda doc: doc.pop("$similarity", 0), reverse=True)
+        return ranked[:limit]
+    (field, direction), = sort.items()
+    # Titles without the sort field go last, as they would in Astra
+    present = sorted((doc for doc in ranked if doc.get(field) is not None),
+                     key=lambda doc: doc[field], reverse=direction < 0)
+    return (present + [doc for doc in ranked if doc.get(field) is None])[:limit]
+
+def _resolve_provider(provider):
+    """Canonical provider id for a provider name ("Disney+") or numeric id ("337")."""
+    if provider is None:
+        return None
+    if str(provider).isdigit():
+        return canonical_provider_id(int(provider))
+    return canonical_provider_id(provider_name=provider)
+
+def _build_filters(genre=None, person=None, provider=None, payment_type=None, person_id=None):
+    filters = {}
+    if genre:
+        filters['genres'] = genre
+    if person:
+        filters['cast'] = person
+    if person_id is not None:
+        filters['cast_ids'] = int(person_id)
+    provider_id = _resolve_provider(provider)
+    if provider_id is not None:
+        # Single equality lookup on the canonical id array written at ingest
+        filters[f"watch_provider_ids.{payment_type or 'stream'}"] = provider_id
+    return filters
+
+def _prefiltered_search(collection_name, vector, limit, genre=None, person=None, provider=None, payment_type=None):
+    """
+    Filtered similarity search using the local posting-list index.
+    Returns None when no index is built or the filter is too broad to scan
+    locally, in which case callers fall back to Astra's filtered vector sort.
+    """
+    index = get_index(collection_name)
+    # Cast is not in the local index; person filters stay with Astra
+    if index is None or person or len(vector) != index.dimensions:
+        return None
+    provider_id = _resolve_provider(provider)
+    candidates = index.candidates(
+        genres=genre,
+        providers=provider_id,
+        payment_types=[payment_type or 'stream']
+    )
+    if len(candidates) > MAX_LOCAL_SCAN:
+        return None
+    ranked = index.search(vector, candidates, limit)
+    return _find_by_ids(collection_name, [doc_id for doc_id, _ in ranked])
+
+def search_movies(vector=None, limit=20, genre=None, person=None, sort=None, sort_order=None,
+                  provider=None, payment_type=None, person_id=None):
     """
     Search movies with optional type filtering.
     
@@ -54,38 +164,48 @@ def search_movies(vector=None, limit=20, genre=None, person=None, sort=None, sor
         person: Optional person name (cast member) to filter by
         sort: Sort field
         sort_order: Sort order ('asc' or 'desc')
+        provider: Optional watch provider name or canonical id (US)
+        payment_type: 'stream' (default), 'rent' or 'buy'
+        person_id: Optional TMDB person id (cast or key crew) to filter by
     """
-    filters = {}
-    if genre:
-        filters['genres'] = genre
-    if person:
-        filters['cast'] = person
+    filters = _build_filters(genre, person, provider, payment_type, person_id)
     
     cache_key = _get_cache_key("movies", vector, limit, filters, sort, sort_order)
     cached = _get_cached_result(cache_key)
     if cached:
         return cached
 
-    collection = get_collection("movies2026")
-    
-    # Build query with filters
-    query = {}
-    if filters:
-        query = {k: v for k, v in filters.items()}
-    
+    collection = get_collection(MOVIES_COLLECTION)
+
     # Build sort
     sort_dict = None
     if vector:
         sort_dict = {"$vector": vector}
     elif sort and sort_order:
         sort_dict = {sort: -1 if sort_order == 'desc' else 1}
+
+    # Person ids resolve through the person index; other selective filters are
+    # resolved locally, then only the matches are scanned
+    results = None
+    if person_id is not None:
+        other_filters = {k: v for k, v in filters.items() if k != 'cast_ids'}
+        results = _person_search(MOVIES_COLLECTION, person_id, limit, other_filters, sort_dict)
+    elif vector and filters:
+        results = _prefiltered_search(MOVIES_COLLECTION, vector, limit, genre=genre, person=person,
+                                      provider=provider, payment_type=payment_type)
+    
+    # Build query with filters
+    query = {}
+    if filters:
+        query = {k: v for k, v in filters.items()}
     
-    results = list(collection.find(
-        query,
-        sort=sort_dict,
-        limit=limit,
-        projection={"$vector": 0}
-    ))
+    if results is None:
+        results = list(collection.find(
+            query,
+            sort=sort_dict,
+            limit=limit,
+            projection={"$vector": 0}
+        ))
     
     # Filter for release_date and deduplicate by id
     seen_ids = set()
@@ -98,7 +218,8 @@ def search_movies(vector=None, limit=20, genre=None, person=None, sort=None, sor
     _save_to_cache(cache_key, filtered_results)
     return filtered_results
 
-def search_tv(vector=None, limit=20, genre=None, person=None, sort=None, sort_order=None):
+def search_tv(vector=None, limit=20, genre=None, person=None, sort=None, sort_order=None,
+              provider=None, payment_type=None, person_id=None):
     """
     Search TV shows with optional type filtering.
     
@@ -109,38 +230,48 @@ def search_tv(vector=None, limit=20, genre=None, person=None, sort=None, sort_or
         person: Optional person name (cast member) to filter by
         sort: Sort field
         sort_order: Sort order ('asc' or 'desc')
+        provider: Optional watch provider name or canonical id (US)
+        payment_type: 'stream' (default), 'rent' or 'buy'
+        person_id: Optional TMDB person id (cast or key crew) to filter by
     """
-    filters = {}
-    if genre:
-        filters['genres'] = genre
-    if person:
-        filters['cast'] = person
+    filters = _build_filters(genre, person, provider, payment_type, person_id)
     
     cache_key = _get_cache_key("tv", vector, limit, filters, sort, sort_order)
     cached = _get_cached_result(cache_key)
     if cached:
         return cached
 
-    collection = get_collection("tvshows2026")
-    
-    # Build query with filters
-    query = {}
-    if filters:
-        query = {k: v for k, v in filters.items()}
-    
+    collection = get_collection(TV_COLLECTION)
+
     # Build sort
     sort_dict = None
     if vector:
         sort_dict = {"$vector": vector}
     elif sort and sort_order:
         sort_dict = {sort: -1 if sort_order == 'desc' else 1}
+
+    # Person ids resolve through the person index; other selective filters are
+    # resolved locally, then only the matches are scanned
+    results = None
+    if person_id is not None:
+        other_filters = {k: v for k, v in filters.items() if k != 'cast_ids'}
+        results = _person_search(TV_COLLECTION, person_id, limit, other_filters, sort_dict)
+    elif vector and filters:
+        results = _prefiltered_search(TV_COLLECTION, vector, limit, genre=genre, person=person,
+                                      provider=provider, payment_type=payment_type)
+    
+    # Build query with filters
+    query = {}
+    if filters:
+        query = {k: v for k, v in filters.items()}
     
-    results = list(collection.find(
-        query,
-        sort=sort_dict,
-        limit=limit,
-        projection={"$vector": 0}
-    ))
+    if results is None:
+        results = list(collection.find(
+            query,
+            sort=sort_dict,
+            limit=limit,
+            projection={"$vector": 0}
+        ))
     
     # Filter for first_air_date and deduplicate by id
     seen_ids = set()
@@ -153,7 +284,8 @@ def search_tv(vector=None, limit=20, genre=None, person=None, sort=None, sort_or
     _save_to_cache(cache_key, filtered_results)
     return filtered_results
 
-def search_all(vector=None, limit=20, genre=None, person=None, sort=None, sort_order=None):
+def search_all(vector=None, limit=20, genre=None, person=None, sort=None, sort_order=None,
+               provider=None, payment_type=None, person_id=None):
     """
     Search both movies and TV shows with optional type filtering.
     
@@ -164,12 +296,11 @@ def search_all(vector=None, limit=20, genre=None, person=None, sort=None, sort_o
         person: Optional person name (cast member) to filter by
         sort: Sort field
         sort_order: Sort order ('asc' or 'desc')
+        provider: Optional watch provider name or canonical id (US)
+        payment_type: 'stream' (default), 'rent' or 'buy'
+        person_id: Optional TMDB person id (cast or key crew) to filter by
     """
-    filters = {}
-    if genre:
-        filters['genres'] = genre
-    if person:
-        filters['cast'] = person
+    filters = _build_filters(genre, person, provider, payment_type, person_id)
     
     cache_key = _get_cache_key("all", vector, limit, filters, sort, sort_order)
     cached = _get_cached_result(cache_key)
@@ -177,8 +308,10 @@ def search_all(vector=None, limit=20, genre=None, person=None, sort=None, sort_o
         return cached
 
     # Perform searches with filters
-    movies = search_movies(vector, limit, genre=genre, person=person, sort=sort, sort_order=sort_order)
-    tv = search_tv(vector, limit, genre=genre, person=person, sort=sort, sort_order=sort_order)
+    movies = search_movies(vector, limit, genre=genre, person=person, sort=sort, sort_order=sort_order,
+                           provider=provider, payment_type=payment_type, person_id=person_id)
+    tv = search_tv(vector, limit, genre=genre, person=person, sort=sort, sort_order=sort_order,
+                   provider=provider, payment_type=payment_type, person_id=person_id)
     
     # Combine results and deduplicate by id across both
     combined = movies + tv
@@ -288,27 +421,28 @@ def get_details(id, content_mode):
     if content_mode == 'boardgames':
         collection = get_collection("bgg_board_games")
     elif content_mode == 'tvshows':
-        collection = get_collection("tvshows2026")
+        collection = get_collection(TV_COLLECTION)
     else:
-        collection = get_collection("movies2026")
+        collection = get_collection(MOVIES_COLLECTION)
     
     result = collection.find_one({'$or': [{'id': id}, {'_id': id}]}, projection={"$vector": 0})
     return result if result else {}
 
-def get_similar(id, content_mode, limit=10):
-    """Get similar items."""
+def get_vector(id, content_mode):
+    """The stored embedding of one item, or None."""
     if content_mode == 'boardgames':
         collection = get_collection("bgg_board_games")
     elif content_mode == 'tvshows':
-        collection = get_collection("tvshows2026")
+        collection = get_collection(TV_COLLECTION)
     else:
-        collection = get_collection("movies2026")
+        collection = get_collection(MOVIES_COLLECTION)
     
-    item = collection.find_one({'$or': [{'id': id}, {'_id': id}]})
-    if not item:
-        return []
-    
-    vector = item.get('$vector')
+    item = collection.find_one({'$or': [{'id': id}, {'_id': id}]}, projection={"_id": 1, "$vector": 1})
+    return item.get('$vector') if item else None
+
+def get_similar(id, content_mode, limit=10):
+    """Get similar items."""
+    vector = get_vector(id, content_mode)
     if not vector:
         return []
     
@@ -342,15 +476,41 @@ def handler(event, context):
             person = params.get('person')
             sort = params.get('sort')
             sort_order = params.get('sort_order')
+            provider = params.get('provider')
+            payment_type = params.get('payment_type')
+            if payment_type is not None and payment_type not in PAYMENT_TYPES:
+                return {
+                    'statusCode': 400,
+                    'body': json.dumps({'error': f'Invalid payment_type {payment_type}'})
+                }
+            person_id = params.get('person_id')
+            if person_id is not None and not str(person_id).isdigit():
+                return {
+                    'statusCode': 400,
+                    'body': json.dumps({'error': f'Invalid person_id {person_id}'})
+                }
+            # Rank by similarity to one item's embedding ("like X, on Netflix");
+            # with filters this is served by the local filter index when built
+            similar_to = params.get('similar_to')
+            vector = None
+            if similar_to:
+                vector = get_vector(similar_to, params.get('content_mode', 'movies'))
+                if not vector:
+                    return {
+                        'statusCode': 404,
+                        'body': json.dumps({'error': f'No embedding for similar_to {similar_to}'})
+                    }
             
             if content_types == 'movies':
-                results = search_movies(None, limit, genre, person, sort, sort_order)
+                results = search_movies(vector, limit, genre, person, sort, sort_order, provider, payment_type, person_id)
             elif content_types == 'tvshows':
-                results = search_tv(None, limit, genre, person, sort, sort_order)
+                results = search_tv(vector, limit, genre, person, sort, sort_order, provider, payment_type, person_id)
             elif content_types == 'boardgames':
-                results = search_boardgames(None, limit, genre, person, sort, sort_order)
+                results = search_boardgames(vector, limit, genre, person, sort, sort_order)
             else:
-                results = search_all(None, limit, genre, person, sort, sort_order)
+                results = search_all(vector, limit, genre, person, sort, sort_order, provider, payment_type, person_id)
+            if similar_to:
+                results = [r for r in results if r.get('id') != similar_to and r.get('_id') != similar_to]
         
         elif action == 'discover':
             content_types = params.get('content_types', 'movies')
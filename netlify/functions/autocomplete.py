@@ -0,0 +1,253 @@
+import os
+import json
+import gzip
+import heapq
+import math
+import unicodedata
+from bisect import bisect_left
+from trigram_index import TrigramIndex, trigram_path_for
+
+# Server-side autocomplete over the entries written by bin/export_autocomplete.py.
+#
+# Normalized names are kept in one sorted array, so a prefix is a contiguous
+# range found with two binary searches. A second sorted array of (token, row)
+# pairs answers mid-word matches ("hanks" -> "Tom Hanks") the same way.
+# Within a range, rows are ranked by a score computed once at load time.
+# When exact matches run out, a trigram index supplies typo-tolerant matches.
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..")
+DEFAULT_PATHS = [
+    os.path.join(ROOT_DIR, "public", "autocomplete.json.gz"),
+    os.path.join(ROOT_DIR, "public", "autocomplete.json"),
+]
+DEFAULT_TYPES = ["movie", "person", "genre"]
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+
+# Ranges larger than this are answered from a memo instead of being re-ranked
+RANGE_CACHE_THRESHOLD = 2000
+_HIGH = "\U0010ffff"
+
+# Export files sorted with this marker list each prefix bucket's entries
+# best-first, so short prefixes are served straight off the bucket front
+BUCKET_SORT_MARKER = "bucket_score"
+PREFIX_BUCKET_LENGTH = 2
+
+
+def normalize_name(name):
+    """Lowercase, strip accents and collapse whitespace: 'Amélie ' -> 'amelie'."""
+    name = unicodedata.normalize("NFKD", str(name))
+    name = "".join(ch for ch in name if not unicodedata.combining(ch))
+    return " ".join(name.lower().split())
+
+
+def prefix_bucket(name):
+    return normalize_name(name)[:PREFIX_BUCKET_LENGTH]
+
+
+def title_score(popularity, vote_count):
+    """Compact integer rank for a movie/TV title from TMDB popularity and vote count."""
+    return int(round(10 * (popularity or 0) + 10 * math.log1p(vote_count or 0)))
+
+
+def popularity_score(total_popularity):
+    """Compact integer rank for people and genres from the summed popularity of their titles."""
+    return int(round(10 * (total_popularity or 0)))
+
+
+def _read_json(path):
+    if path.endswith(".gz"):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return json.load(f)
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class AutocompleteIndex:
+    def __init__(self, entries, types=None, bucket_sorted=False):
+        """
+        entries: compact export rows [typeCode, name, searchName, (score)] or
+        merged objects {type, name, id, (score)}. bucket_sorted means entries
+        are already ordered best-first within each prefix bucket.
+        """
+        types = types or DEFAULT_TYPES
+        # Trigram postings refer to positions in the source file, which can
+        # include malformed entries skipped here
+        self.position_names = []
+        self.rows_by_position = []
+        self.types = []
+        self.names = []
+        self.ids = []
+        self.scores = []
+        for entry in entries:
+            if isinstance(entry, list):
+                if len(entry) < 2 or not entry[1]:
+                    self.position_names.append("")
+                    self.rows_by_position.append(None)
+                    continue
+                type_code = entry[0]
+                entry_type = types[type_code] if isinstance(type_code, int) and type_code < len(types) else str(type_code)
+                name, entry_id = entry[1], None
+                score = entry[3] if len(entry) > 3 and isinstance(entry[3], (int, float)) else 0
+            elif isinstance(entry, dict) and entry.get('name'):
+                entry_type = str(entry.get('type', 'movie')).lower()
+                name, entry_id = entry['name'], entry.get('id')
+                score = entry.get('score') or 0
+            else:
+                self.position_names.append("")
+                self.rows_by_position.append(None)
+                continue
+            self.position_names.append(normalize_name(name))
+            self.rows_by_position.append(len(self.names))
+            self.types.append(entry_type)
+            self.names.append(name)
+            self.ids.append(entry_id)
+            self.scores.append(score)
+
+        keyed = sorted(
+            (key, row) for key, row in zip(self.position_names, self.rows_by_position) if row is not None
+        )
+        self.keys = [k for k, _ in keyed]
+        self.key_rows = [row for _, row in keyed]
+
+        tokens = []
+        for key, row in keyed:
+            words = key.split()
+            # The first word is already covered by the full-name array
+            for word in set(words[1:]):
+                tokens.append((word, row))
+        tokens.sort()
+        self.tokens = [t for t, _ in tokens]
+        self.token_rows = [row for _, row in tokens]
+
+        self.bucket_rows = None
+        if bucket_sorted:
+            self.bucket_rows = {}
+            for key, row in zip(self.position_names, self.rows_by_position):
+                if row is not None:
+                    self.bucket_rows.setdefault(key[:PREFIX_BUCKET_LENGTH], []).append(row)
+
+        self._range_cache = {}
+        self.source_path = None
+        self._trigrams = None
+
+    @classmethod
+    def load(cls, path=None):
+        paths = [path] if path else [os.getenv("AUTOCOMPLETE_PATH")] + DEFAULT_PATHS
+        for candidate in paths:
+            if candidate and os.path.exists(candidate):
+                data = _read_json(candidate)
+                if isinstance(data, dict):
+                    bucket_sorted = data.get("sorted") == BUCKET_SORT_MARKER
+                    index = cls(data.get("entries", []), data.get("types"), bucket_sorted)
+                else:
+                    index = cls(data)
+                index.source_path = candidate
+                return index
+        return cls([])
+
+    def trigrams(self):
+        """Trigram index written by the export scripts, or built in memory if missing/stale."""
+        if self._trigrams is None:
+            if self.source_path:
+                self._trigrams = TrigramIndex.load(trigram_path_for(self.source_path), self.position_names)
+            if self._trigrams is None:
+                self._trigrams = TrigramIndex.build(self.position_names)
+        return self._trigrams
+
+    def _fuzzy_rows(self, prefix):
+        matches = []
+        for distance, position in self.trigrams().search(prefix):
+            row = self.rows_by_position[position]
+            if row is not None:
+                matches.append((distance, -self.scores[row], row))
+        matches.sort()
+        return [row for _, _, row in matches]
+
+    def __len__(self):
+        return len(self.names)
+
+    def _bucket_front(self, prefix, limit):
+        """Best rows for a prefix no longer than a bucket key, read off pre-sorted buckets."""
+        if len(prefix) == PREFIX_BUCKET_LENGTH:
+            return self.bucket_rows.get(prefix, [])[:limit]
+        fronts = [rows[:limit] for bucket, rows in self.bucket_rows.items() if bucket.startswith(prefix)]
+        return heapq.nlargest(limit, (row for front in fronts for row in front), key=self.scores.__getitem__)
+
+    def _top_rows(self, label, keys, rows, prefix, limit):
+        if label == "names" and self.bucket_rows is not None and len(prefix) <= PREFIX_BUCKET_LENGTH:
+            return self._bucket_front(prefix, limit)
+        lo = bisect_left(keys, prefix)
+        hi = bisect_left(keys, prefix + _HIGH, lo)
+        if hi - lo <= RANGE_CACHE_THRESHOLD:
+            return heapq.nlargest(limit, rows[lo:hi], key=self.scores.__getitem__)
+        # Short prefixes cover huge ranges; rank them once and reuse
+        cache_key = (label, prefix)
+        cached = self._range_cache.get(cache_key)
+        if cached is None or len(cached) < limit:
+            cached = heapq.nlargest(max(limit, MAX_LIMIT), rows[lo:hi], key=self.scores.__getitem__)
+            self._range_cache[cache_key] = cached
+        return cached[:limit]
+
+    def search(self, query, limit=DEFAULT_LIMIT, entry_type=None):
+        """
+        Top `limit` entries whose name starts with `query`, followed by entries
+        with a later word starting with it, then by near misses within a small
+        edit distance. Returns [{type, name, id}, ...].
+        """
+        prefix = normalize_name(query)
+        if not prefix:
+            return []
+        # Over-fetch when filtering by type so the filter doesn't starve the result
+        fetch = limit if not entry_type else MAX_LIMIT
+        rows = self._top_rows("names", self.keys, self.key_rows, prefix, fetch)
+        if len(rows) < fetch:
+            rows = rows + self._top_rows("tokens", self.tokens, self.token_rows, prefix, fetch)
+        if len(rows) < fetch:
+            rows = rows + self._fuzzy_rows(prefix)
+
+        results = []
+        seen = set()
+        for row in rows:
+            if row in seen or (entry_type and self.types[row] != entry_type):
+                continue
+            seen.add(row)
+            result = {"type": self.types[row], "name": self.names[row]}
+            if self.ids[row] is not None:
+                result["id"] = self.ids[row]
+            results.append(result)
+            if len(results) >= limit:
+                break
+        return results
+
+
+_INDEX = None
+
+def get_index():
+    global _INDEX
+    if _INDEX is None:
+        _INDEX = AutocompleteIndex.load()
+    return _INDEX
+
+
+def handler(event, context):
+    """Netlify function handler: ?q=<prefix>&limit=<n>&type=<movie|person|genre|tv>"""
+    params = event.get('queryStringParameters') or {}
+    query = params.get('q', '')
+    try:
+        limit = min(int(params.get('limit', DEFAULT_LIMIT)), MAX_LIMIT)
+    except ValueError:
+        limit = DEFAULT_LIMIT
+
+    try:
+        results = get_index().search(query, limit, params.get('type'))
+        return {
+            'statusCode': 200,
+            'headers': {'Content-Type': 'application/json', 'Cache-Control': 'public, max-age=300'},
+            'body': json.dumps(results)
+        }
+    except Exception as e:
+        return {
+            'statusCode': 500,
+            'body': json.dumps({'error': str(e)})
+        }
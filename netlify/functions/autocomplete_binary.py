@@ -0,0 +1,300 @@
+import os
+import heapq
+import struct
+from autocomplete import normalize_name
+
+# Compact binary autocomplete format (public/autocomplete.bin).
+#
+#   magic "TIAC" | u8 version | u8 type count | per type: u8 length + utf-8 name
+#   varint entry count | varint block size | u32 block count
+#   u32 block offsets (relative to the start of the entry data)
+#   entry data
+#
+# Entries are sorted by normalized name. Each entry is
+#   u8 type | varint shared | varint suffix length | suffix bytes | varint id tag [| id bytes] | varint score
+# where `shared` is the number of leading name bytes reused from the previous
+# entry (front-coding). The id tag's low two bits say what follows: 0 no id,
+# 1 an integer id n (tag = n << 2 | 1), 2 a numeric string id such as "603"
+# (stored as the integer, tag = n << 2 | 2), 3 any other string id (tag =
+# byte length << 2 | 3, followed by its utf-8 bytes). Every block restarts with shared = 0, so a reader can
+# binary search block heads and decode only the blocks a prefix touches.
+# searchName is not stored: it is the normalized name, derived on decode.
+# public/autocomplete-reader.js reads the same layout in the browser.
+
+MAGIC = b"TIAC"
+FORMAT_VERSION = 2
+BLOCK_SIZE = 64
+
+
+def _write_varint(out, value):
+    value = max(0, int(value))
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data, pos):
+    result = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def _write_id(out, entry_id):
+    if entry_id is None or isinstance(entry_id, bool):
+        out.append(0)
+    elif isinstance(entry_id, int) and entry_id >= 0:
+        _write_varint(out, entry_id << 2 | 1)
+    else:
+        text = str(entry_id)
+        # Only canonical digit strings round-trip through an integer
+        if text.isascii() and text.isdigit() and str(int(text)) == text:
+            _write_varint(out, int(text) << 2 | 2)
+        else:
+            encoded = text.encode("utf-8")
+            _write_varint(out, len(encoded) << 2 | 3)
+            out += encoded
+
+
+def _read_id(data, pos):
+    tag, pos = _read_varint(data, pos)
+    kind, value = tag & 3, tag >> 2
+    if kind == 0:
+        return None, pos
+    if kind == 1:
+        return value, pos
+    if kind == 2:
+        return str(value), pos
+    return bytes(data[pos:pos + value]).decode("utf-8"), pos + value
+
+
+def _shared_prefix(a, b):
+    limit = min(len(a), len(b))
+    i = 0
+    while i < limit and a[i] == b[i]:
+        i += 1
+    return i
+
+
+def _entry_fields(entry, types):
+    """(type name, display name, id, score) from a compact row or merged object."""
+    if isinstance(entry, list):
+        type_code = entry[0]
+        entry_type = types[type_code] if isinstance(type_code, int) and type_code < len(types) else str(type_code)
+        score = entry[3] if len(entry) > 3 and isinstance(entry[3], (int, float)) else 0
+        return entry_type, entry[1], None, score
+    return str(entry.get('type', 'movie')).lower(), entry.get('name'), entry.get('id'), entry.get('score') or 0
+
+
+def encode_entries(entries, types=None, block_size=BLOCK_SIZE):
+    """Encode autocomplete entries (compact rows or {type, name, id, score}) to bytes."""
+    types = list(types or ["movie", "person", "genre"])
+    rows = []
+    for entry in entries:
+        if not isinstance(entry, (list, dict)):
+            continue
+        entry_type, name, entry_id, score = _entry_fields(entry, types)
+        if not name:
+            continue
+        if entry_type not in types:
+            types.append(entry_type)
+        rows.append((normalize_name(name), name, types.index(entry_type), entry_id, score))
+    rows.sort()
+    if len(types) > 255:
+        raise ValueError("Too many entry types for the binary autocomplete format")
+
+    data = bytearray()
+    offsets = []
+    previous = b""
+    for i, (_, name, type_code, entry_id, score) in enumerate(rows):
+        if i % block_size == 0:
+            offsets.append(len(data))
+            previous = b""
+        encoded = name.encode("utf-8")
+        shared = _shared_prefix(previous, encoded)
+        data.append(type_code)
+        _write_varint(data, shared)
+        _write_varint(data, len(encoded) - shared)
+        data += encoded[shared:]
+        _write_id(data, entry_id)
+        _write_varint(data, score)
+        previous = encoded
+
+    header = bytearray(MAGIC)
+    header.append(FORMAT_VERSION)
+    header.append(len(types))
+    for entry_type in types:
+        encoded = entry_type.encode("utf-8")
+        header.append(len(encoded))
+        header += encoded
+    _write_varint(header, len(rows))
+    _write_varint(header, block_size)
+    header += struct.pack("<I", len(offsets))
+    header += struct.pack(f"<{len(offsets)}I", *offsets)
+    return bytes(header + data)
+
+
+def _id_text(entry_id):
+    return None if entry_id is None or isinstance(entry_id, bool) else str(entry_id)
+
+
+def check_round_trip(entries, data, types=None):
+    """Decode `data` and raise ValueError unless every named entry kept its name and id."""
+    types = list(types or ["movie", "person", "genre"])
+    expected = []
+    for entry in entries:
+        if isinstance(entry, (list, dict)):
+            _, name, entry_id, _ = _entry_fields(entry, types)
+            if name:
+                expected.append((name, _id_text(entry_id)))
+    decoded = [(name, _id_text(entry_id)) for _, _, name, entry_id, _ in BinaryAutocompleteReader(data).entries()]
+    key = lambda pair: (pair[0], pair[1] or "")
+    if sorted(expected, key=key) != sorted(decoded, key=key):
+        lost = next((a, b) for a, b in zip(sorted(expected, key=key), sorted(decoded, key=key)) if a != b)
+        raise ValueError(f"Binary autocomplete round trip changed {lost[0]!r} into {lost[1]!r}")
+
+
+def write_binary_index(entries, path, types=None):
+    """Encode, check the round trip and atomically write the binary index."""
+    entries = list(entries)
+    data = encode_entries(entries, types)
+    check_round_trip(entries, data, types)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return path
+
+
+def binary_path_for(autocomplete_path):
+    """public/autocomplete.json(.gz) -> public/autocomplete.bin"""
+    base = autocomplete_path
+    for suffix in (".gz", ".json"):
+        if base.endswith(suffix):
+            base = base[:-len(suffix)]
+    return base + ".bin"
+
+
+class BinaryAutocompleteReader:
+    """Lazy reader: parses the header and block index up front, decodes blocks on demand."""
+
+    def __init__(self, data):
+        self.data = data
+        if data[:4] != MAGIC:
+            raise ValueError("Not a binary autocomplete file")
+        if data[4] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported binary autocomplete version {data[4]}")
+        pos = 6
+        self.types = []
+        for _ in range(data[5]):
+            length = data[pos]
+            self.types.append(bytes(data[pos + 1:pos + 1 + length]).decode("utf-8"))
+            pos += 1 + length
+        self.count, pos = _read_varint(data, pos)
+        self.block_size, pos = _read_varint(data, pos)
+        (block_count,) = struct.unpack_from("<I", data, pos)
+        pos += 4
+        self.offsets = list(struct.unpack_from(f"<{block_count}I", data, pos))
+        self.data_start = pos + 4 * block_count
+        self._heads = [None] * block_count
+        self._blocks = {}
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls(f.read())
+
+    def __len__(self):
+        return self.count
+
+    def _block_end(self, block):
+        if block + 1 < len(self.offsets):
+            return self.data_start + self.offsets[block + 1]
+        return len(self.data)
+
+    def _decode_entry(self, pos, previous):
+        type_code = self.data[pos]
+        shared, pos = _read_varint(self.data, pos + 1)
+        length, pos = _read_varint(self.data, pos)
+        encoded = previous[:shared] + bytes(self.data[pos:pos + length])
+        pos += length
+        entry_id, pos = _read_id(self.data, pos)
+        score, pos = _read_varint(self.data, pos)
+        return (type_code, encoded, entry_id, score), pos
+
+    def _head(self, block):
+        """Normalized name of a block's first entry, without decoding the block."""
+        if self._heads[block] is None:
+            (_, encoded, _, _), _ = self._decode_entry(self.data_start + self.offsets[block], b"")
+            self._heads[block] = normalize_name(encoded.decode("utf-8"))
+        return self._heads[block]
+
+    def block(self, block):
+        """Decoded entries of one block as (key, type, name, id, score)."""
+        decoded = self._blocks.get(block)
+        if decoded is None:
+            decoded = []
+            pos = self.data_start + self.offsets[block]
+            end = self._block_end(block)
+            previous = b""
+            while pos < end:
+                (type_code, encoded, entry_id, score), pos = self._decode_entry(pos, previous)
+                previous = encoded
+                name = encoded.decode("utf-8")
+                decoded.append((normalize_name(name), self.types[type_code], name, entry_id, score))
+            self._blocks[block] = decoded
+        return decoded
+
+    def _first_block(self, prefix):
+        lo, hi = 0, len(self.offsets)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._head(mid) < prefix:
+                lo = mid + 1
+            else:
+                hi = mid
+        # The block before the first head >= prefix can still hold matches
+        return max(lo - 1, 0)
+
+    def prefix_entries(self, prefix):
+        """Yield (key, type, name, id, score) for entries whose normalized name starts with `prefix`."""
+        prefix = normalize_name(prefix)
+        for block in range(self._first_block(prefix), len(self.offsets)):
+            for entry in self.block(block):
+                if entry[0].startswith(prefix):
+                    yield entry
+                elif entry[0] > prefix:
+                    return
+
+    def search(self, prefix, limit=10, entry_type=None):
+        """
+        Top `limit` matches by score, as [{type, name, id}, ...]. Prefix
+        matches come first; when there are fewer than `limit`, entries with
+        the query anywhere in the name ("matrix" -> "The Matrix") fill the
+        rest, which decodes every block like the JSON path's full scan.
+        """
+        wanted = lambda e: not entry_type or e[1] == entry_type
+        top = heapq.nlargest(limit, filter(wanted, self.prefix_entries(prefix)), key=lambda e: e[4])
+        needle = normalize_name(prefix)
+        if len(top) < limit and needle:
+            substring = (e for e in self.entries() if needle in e[0] and not e[0].startswith(needle) and wanted(e))
+            top += heapq.nlargest(limit - len(top), substring, key=lambda e: e[4])
+        results = []
+        for _, type_name, name, entry_id, _ in top:
+            result = {"type": type_name, "name": name}
+            if entry_id is not None:
+                result["id"] = entry_id
+            results.append(result)
+        return results
+
+    def entries(self):
+        """All entries in stored order, decoding every block."""
+        for block in range(len(self.offsets)):
+            yield from self.block(block)
@@ -0,0 +1,110 @@
+import os
+import json
+import hashlib
+from autocomplete import PREFIX_BUCKET_LENGTH, normalize_name
+
+# Prefix-sharded autocomplete files for lazy loading in the browser.
+#
+# Each dataset ("movies", "boardgames") is split into shards keyed by the first
+# two normalized characters of every word in an entry's name, so "Tom Hanks"
+# lands in both the "to" and "ha" shards. Shard files are named by content
+# hash and can be cached forever; the small per-dataset manifest maps shard
+# keys to file names, entry counts, sizes and hashes, and is the only file
+# that has to be revalidated. public/autocomplete-shards.js is the client.
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..")
+SHARD_DIR = os.path.join(ROOT_DIR, "public", "autocomplete")
+SHARD_SUBDIR = "shards"
+MANIFEST_VERSION = 1
+
+
+def entry_name(entry):
+    if isinstance(entry, list):
+        return entry[1] if len(entry) > 1 else None
+    if isinstance(entry, dict):
+        return entry.get('name') or entry.get('title')
+    return entry if isinstance(entry, str) else None
+
+
+def entry_type(entry, types=None):
+    if isinstance(entry, list) and entry:
+        type_code = entry[0]
+        return types[type_code] if types and isinstance(type_code, int) and type_code < len(types) else str(type_code)
+    if isinstance(entry, dict):
+        return str(entry.get('type', '')).lower()
+    return None
+
+
+def shard_keys(name):
+    """Shard keys an entry belongs to: the leading characters of each word."""
+    return {word[:PREFIX_BUCKET_LENGTH] for word in normalize_name(name).split()}
+
+
+def query_shard_key(query):
+    """The one shard that holds every match for a query (None if nothing typed)."""
+    words = normalize_name(query).split()
+    return words[0][:PREFIX_BUCKET_LENGTH] if words else None
+
+
+def manifest_path(dataset, out_dir=SHARD_DIR):
+    return os.path.join(out_dir, f"{dataset}.manifest.json")
+
+
+def write_shards(entries, dataset, types=None, out_dir=SHARD_DIR, base_version=None):
+    """
+    Split autocomplete entries (compact rows or objects, in ranking order) into
+    content-addressed shard files and write the dataset manifest. Shards from
+    earlier runs that the new manifest no longer references are removed.
+    `base_version` is the last autocomplete delta folded into the entries, so
+    clients only fetch newer deltas.
+    """
+    shards = {}
+    for entry in entries:
+        name = entry_name(entry)
+        if not name:
+            continue
+        for key in shard_keys(name):
+            shards.setdefault(key, []).append(entry)
+
+    shard_dir = os.path.join(out_dir, SHARD_SUBDIR)
+    os.makedirs(shard_dir, exist_ok=True)
+    manifest_shards = {}
+    for key in sorted(shards):
+        payload = {"types": types, "entries": shards[key]} if types else {"entries": shards[key]}
+        body = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+        digest = hashlib.sha256(body).hexdigest()
+        # Hex-encode the key so punctuation and non-ASCII prefixes are safe in URLs
+        filename = f"{dataset}-{key.encode('utf-8').hex()}.{digest[:16]}.json"
+        path = os.path.join(shard_dir, filename)
+        if not os.path.exists(path):
+            with open(path, "wb") as f:
+                f.write(body)
+        manifest_shards[key] = {
+            "file": f"{SHARD_SUBDIR}/{filename}",
+            "count": len(shards[key]),
+            "bytes": len(body),
+            "sha256": digest,
+        }
+
+    referenced = {os.path.basename(s["file"]) for s in manifest_shards.values()}
+    for filename in os.listdir(shard_dir):
+        if filename.startswith(f"{dataset}-") and filename not in referenced:
+            os.remove(os.path.join(shard_dir, filename))
+
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "dataset": dataset,
+        "prefix_length": PREFIX_BUCKET_LENGTH,
+        "total": sum(1 for entry in entries if entry_name(entry)),
+        # Genre names are needed for filters before any shard is loaded
+        "genres": sorted({entry_name(e) for e in entries if entry_name(e) and entry_type(e, types) == "genre"}),
+        "shards": manifest_shards,
+    }
+    if base_version is not None:
+        manifest["base_version"] = base_version
+    path = manifest_path(dataset, out_dir)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, separators=(",", ":"), ensure_ascii=False)
+    os.replace(tmp_path, path)
+    return path, manifest
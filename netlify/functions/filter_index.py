@@ -0,0 +1,227 @@
+import os
+import gzip
+import pickle
+from array import array
+import numpy as np
+from provider_catalog import PAYMENT_TYPES, canonical_provider_id, canonical_provider_ids
+
+# Local pre-filter indexes for filtered vector search.
+#
+# Every document gets a dense row id. For each filterable field we keep a
+# posting list per value: the sorted row ids (a NumPy uint32 array) of the
+# documents that have it, so memory grows with the number of (row, value)
+# pairs rather than values x rows. Filters combine as sorted-array unions and
+# intersections, and only the surviving rows are scanned for similarity: one
+# float32 matrix product over unit-length rows, done by NumPy. The vectors
+# live in a .npy file next to the index and are memory-mapped, so a scan only
+# pages in the candidate rows.
+
+INDEX_DIR = os.getenv("FILTER_INDEX_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "indexes"))
+INDEX_VERSION = 3
+
+# Fields indexed by build_filter_index.py. Provider fields hold canonical
+# provider ids (see provider_catalog.py) keyed by payment type. Cast is left
+# out: it has far more distinct values than rows, and person lookups go
+# through person_index.py instead.
+INDEXED_FIELDS = ["genres", "original_language"]
+
+# Above this many candidates a local scan is no cheaper than letting Astra
+# do the filtered vector sort, so callers should fall back.
+MAX_LOCAL_SCAN = int(os.getenv("FILTER_INDEX_MAX_SCAN", "4000"))
+
+NO_ROWS = np.zeros(0, dtype=np.uint32)
+
+
+def _as_values(value):
+    """Normalize a document field into a list of hashable index keys."""
+    if value is None:
+        return []
+    if not isinstance(value, list):
+        value = [value]
+    values = []
+    for v in value:
+        # Raw TMDB payloads (update_astra_movies.py) hold {"id", "name"} dicts
+        if isinstance(v, dict):
+            v = v.get('name')
+        if v:
+            values.append(v)
+    return values
+
+
+def _union(postings):
+    """Sorted row ids present in any of the posting lists."""
+    postings = [p for p in postings if p.size]
+    if not postings:
+        return NO_ROWS
+    if len(postings) == 1:
+        return postings[0]
+    return np.unique(np.concatenate(postings))
+
+
+class FilterIndex:
+    def __init__(self, collection_name, dimensions):
+        self.collection_name = collection_name
+        self.dimensions = dimensions
+        self.ids = []
+        self.postings = {field: {} for field in INDEXED_FIELDS}
+        for payment_type in PAYMENT_TYPES:
+            self.postings[f"watch_provider_ids.{payment_type}"] = {}
+        self.vectors = array('f')
+        self._matrix = None
+
+    # --- Building ---
+
+    def _post(self, field, value, row):
+        rows = self.postings[field].get(value)
+        if rows is None:
+            rows = self.postings[field][value] = array('I')
+        rows.append(row)
+
+    def add(self, doc):
+        """Append a document (with $vector) and index its filter fields."""
+        vector = doc.get('$vector')
+        if vector is None or len(vector) != self.dimensions:
+            return False
+        row = len(self.ids)
+        self.ids.append(doc['_id'])
+        self.vectors.extend(float(v) for v in vector)
+        self._matrix = None
+
+        for field in INDEXED_FIELDS:
+            for value in _as_values(doc.get(field)):
+                self._post(field, value, row)
+
+        provider_ids = doc.get('watch_provider_ids')
+        if provider_ids is None:
+            # Documents written before canonical ids existed only have names
+            us_providers = (doc.get('watch_providers') or {}).get('US') or {}
+            provider_ids = {pt: canonical_provider_ids(us_providers.get(pt)) for pt in PAYMENT_TYPES}
+        for payment_type in PAYMENT_TYPES:
+            for value in set(provider_ids.get(payment_type) or []):
+                self._post(f"watch_provider_ids.{payment_type}", value, row)
+        return True
+
+    def save(self, path=None):
+        path = path or index_path(self.collection_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Rows are appended in order; unique() only drops a value a document repeats
+        postings = {
+            field: {value: np.unique(np.frombuffer(rows, dtype=np.uint32)) for value, rows in values.items()}
+            for field, values in self.postings.items()
+        }
+        payload = {
+            "version": INDEX_VERSION,
+            "collection": self.collection_name,
+            "dimensions": self.dimensions,
+            "ids": self.ids,
+            "postings": postings,
+        }
+        vectors_path = vectors_path_for(path)
+        with open(vectors_path + ".tmp", "wb") as f:
+            np.save(f, self.matrix())
+        os.replace(vectors_path + ".tmp", vectors_path)
+        tmp_path = path + ".tmp"
+        with gzip.open(tmp_path, "wb") as f:
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        return path
+
+    @classmethod
+    def load(cls, path):
+        with gzip.open(path, "rb") as f:
+            payload = pickle.load(f)
+        if payload.get("version") != INDEX_VERSION:
+            raise ValueError(f"Unsupported filter index version in {path}")
+        index = cls(payload["collection"], payload["dimensions"])
+        index.ids = payload["ids"]
+        index.postings = payload["postings"]
+        # Stored unit-length, so the mapped file is the scan matrix as is
+        index._matrix = np.load(vectors_path_for(path), mmap_mode="r")
+        if index._matrix.shape != (len(index.ids), index.dimensions):
+            raise ValueError(f"Vectors do not match the filter index in {path}")
+        return index
+
+    # --- Querying ---
+
+    def matrix(self):
+        """(rows, dimensions) float32 matrix of the vectors scaled to unit length, built once."""
+        if self._matrix is None:
+            matrix = np.frombuffer(self.vectors, dtype=np.float32).reshape(-1, self.dimensions)
+            norms = np.linalg.norm(matrix, axis=1)
+            norms[norms == 0] = 1.0
+            self._matrix = matrix / norms[:, None]
+        return self._matrix
+
+    def field_rows(self, field, values):
+        """Sorted rows having any of `values` in `field`."""
+        postings = self.postings.get(field, {})
+        return _union([np.asarray(postings.get(value, NO_ROWS)) for value in _as_values(values)])
+
+    def candidates(self, genres=None, original_language=None, providers=None, payment_types=None):
+        """
+        Combine filters into a sorted array of candidate rows.
+        Different fields are AND-ed; multiple values for one field are OR-ed.
+        Providers (canonical ids or names) match if offered under any of the
+        requested payment types.
+        """
+        selected = []
+        if genres:
+            selected.append(self.field_rows("genres", genres))
+        if original_language:
+            selected.append(self.field_rows("original_language", original_language))
+        if providers:
+            if not isinstance(providers, list):
+                providers = [providers]
+            provider_ids = [p if isinstance(p, int) else canonical_provider_id(provider_name=p) for p in providers]
+            selected.append(_union([
+                self.field_rows(f"watch_provider_ids.{payment_type}", provider_ids)
+                for payment_type in payment_types or ["stream"]
+            ]))
+        if not selected:
+            return np.arange(len(self.ids), dtype=np.uint32)
+        # Intersect from the shortest list so every step stays small
+        selected.sort(key=len)
+        result = selected[0]
+        for rows in selected[1:]:
+            if not result.size:
+                break
+            result = np.intersect1d(result, rows, assume_unique=True)
+        return result
+
+    def search(self, vector, rows, limit=20):
+        """Exact cosine scan over the candidate rows. Returns [(_id, score), ...]."""
+        if not len(rows) or limit <= 0:
+            return []
+        rows = np.asarray(rows, dtype=np.intp)
+        query = np.asarray(vector, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+        scores = self.matrix()[rows] @ query
+        top = min(limit, rows.size)
+        best = np.argpartition(-scores, top - 1)[:top]
+        best = best[np.argsort(-scores[best])]
+        return [(self.ids[rows[i]], float(scores[i])) for i in best]
+
+
+def index_path(collection_name):
+    return os.path.join(INDEX_DIR, f"{collection_name}.filter.pkl.gz")
+
+
+def vectors_path_for(path):
+    """The .npy vector matrix saved alongside an index file."""
+    return path[:-len(".pkl.gz")] + ".vectors.npy" if path.endswith(".pkl.gz") else path + ".vectors.npy"
+
+
+_LOADED_INDEXES = {}
+
+def get_index(collection_name):
+    """Load (once) the index for a collection, or None if it hasn't been built."""
+    if collection_name not in _LOADED_INDEXES:
+        path = index_path(collection_name)
+        index = None
+        if os.path.exists(path):
+            try:
+                index = FilterIndex.load(path)
+            except Exception as e:
+                print(f"Could not load filter index {path}: {e}")
+        _LOADED_INDEXES[collection_name] = index
+    return _LOADED_INDEXES[collection_name]
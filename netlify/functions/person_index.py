@@ -0,0 +1,64 @@
+import os
+import gzip
+import json
+from filter_index import INDEX_DIR
+
+# Inverted person index: TMDB person id -> title ids, best first.
+#
+# Built offline by bin/build_person_index.py from the cast_ids/crew_ids that
+# ingest records, so a person page is one dict lookup plus one multi-get
+# instead of a name match against the cast arrays.
+
+INDEX_PATH = os.path.join(INDEX_DIR, "person_index.json.gz")
+
+# Billing positions below this count as leading roles and rank first
+LEAD_BILLING_CUTOFF = 5
+CREW_BILLING = 1000
+
+
+def rank_credits(credits):
+    """
+    Order one person's credits: leading roles first, then by title popularity.
+    `credits` is a list of (billing_order, popularity, title_id).
+    """
+    credits = sorted(credits, key=lambda c: (c[0] >= LEAD_BILLING_CUTOFF, -(c[1] or 0), c[0]))
+    ordered = []
+    seen = set()
+    for _, _, title_id in credits:
+        if title_id not in seen:
+            seen.add(title_id)
+            ordered.append(title_id)
+    return ordered
+
+
+def save_index(collections, path=INDEX_PATH):
+    """collections: {collection_name: {person_id: [title_id, ...]}}"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        json.dump({"version": 1, "collections": collections}, f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+    return path
+
+
+_INDEX = None
+
+def _load():
+    global _INDEX
+    if _INDEX is None:
+        _INDEX = {}
+        if os.path.exists(INDEX_PATH):
+            try:
+                with gzip.open(INDEX_PATH, "rt", encoding="utf-8") as f:
+                    _INDEX = json.load(f).get("collections", {})
+            except Exception as e:
+                print(f"Could not load person index {INDEX_PATH}: {e}")
+    return _INDEX
+
+
+def titles_for_person(collection_name, person_id):
+    """Title ids for a person in one collection, or None if no index is built."""
+    index = _load()
+    if collection_name not in index:
+        return None
+    return index[collection_name].get(str(person_id), [])
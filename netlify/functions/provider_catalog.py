@@ -0,0 +1,96 @@
+import os
+import re
+import json
+
+# Canonical watch-provider catalogue.
+#
+# TMDB lists the same service under several names and ids ("Disney Plus",
+# "Paramount Plus Essential", "Peacock Premium Plus", ...). Each canonical
+# provider is identified by its primary TMDB provider id; documents store
+# arrays of these ids per payment type so a provider filter is a single
+# equality lookup, e.g. {"watch_provider_ids.stream": 337}.
+#
+# Store and subscription offers stay separate providers (Apple TV, the
+# rent/buy store, is not Apple TV+). Providers not listed here keep their own
+# TMDB provider id. The catalogue
+# itself is provider_catalog.json, shared with astra.js.
+
+PROVIDERS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "provider_catalog.json")
+with open(PROVIDERS_PATH, encoding="utf-8") as _f:
+    PROVIDERS = json.load(_f)
+
+# TMDB region payload key -> document payment type
+PAYMENT_TYPE_KEYS = {"flatrate": "stream", "rent": "rent", "buy": "buy"}
+PAYMENT_TYPES = list(PAYMENT_TYPE_KEYS.values())
+
+
+def normalize_provider_name(name):
+    """Fold spelling variants: 'Disney+' and 'Disney Plus' both become 'disney plus'."""
+    name = str(name).lower().replace("+", " plus ")
+    name = re.sub(r"[^a-z0-9]+", " ", name)
+    return " ".join(name.split())
+
+
+_BY_TMDB_ID = {}
+_BY_NAME = {}
+for _provider in PROVIDERS:
+    for _tmdb_id in _provider["tmdb_ids"]:
+        _BY_TMDB_ID[_tmdb_id] = _provider["id"]
+    for _name in [_provider["name"]] + _provider["aliases"]:
+        _BY_NAME[normalize_provider_name(_name)] = _provider["id"]
+
+
+def canonical_provider_id(provider_id=None, provider_name=None):
+    """
+    Resolve a TMDB provider id and/or name to a canonical provider id.
+    Returns None only for an unknown name with no TMDB id to fall back on.
+    """
+    if provider_id is not None and provider_id in _BY_TMDB_ID:
+        return _BY_TMDB_ID[provider_id]
+    if provider_name:
+        canonical = _BY_NAME.get(normalize_provider_name(provider_name))
+        if canonical is not None:
+            return canonical
+    return provider_id
+
+
+def canonical_provider_ids(providers):
+    """
+    Canonical ids for a list of TMDB provider entries ({provider_id, provider_name})
+    or plain provider names, deduplicated in first-seen order.
+    """
+    ids = []
+    for p in providers or []:
+        if isinstance(p, dict):
+            canonical = canonical_provider_id(p.get('provider_id'), p.get('provider_name'))
+        else:
+            canonical = canonical_provider_id(provider_name=p)
+        if canonical is not None and canonical not in ids:
+            ids.append(canonical)
+    return ids
+
+
+def provider_ids_by_payment_type(region_providers):
+    """
+    Compact {stream, rent, buy} id arrays from one TMDB watch/providers region
+    (raw payload with flatrate/rent/buy keys).
+    """
+    region_providers = region_providers or {}
+    return {
+        payment_type: canonical_provider_ids(region_providers.get(key, []))
+        for key, payment_type in PAYMENT_TYPE_KEYS.items()
+    }
+
+
+def key_crew_ids(crew, created_by=None):
+    """
+    TMDB person ids of the key crew stored as crew_ids for the person index:
+    directors, producers and writers from credits.crew, plus a show's
+    created_by. Ids keep first-seen order without duplicates.
+    """
+    people = [
+        c for c in crew or []
+        if c.get('job') in ('Director', 'Producer') or c.get('department') == 'Writing'
+    ]
+    people += created_by or []
+    return list(dict.fromkeys(c['id'] for c in people if c.get('id') is not None))
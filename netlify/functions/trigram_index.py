@@ -0,0 +1,166 @@
+import os
+import gzip
+import json
+import hashlib
+from collections import Counter
+
+# Character-trigram inverted index for typo-tolerant autocomplete.
+#
+# Each word of a normalized name contributes the trigrams of "  word", so a
+# query typed from the start of any word shares most of its trigrams with the
+# names it should match. Candidates sharing enough trigrams are verified with
+# a bounded prefix edit distance, which avoids a Levenshtein scan over every
+# entry. Postings are stored as delta-encoded row lists to keep the file small.
+
+INDEX_VERSION = 1
+MIN_FUZZY_LENGTH = 4
+MAX_CANDIDATES = 500
+
+
+def word_trigrams(text):
+    grams = set()
+    for word in text.split():
+        padded = "  " + word
+        for i in range(len(padded) - 2):
+            grams.add(padded[i:i + 3])
+    return grams
+
+
+def max_distance_for(query):
+    """Edits tolerated for a query: none for very short input, 2 for long names."""
+    if len(query) < MIN_FUZZY_LENGTH:
+        return 0
+    return 1 if len(query) < 8 else 2
+
+
+def prefix_edit_distance(query, text, max_distance):
+    """
+    Smallest edit distance between `query` and any prefix of `text`, or
+    max_distance + 1 as soon as it is certain to exceed max_distance.
+    """
+    previous = list(range(len(text) + 1))
+    for i, qc in enumerate(query, 1):
+        current = [i] + [0] * len(text)
+        row_min = i
+        for j, tc in enumerate(text, 1):
+            cost = 0 if qc == tc else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if current[j] < row_min:
+                row_min = current[j]
+        if row_min > max_distance:
+            return max_distance + 1
+        previous = current
+    return min(previous)
+
+
+def fuzzy_distance(query, name, max_distance):
+    """Best prefix edit distance of `query` against the start of any word in `name`."""
+    best = max_distance + 1
+    start = 0
+    while start < len(name):
+        best = min(best, prefix_edit_distance(query, name[start:], max_distance))
+        if best == 0:
+            break
+        next_space = name.find(" ", start)
+        if next_space == -1:
+            break
+        start = next_space + 1
+    return best
+
+
+def build_postings(names):
+    """names: normalized names in row order. Returns {trigram: [row, ...]}."""
+    postings = {}
+    for row, name in enumerate(names):
+        for gram in word_trigrams(name):
+            postings.setdefault(gram, []).append(row)
+    return postings
+
+
+def _delta_encode(rows):
+    previous = 0
+    encoded = []
+    for row in rows:
+        encoded.append(row - previous)
+        previous = row
+    return encoded
+
+
+def _delta_decode(deltas):
+    rows = []
+    total = 0
+    for delta in deltas:
+        total += delta
+        rows.append(total)
+    return rows
+
+
+def names_fingerprint(names):
+    return hashlib.sha1("\n".join(names).encode("utf-8")).hexdigest()
+
+
+def write_trigram_index(names, path):
+    """Write the trigram index for `names` (normalized, in entry order) next to the autocomplete file."""
+    postings = build_postings(names)
+    payload = {
+        "version": INDEX_VERSION,
+        "rows": len(names),
+        "fingerprint": names_fingerprint(names),
+        "postings": {gram: _delta_encode(rows) for gram, rows in postings.items()},
+    }
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        json.dump(payload, f, separators=(",", ":"))
+    return path
+
+
+def trigram_path_for(autocomplete_path):
+    """public/autocomplete.json(.gz) -> public/autocomplete-trigrams.json.gz"""
+    base = autocomplete_path
+    for suffix in (".gz", ".json"):
+        if base.endswith(suffix):
+            base = base[:-len(suffix)]
+    return base + "-trigrams.json.gz"
+
+
+class TrigramIndex:
+    def __init__(self, names, postings):
+        self.names = names
+        self.postings = postings
+
+    @classmethod
+    def build(cls, names):
+        return cls(names, build_postings(names))
+
+    @classmethod
+    def load(cls, path, names):
+        """Load postings written by write_trigram_index; None if missing or stale."""
+        if not os.path.exists(path):
+            return None
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            payload = json.load(f)
+        if payload.get("version") != INDEX_VERSION or payload.get("fingerprint") != names_fingerprint(names):
+            return None
+        postings = {gram: _delta_decode(deltas) for gram, deltas in payload["postings"].items()}
+        return cls(names, postings)
+
+    def search(self, query, limit=None):
+        """Rows within the allowed edit distance of `query`, as [(distance, row), ...] closest first."""
+        max_distance = max_distance_for(query)
+        if max_distance == 0:
+            return []
+        grams = word_trigrams(query)
+        # q-gram lemma: each edit destroys at most 3 of the query's trigrams
+        needed = max(1, len(grams) - 3 * max_distance)
+        counts = Counter()
+        for gram in grams:
+            counts.update(self.postings.get(gram, ()))
+        candidates = [row for row, shared in counts.most_common(MAX_CANDIDATES) if shared >= needed]
+
+        matches = []
+        for row in candidates:
+            distance = fuzzy_distance(query, self.names[row], max_distance)
+            if distance <= max_distance:
+                matches.append((distance, row))
+        matches.sort()
+        return matches[:limit] if limit else matches
@@ -0,0 +1,143 @@
+// Overlay of published autocomplete deltas (bin/autocomplete_deltas.py).
+//
+// The base autocomplete data stays cached; the small delta index is
+// revalidated on each load. Only deltas newer than the base are applied (the
+// shard manifest records the last delta folded into it, otherwise the index's
+// base_version is used), and delta files are kept in localStorage once
+// fetched, since they are immutable once published. Adds and removes are
+// applied on top of whatever base source served the suggestions.
+
+(function () {
+  const DELTA_ROOT = "/autocomplete/";
+  const STORAGE_PREFIX = "autocomplete-delta-";
+
+  function storedDelta(version) {
+    try {
+      const stored = localStorage.getItem(STORAGE_PREFIX + version);
+      return stored ? JSON.parse(stored) : null;
+    } catch (err) {
+      return null;
+    }
+  }
+
+  function storeDelta(file) {
+    try {
+      localStorage.setItem(STORAGE_PREFIX + file.version, JSON.stringify(file));
+    } catch (err) {
+      // Storage full or disabled: the file is simply fetched again next time
+    }
+  }
+
+  // Drop stored deltas the index no longer lists (folded into a new base)
+  function pruneStored(versions) {
+    try {
+      Object.keys(localStorage)
+        .filter(key => key.startsWith(STORAGE_PREFIX) && !versions.has(Number(key.slice(STORAGE_PREFIX.length))))
+        .forEach(key => localStorage.removeItem(key));
+    } catch (err) {
+      // Nothing to prune without storage
+    }
+  }
+
+  function loadDelta(entry) {
+    const stored = storedDelta(entry.version);
+    if (stored) return Promise.resolve(stored);
+    return fetch(DELTA_ROOT + entry.file)
+      .then(r => (r.ok ? r.json() : null))
+      .then(file => {
+        if (!file) return { version: entry.version, ops: [] };
+        storeDelta(file);
+        return file;
+      });
+  }
+
+  function normalizeName(name) {
+    return String(name)
+      .normalize("NFKD")
+      .replace(/\p{M}/gu, "")
+      .toLowerCase()
+      .split(/\s+/)
+      .filter(Boolean)
+      .join(" ");
+  }
+
+  // Merged labels ("Movie", "TV Show", ...) and compact types ("movie", ...) to one key space
+  function entryKind(type) {
+    const t = String(type || "movie").toLowerCase();
+    if (t === "person" || t === "genre") return t;
+    return "title";
+  }
+
+  function entryKey(item) {
+    return `${entryKind(item.type)}|${normalizeName(item.name || item.title || "")}`;
+  }
+
+  function displayType(type) {
+    const t = String(type || "movie").toLowerCase();
+    return t === "tv show" ? "tv" : t;
+  }
+
+  class AutocompleteDeltas {
+    constructor() {
+      this.added = new Map(); // key -> item
+      this.removed = new Set(); // keys
+    }
+
+    // `baseVersion`: last delta already folded into the loaded base data, if known
+    static load(baseVersion) {
+      const deltas = new AutocompleteDeltas();
+      return fetch(`${DELTA_ROOT}deltas/index.json`, { cache: "no-cache" })
+        .then(r => (r.ok ? r.json() : { deltas: [] }))
+        .then(index => {
+          const listed = index.deltas || [];
+          pruneStored(new Set(listed.map(d => d.version)));
+          const since = Math.max(baseVersion || 0, index.base_version || 0);
+          return Promise.all(listed.filter(d => d.version > since).map(loadDelta));
+        })
+        .then(files => {
+          files.sort((a, b) => (a.version || 0) - (b.version || 0));
+          files.forEach(file => (file.ops || []).forEach(op => deltas.apply(op)));
+          return deltas;
+        });
+    }
+
+    apply(op) {
+      const key = entryKey(op);
+      if (op.op === "remove") {
+        this.added.delete(key);
+        this.removed.add(key);
+      } else {
+        this.removed.delete(key);
+        const item = { type: displayType(op.type), name: op.name, score: op.score || 0, key: normalizeName(op.name) };
+        if (op.id !== undefined) item.id = op.id;
+        this.added.set(key, item);
+      }
+    }
+
+    get size() {
+      return this.added.size + this.removed.size;
+    }
+
+    // Base matches minus removed entries, plus added entries matching `query`
+    overlay(matches, query, limit = 10) {
+      if (!this.size) return matches;
+      const prefix = normalizeName(query);
+      const seen = new Set();
+      const merged = [];
+      matches.forEach(item => {
+        const key = entryKey(item);
+        if (!this.removed.has(key) && !seen.has(key)) {
+          seen.add(key);
+          merged.push(item);
+        }
+      });
+      this.added.forEach((item, key) => {
+        if (seen.has(key)) return;
+        if (item.key.startsWith(prefix) || item.key.includes(` ${prefix}`)) merged.push(item);
+      });
+      return merged.slice(0, limit);
+    }
+  }
+
+  window.AutocompleteDeltas = AutocompleteDeltas;
+})();
@@ -0,0 +1,186 @@
+// Lazy reader for public/autocomplete.bin (written by bin/merge_autocomplete.py).
+//
+// Only the header and block index are parsed up front, so the search box can
+// be enabled as soon as the download finishes. Blocks of front-coded names
+// are decoded on demand when a prefix lands in them. The layout is documented
+// in netlify/functions/autocomplete_binary.py.
+
+(function () {
+  const MAGIC = "TIAC";
+  const FORMAT_VERSION = 2;
+  const utf8 = new TextDecoder("utf-8");
+
+  function normalizeName(name) {
+    return String(name)
+      .normalize("NFKD")
+      .replace(/\p{M}/gu, "")
+      .toLowerCase()
+      .split(/\s+/)
+      .filter(Boolean)
+      .join(" ");
+  }
+
+  class AutocompleteReader {
+    constructor(buffer) {
+      this.bytes = new Uint8Array(buffer);
+      this.view = new DataView(this.bytes.buffer, this.bytes.byteOffset, this.bytes.byteLength);
+      if (utf8.decode(this.bytes.subarray(0, 4)) !== MAGIC) {
+        throw new Error("Not a binary autocomplete file");
+      }
+      if (this.bytes[4] !== FORMAT_VERSION) {
+        throw new Error(`Unsupported binary autocomplete version ${this.bytes[4]}`);
+      }
+      let pos = 6;
+      this.types = [];
+      for (let i = 0; i < this.bytes[5]; i++) {
+        const length = this.bytes[pos];
+        this.types.push(utf8.decode(this.bytes.subarray(pos + 1, pos + 1 + length)));
+        pos += 1 + length;
+      }
+      [this.length, pos] = this._varint(pos);
+      [this.blockSize, pos] = this._varint(pos);
+      const blockCount = this.view.getUint32(pos, true);
+      pos += 4;
+      this.offsets = new Uint32Array(blockCount);
+      for (let i = 0; i < blockCount; i++) {
+        this.offsets[i] = this.view.getUint32(pos + 4 * i, true);
+      }
+      this.dataStart = pos + 4 * blockCount;
+      this._heads = new Array(blockCount);
+      this._blocks = new Map();
+    }
+
+    _varint(pos) {
+      let result = 0;
+      let multiplier = 1;
+      for (;;) {
+        const byte = this.bytes[pos++];
+        result += (byte & 0x7f) * multiplier;
+        if (byte < 0x80) return [result, pos];
+        multiplier *= 128;
+      }
+    }
+
+    // Id tag: low two bits 0 none, 1 integer, 2 numeric string, 3 utf-8 string of tag >> 2 bytes
+    _id(pos) {
+      let tag;
+      [tag, pos] = this._varint(pos);
+      const kind = tag % 4;
+      const value = Math.floor(tag / 4);
+      if (kind === 0) return [null, pos];
+      if (kind === 1) return [value, pos];
+      if (kind === 2) return [String(value), pos];
+      return [utf8.decode(this.bytes.subarray(pos, pos + value)), pos + value];
+    }
+
+    _decodeEntry(pos, previous) {
+      const typeCode = this.bytes[pos];
+      let shared, length, id, score;
+      [shared, pos] = this._varint(pos + 1);
+      [length, pos] = this._varint(pos);
+      const encoded = new Uint8Array(shared + length);
+      encoded.set(previous.subarray(0, shared));
+      encoded.set(this.bytes.subarray(pos, pos + length), shared);
+      pos += length;
+      [id, pos] = this._id(pos);
+      [score, pos] = this._varint(pos);
+      return [{ typeCode, encoded, id, score }, pos];
+    }
+
+    _blockEnd(block) {
+      return block + 1 < this.offsets.length ? this.dataStart + this.offsets[block + 1] : this.bytes.length;
+    }
+
+    _head(block) {
+      if (this._heads[block] === undefined) {
+        const [entry] = this._decodeEntry(this.dataStart + this.offsets[block], new Uint8Array(0));
+        this._heads[block] = normalizeName(utf8.decode(entry.encoded));
+      }
+      return this._heads[block];
+    }
+
+    block(block) {
+      let decoded = this._blocks.get(block);
+      if (!decoded) {
+        decoded = [];
+        let pos = this.dataStart + this.offsets[block];
+        const end = this._blockEnd(block);
+        let previous = new Uint8Array(0);
+        while (pos < end) {
+          let entry;
+          [entry, pos] = this._decodeEntry(pos, previous);
+          previous = entry.encoded;
+          const name = utf8.decode(entry.encoded);
+          decoded.push({
+            key: normalizeName(name),
+            type: this.types[entry.typeCode],
+            name,
+            id: entry.id,
+            score: entry.score
+          });
+        }
+        this._blocks.set(block, decoded);
+      }
+      return decoded;
+    }
+
+    _firstBlock(prefix) {
+      let lo = 0;
+      let hi = this.offsets.length;
+      while (lo < hi) {
+        const mid = (lo + hi) >> 1;
+        if (this._head(mid) < prefix) lo = mid + 1;
+        else hi = mid;
+      }
+      // The block before the first head >= prefix can still hold matches
+      return Math.max(lo - 1, 0);
+    }
+
+    // Top `limit` entries whose normalized name starts with `query`, best score
+    // first. When fewer than `limit` match, names containing `query` anywhere
+    // ("matrix" -> "The Matrix") fill the rest, as the JSON path's includes()
+    // scan does; that decodes every block, which is then cached.
+    search(query, limit = 10, type = null) {
+      const prefix = normalizeName(query);
+      if (!prefix) return [];
+      const matches = [];
+      for (let block = this._firstBlock(prefix); block < this.offsets.length; block++) {
+        let done = false;
+        for (const entry of this.block(block)) {
+          if (entry.key.startsWith(prefix)) {
+            if (!type || entry.type === type) matches.push(entry);
+          } else if (entry.key > prefix) {
+            done = true;
+            break;
+          }
+        }
+        if (done) break;
+      }
+      matches.sort((a, b) => b.score - a.score);
+      if (matches.length >= limit) return matches.slice(0, limit);
+      const contained = [];
+      for (let block = 0; block < this.offsets.length; block++) {
+        for (const entry of this.block(block)) {
+          if (entry.key.includes(prefix) && !entry.key.startsWith(prefix) && (!type || entry.type === type)) {
+            contained.push(entry);
+          }
+        }
+      }
+      contained.sort((a, b) => b.score - a.score);
+      return matches.concat(contained).slice(0, limit);
+    }
+
+    // Names of every entry of one type; decodes all blocks, so call it off the critical path
+    namesOfType(type) {
+      const names = [];
+      for (let block = 0; block < this.offsets.length; block++) {
+        for (const entry of this.block(block)) {
+          if (entry.type === type) names.push(entry.name);
+        }
+      }
+      return names;
+    }
+  }
+
+  window.AutocompleteReader = AutocompleteReader;
+})();
@@ -0,0 +1,102 @@
+// Client for prefix-sharded autocomplete data (bin/shard_autocomplete.py and
+// bin/merge_autocomplete.py write public/autocomplete/<dataset>.manifest.json).
+//
+// Only the manifest is fetched up front. The first keystrokes fetch the one
+// shard keyed by the first two characters of the query; shards are named by
+// content hash, so the browser can cache them indefinitely.
+
+(function () {
+  const SHARD_ROOT = "/autocomplete/";
+
+  function normalizeName(name) {
+    return String(name)
+      .normalize("NFKD")
+      .replace(/\p{M}/gu, "")
+      .toLowerCase()
+      .split(/\s+/)
+      .filter(Boolean)
+      .join(" ");
+  }
+
+  function toItem(entry, types) {
+    if (Array.isArray(entry)) {
+      const type = types && typeof entry[0] === "number" ? types[entry[0]] : entry[0];
+      return { type, name: entry[1], score: typeof entry[3] === "number" ? entry[3] : 0 };
+    }
+    return entry;
+  }
+
+  // True when a word of `key` starts with `prefix`
+  function matchesWordStart(key, prefix) {
+    let start = 0;
+    while (start !== -1) {
+      if (key.startsWith(prefix, start)) return true;
+      const space = key.indexOf(" ", start);
+      start = space === -1 ? -1 : space + 1;
+    }
+    return false;
+  }
+
+  class ShardedAutocomplete {
+    constructor(manifest) {
+      this.manifest = manifest;
+      this.prefixLength = manifest.prefix_length || 2;
+      this.length = manifest.total || 0;
+      this._shards = new Map(); // key -> items, once loaded
+      this._pending = new Map(); // key -> Promise
+    }
+
+    static load(dataset) {
+      return fetch(`${SHARD_ROOT}${dataset}.manifest.json`, { cache: "no-cache" })
+        .then(r => {
+            if (!r.ok) throw new Error(`Failed to load ${dataset} autocomplete manifest`);
+            return r.json();
+        })
+        .then(manifest => new ShardedAutocomplete(manifest));
+    }
+
+    shardKey(query) {
+      const words = normalizeName(query).split(" ").filter(Boolean);
+      return words.length ? words[0].slice(0, this.prefixLength) : null;
+    }
+
+    // Resolves once the shard covering `query` is loaded
+    whenReady(query) {
+      const key = this.shardKey(query);
+      const shard = key && this.manifest.shards[key];
+      if (!shard || this._shards.has(key)) return Promise.resolve();
+      if (!this._pending.has(key)) {
+        this._pending.set(key, fetch(SHARD_ROOT + shard.file)
+          .then(r => {
+              if (!r.ok) throw new Error(`Failed to load autocomplete shard ${key}`);
+              return r.json();
+          })
+          .then(data => {
+            const items = (data.entries || []).map(entry => toItem(entry, data.types));
+            items.forEach(item => { item.key = normalizeName(item.name || item.title || ""); });
+            this._shards.set(key, items);
+          })
+          .finally(() => this._pending.delete(key)));
+      }
+      return this._pending.get(key);
+    }
+
+    // Best matches for `query`, or null while its shard is still loading
+    search(query, limit = 10) {
+      const key = this.shardKey(query);
+      if (!key || !this.manifest.shards[key]) return [];
+      const items = this._shards.get(key);
+      if (!items) {
+        this.whenReady(query).catch(err => console.warn("[Autocomplete]", err));
+        return null;
+      }
+      const prefix = normalizeName(query);
+      return items
+        .filter(item => matchesWordStart(item.key, prefix))
+        .sort((a, b) => (b.score || 0) - (a.score || 0))
+        .slice(0, limit);
+    }
+  }
+
+  window.ShardedAutocomplete = ShardedAutocomplete;
+})();
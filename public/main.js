@@ -291,30 +291,85 @@ let genreSet = new Set();
 let movieAutocompleteData = [];
 let boardgameAutocompleteData = [];
 
+function setGenres(genres) {
+  genreSet = new Set(genres.filter(name => !!name));
+  genreList = Array.from(genreSet).sort((a, b) => a.localeCompare(b));
+}
+
+// Load the compact binary autocomplete file; only its header is parsed before
+// search is enabled. Fall back to autocomplete.json when it isn't deployed.
+function loadBinaryAutocomplete() {
+  if (typeof AutocompleteReader === 'undefined') return Promise.reject(new Error("Autocomplete reader not loaded"));
+  return fetch("/autocomplete.bin")
+    .then(r => {
+        if (!r.ok) throw new Error("Failed to load binary autocomplete data");
+        return r.arrayBuffer();
+    })
+    .then(buffer => {
+      movieAutocompleteData = new AutocompleteReader(buffer);
+      enableSearchIfReady();
+      // Genre names need every block decoded; do it once the page is idle
+      const idle = window.requestIdleCallback || (fn => setTimeout(fn, 0));
+      idle(() => setGenres(movieAutocompleteData.namesOfType("genre")));
+    });
+}
+
 // Load movie/TV autocomplete.json and extract genres
-fetch("/autocomplete.json")
-  .then(r => {
-      if (!r.ok) throw new Error("Failed to load autocomplete data");
-      return r.json();
-  })
-  .then(data => {
-    movieAutocompleteData = data;
-    // Support both compact ([type, name, searchName]) and object ({type, name, ...}) formats
-    const genres = (Array.isArray(data) ? data : data.entries || data)
-      .filter(entry => (Array.isArray(entry) ? entry[0] === 2 : entry.type === "genre" || entry.type === 2))
-      .map(entry => Array.isArray(entry) ? entry[1] : entry.name)
-      .filter(name => !!name);
-    genreSet = new Set(genres);
-    genreList = Array.from(genreSet).sort((a, b) => a.localeCompare(b));
+function loadJsonAutocomplete() {
+  return fetch("/autocomplete.json")
+    .then(r => {
+        if (!r.ok) throw new Error("Failed to load autocomplete data");
+        return r.json();
+    })
+    .then(data => {
+      movieAutocompleteData = data;
+      // Support both compact ([type, name, searchName]) and object ({type, name, ...}) formats
+      setGenres((Array.isArray(data) ? data : data.entries || data)
+        .filter(entry => (Array.isArray(entry) ? entry[0] === 2 : entry.type === "genre" || entry.type === 2))
+        .map(entry => Array.isArray(entry) ? entry[1] : entry.name));
+      enableSearchIfReady();
+    });
+}
+
+// Prefix shards: only the manifest is fetched before search is enabled
+function loadShardedAutocomplete(dataset) {
+  if (typeof ShardedAutocomplete === 'undefined') return Promise.reject(new Error("Shard client not loaded"));
+  return ShardedAutocomplete.load(dataset);
+}
+
+// Published adds/removes since the base data was built
+let autocompleteDeltas = null;
+function loadAutocompleteDeltas(baseVersion) {
+  if (typeof AutocompleteDeltas === 'undefined') return;
+  AutocompleteDeltas.load(baseVersion)
+    .then(deltas => { autocompleteDeltas = deltas; })
+    .catch(err => console.warn('[Autocomplete] Could not load deltas:', err));
+}
+
+loadShardedAutocomplete("movies")
+  .then(shards => {
+    movieAutocompleteData = shards;
+    setGenres(shards.manifest.genres || []);
     enableSearchIfReady();
-  });
+    return shards.manifest.base_version;
+  })
+  .catch(err => {
+    console.warn('[Autocomplete] Shards unavailable, loading binary data:', err.message);
+    return loadBinaryAutocomplete().catch(err => {
+      console.warn('[Autocomplete] Binary data unavailable, loading JSON:', err.message);
+      return loadJsonAutocomplete();
+    });
+  })
+  // Deltas are fetched once the base is known, and only those newer than it
+  .then(baseVersion => loadAutocompleteDeltas(baseVersion));
 
 // Load board game autocomplete data
-fetch("/autocomplete-boardgames.json")
-  .then(r => {
-      if (!r.ok) throw new Error("Failed to load board game autocomplete data");
-      return r.json();
-  })
+loadShardedAutocomplete("boardgames")
+  .catch(() => fetch("/autocomplete-boardgames.json")
+    .then(r => {
+        if (!r.ok) throw new Error("Failed to load board game autocomplete data");
+        return r.json();
+    }))
   .then(data => {
     boardgameAutocompleteData = data;
     console.log('[Autocomplete] Loaded', boardgameAutocompleteData.length, 'board games');
@@ -358,12 +413,27 @@ function showAutocomplete(query) {
   console.log('[showAutocomplete] searchMode.boardgames:', searchMode.boardgames, '| Using dataset:', searchMode.boardgames ? 'boardgames' : 'movies', '| Data length:', data.length);
 
   // Filter and match
-  const matches = data
-    .filter(item => {
-      const name = item.name || item.title || '';
-      return name.toLowerCase().includes(lowerQuery);
-    })
-    .slice(0, 10); // Limit to 10 results
+  const ranked = typeof data.search === 'function' ? data.search(query, 10) : undefined;
+  if (ranked === null) {
+    // Shard for this prefix is still downloading; re-render once it arrives
+    data.whenReady(query).then(() => {
+      const input = document.getElementById('searchInput');
+      if (input && input.value === query) showAutocomplete(query);
+    }).catch(err => console.warn('[Autocomplete]', err));
+    return;
+  }
+  let matches = ranked !== undefined
+    ? ranked // Binary reader or shards: ranked prefix matches
+    : data
+      .filter(item => {
+        const name = item.name || item.title || '';
+        return name.toLowerCase().includes(lowerQuery);
+      })
+      .slice(0, 10); // Limit to 10 results
+
+  if (autocompleteDeltas && !searchMode.boardgames) {
+    matches = autocompleteDeltas.overlay(matches, query, 10);
+  }
 
   if (matches.length === 0) {
     suggestionsDiv.style.display = 'none';